@@ -48,14 +48,10 @@ class UserProfileSerializer(serializers.ModelSerializer):
         # Handle profile picture update
         profile_picture = validated_data.pop('profile_picture', None)
         if profile_picture:
-            # Delete old picture if it exists
+            # Release the old picture; the storage deletes unreferenced
+            # files in the background
             if instance.profile_picture:
-                try:
-                    old_path = instance.profile_picture.path
-                    if os.path.exists(old_path):
-                        os.remove(old_path)
-                except Exception as e:
-                    print(f"Error deleting old profile picture: {e}")
+                instance.profile_picture.delete(save=False)
             instance.profile_picture = profile_picture
 
         # Update other fields
@@ -11,7 +11,7 @@ from django.core.mail import EmailMessage
 from django.conf import settings
 from django.db import models
 import logging
-from notifications.utils import send_transactional_email
+from notifications.email_queue import enqueue as enqueue_email
 from .models import OTP, PendingRegistration
 from .serializers import UserSerializer, UserProfileSerializer, ChangePasswordSerializer
 from .serializers_registration import UserRegistrationSerializer as RegisterSerializer
@@ -65,25 +65,17 @@ class RegisterView(APIView):
 
             logger = logging.getLogger(__name__)
             try:
-                sent = send_transactional_email(
+                # Sent from the email queue; the request does not wait for the provider
+                enqueue_email(
                     subject=subject,
                     recipient_list=[email],
                     template_name='notifications/otp_email.html',
                     context=context,
                     from_email=getattr(settings, 'DEFAULT_FROM_EMAIL', None),
-                    fail_silently=False,
+                    idempotency_key=f'otp:{otp_instance.pk}',
                 )
-
-                if not sent:
-                    logger.error('send_transactional_email returned 0 for %s', email)
-                    pending_registration.delete()
-                    return Response({
-                        'message': 'Failed to send verification email',
-                        'error': 'send_failed'
-                    }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
             except Exception as e:
-                logger.exception('Unexpected error when sending verification email')
+                logger.exception('Unexpected error when queueing verification email')
                 pending_registration.delete()
                 return Response({
                     'message': 'An unexpected error occurred while sending email. Please try again.',
@@ -249,25 +241,19 @@ class ResendOTPView(APIView):
         }
         
         try:
-            sent = send_transactional_email(
+            enqueue_email(
                 subject=subject,
                 recipient_list=[email],
                 template_name='notifications/otp_email.html',
                 context=context,
                 from_email=getattr(settings, 'DEFAULT_FROM_EMAIL', None),
-                fail_silently=False,
+                idempotency_key=f'otp:{otp_instance.pk}',
             )
-            if not sent:
-                logging.getLogger(__name__).error('send_transactional_email returned 0 for resend OTP to %s', email)
-                return Response({
-                    "message": "Error sending verification email",
-                    "error": "send_failed"
-                }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
             return Response({
                 "message": "New verification code sent"
             }, status=status.HTTP_200_OK)
         except Exception as e:
-            logging.getLogger(__name__).exception('Error sending verification email')
+            logging.getLogger(__name__).exception('Error queueing verification email')
             return Response({
                 "message": "Error sending verification email",
                 "error": str(e)
@@ -4,7 +4,7 @@ from rest_framework import status, permissions
 from django.contrib.auth import get_user_model
 from django.conf import settings
 import logging
-from notifications.utils import send_transactional_email
+from notifications.email_queue import enqueue as enqueue_email
 from .models import OTP
 
 User = get_user_model()
@@ -37,20 +37,17 @@ class RequestPasswordResetView(APIView):
         }
 
         try:
-            sent = send_transactional_email(
+            enqueue_email(
                 subject=subject,
                 recipient_list=[email],
                 template_name='notifications/otp_email.html',
                 context=context,
                 from_email=getattr(settings, 'DEFAULT_FROM_EMAIL', None),
-                fail_silently=False,
+                idempotency_key=f'otp:{otp_instance.pk}',
             )
-            if not sent:
-                logging.getLogger(__name__).error('send_transactional_email returned 0 for %s', email)
-                return Response({"message": "Error sending email", "error": "send_failed"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
             return Response({"message": "OTP sent to your email"}, status=status.HTTP_200_OK)
         except Exception as e:
-            logging.getLogger(__name__).exception('Error sending password reset email')
+            logging.getLogger(__name__).exception('Error queueing password reset email')
             return Response({"message": "Error sending email", "error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 class VerifyPasswordResetOTPView(APIView):
@@ -1,7 +1,7 @@
 import os
 from django.core.asgi import get_asgi_application
 from channels.routing import ProtocolTypeRouter, URLRouter
-from channels.auth import AuthMiddlewareStack
+from django.urls import re_path
 # REMOVE: from notifications.routing import websocket_urlpatterns
 
 # 1. Set the Django settings environment variable first
@@ -12,11 +12,16 @@ django_asgi_app = get_asgi_application()
 
 # 3. Import your local routing file ONLY NOW, after the apps are loaded.
 #    This import should ideally be placed after os.environ.setdefault and get_asgi_application().
-from notifications.routing import websocket_urlpatterns 
+from notifications.routing import http_urlpatterns, websocket_urlpatterns
+from notifications.middleware import JWTAuthMiddleware
 
 application = ProtocolTypeRouter({
-    "http": django_asgi_app,  # Use the initialized app variable here
-    "websocket": AuthMiddlewareStack(
+    # Realtime fallbacks (SSE, long-poll) are async apps in front of Django
+    "http": URLRouter(http_urlpatterns + [
+        re_path(r'', django_asgi_app),  # Use the initialized app variable here
+    ]),
+    # JWT, like the REST API; refuses the handshake without a valid token
+    "websocket": JWTAuthMiddleware(
         URLRouter(websocket_urlpatterns)
     ),
 })
\ No newline at end of file
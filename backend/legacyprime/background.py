@@ -0,0 +1,66 @@
+"""
+Shared background worker pool.
+
+Work that must not hold up a request (image processing, cleanup, ...)
+is handed to one process-wide `ThreadPoolExecutor` sized by
+`BACKGROUND_WORKERS`. Each task closes the database connections it
+opened, and failures are logged rather than lost inside the future.
+
+Use `submit_on_commit()` from code running in a transaction so the
+task only sees committed rows.
+"""
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections, transaction
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_lock = threading.Lock()
+
+
+def _reset_after_fork():
+    # Worker threads do not survive fork(); the child builds its own pool
+    global _executor, _lock
+    _executor = None
+    _lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.BACKGROUND_WORKERS,
+                    thread_name_prefix='background',
+                )
+    return _executor
+
+
+def _run(func, args, kwargs):
+    try:
+        return func(*args, **kwargs)
+    except Exception:
+        logger.exception('Background task %s failed', getattr(func, '__qualname__', func))
+        raise
+    finally:
+        connections.close_all()
+
+
+def submit(func, *args, **kwargs):
+    """Run `func(*args, **kwargs)` on the background pool; returns a Future."""
+    return get_executor().submit(_run, func, args, kwargs)
+
+
+def submit_on_commit(func, *args, **kwargs):
+    """Like `submit()`, but only once the current transaction commits."""
+    transaction.on_commit(lambda: submit(func, *args, **kwargs))
@@ -0,0 +1,30 @@
+import random
+import time
+
+from django.conf import settings
+from django.core.mail.backends.base import BaseEmailBackend
+
+
+class FakeProviderBackend(BaseEmailBackend):
+    """
+    Local stand-in for the SendGrid backend, for development and the email
+    queue benchmark. Nothing leaves the process: each message takes
+    EMAIL_FAKE_PROVIDER_DELAY_MS (default 200) like a provider round trip,
+    fails with probability EMAIL_FAKE_PROVIDER_FAILURE_RATE (default 0),
+    and is otherwise appended to `accepted` as `(message, time.time())`.
+    """
+    accepted = []
+
+    def send_messages(self, email_messages):
+        delay = getattr(settings, 'EMAIL_FAKE_PROVIDER_DELAY_MS', 200) / 1000
+        failure_rate = getattr(settings, 'EMAIL_FAKE_PROVIDER_FAILURE_RATE', 0)
+        num_sent = 0
+        for message in email_messages:
+            time.sleep(delay)
+            if random.random() < failure_rate:
+                if not self.fail_silently:
+                    raise ConnectionError('Fake provider: temporary failure')
+                continue
+            self.accepted.append((message, time.time()))
+            num_sent += 1
+        return num_sent
@@ -0,0 +1,226 @@
+"""
+Authenticated media delivery.
+
+`ProtectedMediaView` serves everything under MEDIA_URL. A request is
+allowed if it carries a valid signed token (added by the storage's
+`url()` to every URL handed out by the API), or if the authenticated
+user owns a deposit, archived transaction, upload or profile picture
+that points at the file. Staff may read any file.
+
+The byte transfer itself is handed to the front proxy when
+`MEDIA_ACCEL` is set, which production deployments should do:
+
+- 'x-accel-redirect' (nginx): an `internal` location at
+  MEDIA_ACCEL_PREFIX must alias MEDIA_ROOT;
+- 'x-sendfile' (Apache mod_xsendfile, lighttpd): the absolute path.
+
+Otherwise Django answers with a `FileResponse`, with ETag/If-None-Match
+and single-range Range support. A WSGI server can send it with
+sendfile(). Under ASGI the file is read in blocks through
+`sync_to_async` instead, because Django would read a sync file body in
+full before sending it. Either way the worker carries every byte, so
+this fallback is meant for development and small deployments.
+"""
+import mimetypes
+import os
+import time
+from urllib.parse import quote
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core import signing
+from django.core.handlers.asgi import ASGIRequest
+from django.core.files.storage import default_storage
+from django.db.models import Q
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified, HttpResponseRedirect
+from django.utils.http import parse_etags
+from rest_framework.views import APIView
+
+from .storage import is_content_addressed
+
+_signer = signing.Signer(salt='legacyprime.media')
+
+ASYNC_BLOCK_SIZE = 64 * 1024
+
+
+def _window():
+    return int(time.time() // settings.MEDIA_URL_WINDOW_SECONDS)
+
+
+def sign(name):
+    """
+    Token granting read access to `name`. Tokens only change once per
+    MEDIA_URL_WINDOW_SECONDS so URLs stay stable for browser caches.
+    """
+    window = _window()
+    return f"{window}.{_signer.sign(f'{name}|{window}').rsplit(':', 1)[1]}"
+
+
+def verify(name, token):
+    try:
+        window, signature = token.split('.', 1)
+        window = int(window)
+        _signer.unsign(f'{name}|{window}:{signature}')
+    except (ValueError, signing.BadSignature):
+        return False
+    age = (_window() - window) * settings.MEDIA_URL_WINDOW_SECONDS
+    return 0 <= age <= settings.MEDIA_URL_MAX_AGE
+
+
+def user_can_read(user, name):
+    if not user or not user.is_authenticated:
+        return False
+    if user.is_staff:
+        return True
+    if getattr(user, 'profile_picture', None) and user.profile_picture.name == name:
+        return True
+
+    from transactions.models import Deposit, TransactionArchive
+    from uploads.models import Upload
+
+    proof = Q(proof_image=name) | Q(proof_thumbnail=name) | Q(proof_preview=name)
+    return (
+        Deposit.objects.filter(proof, user=user).exists()
+        or TransactionArchive.objects.filter(user=user, proof_image=name).exists()
+        or Upload.objects.filter(user=user, file=name).exists()
+    )
+
+
+def _etag(name, stat):
+    if is_content_addressed(name):
+        # The name is the SHA-256 of the bytes
+        return '"%s"' % os.path.splitext(os.path.basename(name))[0]
+    return '"%x-%x"' % (stat.st_size, int(stat.st_mtime))
+
+
+def _parse_range(header, size):
+    """`(start, end)` inclusive for a single `bytes=` range, None to ignore, or False if unsatisfiable."""
+    if not header or not header.startswith('bytes=') or ',' in header:
+        return None
+    start, _, end = header[len('bytes='):].strip().partition('-')
+    try:
+        if start == '':
+            length = int(end)
+            if length <= 0:
+                return False
+            return max(size - length, 0), size - 1
+        start = int(start)
+        end = int(end) if end else size - 1
+    except ValueError:
+        return None
+    if start >= size or end < start:
+        return False
+    return start, min(end, size - 1)
+
+
+class _RangeFile:
+    """Read at most `length` bytes from an already positioned file."""
+
+    def __init__(self, fh, length):
+        self.fh = fh
+        self.remaining = length
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        size = self.remaining if size is None or size < 0 else min(size, self.remaining)
+        data = self.fh.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.fh.close()
+
+
+async def _aread(fh):
+    """The contents of `fh` as an async iterator, read off the event loop."""
+    read = sync_to_async(fh.read, thread_sensitive=False)
+    while True:
+        block = await read(ASYNC_BLOCK_SIZE)
+        if not block:
+            return
+        yield block
+
+
+class ProtectedMediaView(APIView):
+    permission_classes = ()
+
+    def perform_content_negotiation(self, request, force=False):
+        # Browsers ask for image/*; the JSON renderer is only used for errors
+        return super().perform_content_negotiation(request, force=True)
+
+    def get(self, request, path):
+        name = path.lstrip('/')
+        token = request.GET.get('t')
+        if not (token and verify(name, token)) and not user_can_read(request.user, name):
+            # Same answer as a missing file: do not reveal what exists
+            raise Http404
+
+        cache_control = (
+            'private, max-age=31536000, immutable' if is_content_addressed(name)
+            else 'private, max-age=3600'
+        )
+        try:
+            local_path = default_storage.path(name)
+        except NotImplementedError:
+            # Remote backend (S3): let it serve the object
+            backend = getattr(default_storage, 'backend', default_storage)
+            return HttpResponseRedirect(backend.url(name))
+
+        try:
+            stat = os.stat(local_path)
+        except (FileNotFoundError, NotADirectoryError):
+            raise Http404
+        etag = _etag(name, stat)
+
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if if_none_match and (etag in parse_etags(if_none_match) or if_none_match.strip() == '*'):
+            response = HttpResponseNotModified()
+            response['ETag'] = etag
+            response['Cache-Control'] = cache_control
+            return response
+
+        accel = settings.MEDIA_ACCEL
+        if accel:
+            response = HttpResponse()
+            if accel == 'x-accel-redirect':
+                response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_PREFIX + quote(name)
+            else:
+                response['X-Sendfile'] = local_path
+            # Let the proxy pick the type from the file; it handles Range itself
+            del response['Content-Type']
+        else:
+            response = self._file_response(request, local_path, stat.st_size, etag)
+
+        response['ETag'] = etag
+        response['Cache-Control'] = cache_control
+        return response
+
+    def _file_response(self, request, local_path, size, etag):
+        byte_range = _parse_range(request.META.get('HTTP_RANGE'), size)
+        if_range = request.META.get('HTTP_IF_RANGE')
+        if if_range and if_range.strip() != etag:
+            byte_range = None
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+        content_type = mimetypes.guess_type(local_path)[0] or 'application/octet-stream'
+        fh = open(local_path, 'rb')
+        if byte_range is None:
+            response = FileResponse(fh, content_type=content_type)
+        else:
+            start, end = byte_range
+            fh.seek(start)
+            length = end - start + 1
+            # Open-ended ranges keep the real file, so sendfile() still applies
+            body = fh if end == size - 1 else _RangeFile(fh, length)
+            response = FileResponse(body, status=206, content_type=content_type)
+            response['Content-Length'] = str(length)
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Accept-Ranges'] = 'bytes'
+        if isinstance(request._request, ASGIRequest):
+            # The response still closes `fh` once sent
+            response.streaming_content = _aread(body if byte_range else fh)
+        return response
@@ -66,6 +66,7 @@ INSTALLED_APPS = [
     'transactions',
     'wallet',
     'notifications',
+    'uploads',
 ]
 
 # --- MIDDLEWARE ---
@@ -143,6 +144,56 @@ else:
     # Development
     CHANNEL_LAYERS = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
 
+# Realtime events are kept this long for replay to reconnecting clients
+NOTIFICATION_OUTBOX_RETENTION_HOURS = int(os.environ.get('NOTIFICATION_OUTBOX_RETENTION_HOURS', '72'))
+# Most events replayed in one frame; clients further behind are told to resync
+NOTIFICATION_REPLAY_LIMIT = int(os.environ.get('NOTIFICATION_REPLAY_LIMIT', '500'))
+# Per-connection send buffer: events arriving within the window go out as
+# one frame; clients with more than HIGH_WATER events waiting are dropped
+# (they reconnect and replay from the outbox)
+NOTIFICATION_BATCH_WINDOW_MS = int(os.environ.get('NOTIFICATION_BATCH_WINDOW_MS', '50'))
+NOTIFICATION_BUFFER_HIGH_WATER = int(os.environ.get('NOTIFICATION_BUFFER_HIGH_WATER', '256'))
+# Global announcements go out through this many shard groups
+ANNOUNCEMENT_SHARDS = int(os.environ.get('ANNOUNCEMENT_SHARDS', '64'))
+# Server-Sent Events and long-poll fallbacks (notifications/streams.py)
+NOTIFICATION_STREAM_KEEPALIVE_SECONDS = int(os.environ.get('NOTIFICATION_STREAM_KEEPALIVE_SECONDS', '15'))
+NOTIFICATION_STREAM_MAX_SECONDS = int(os.environ.get('NOTIFICATION_STREAM_MAX_SECONDS', '900'))
+NOTIFICATION_LONGPOLL_TIMEOUT_SECONDS = int(os.environ.get('NOTIFICATION_LONGPOLL_TIMEOUT_SECONDS', '25'))
+NOTIFICATION_METRICS_PUBLISH_SECONDS = int(os.environ.get('NOTIFICATION_METRICS_PUBLISH_SECONDS', '10'))
+# WebSocket handshakes resolve users from a per-process cache (see notifications/middleware.py)
+WS_IDENTITY_CACHE_SECONDS = int(os.environ.get('WS_IDENTITY_CACHE_SECONDS', '60'))
+WS_IDENTITY_CACHE_SIZE = int(os.environ.get('WS_IDENTITY_CACHE_SIZE', '10000'))
+
+# --- CACHES ---
+# Redis in production (shared by all workers), per-process locmem in development.
+CACHE_URL = os.environ.get('CACHE_URL') or (os.environ.get('REDIS_URL') if IS_PRODUCTION else None)
+if CACHE_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_URL,
+            'KEY_PREFIX': 'legacyprime',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'legacyprime',
+        }
+    }
+
+# Seconds a dashboard summary may live in the cache (ledger postings invalidate it)
+SUMMARY_CACHE_TIMEOUT = int(os.environ.get('SUMMARY_CACHE_TIMEOUT', '300'))
+# Seconds a user's summary generation number is kept after it is created
+SUMMARY_CACHE_GENERATION_TIMEOUT = int(os.environ.get('SUMMARY_CACHE_GENERATION_TIMEOUT', str(7 * 24 * 3600)))
+# Seconds the archive horizon (transactions/archive.py) is cached per cache backend
+ARCHIVE_HORIZON_CACHE_SECONDS = int(os.environ.get('ARCHIVE_HORIZON_CACHE_SECONDS', '60'))
+
+# --- BACKGROUND WORK ---
+# Threads in the shared pool used for work that must not block requests
+BACKGROUND_WORKERS = int(os.environ.get('BACKGROUND_WORKERS', str(min(8, (os.cpu_count() or 1) + 2))))
+
 # --- USER MODEL ---
 AUTH_USER_MODEL = 'accounts.User'
 
@@ -271,9 +322,14 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
-# For production, you might want to use cloud storage for media files
-if IS_PRODUCTION and os.environ.get('AWS_ACCESS_KEY_ID'):
-    # AWS S3 Configuration (optional)
+# Media is kept under MEDIA_ROOT unless MEDIA_STORAGE=s3, in production too:
+# a local MEDIA_URL gets the ownership check in legacyprime.media. S3 is
+# opt-in rather than implied by the AWS_* variables, and needs
+# django-storages and boto3 installed
+MEDIA_STORAGE = os.environ.get('MEDIA_STORAGE', 'filesystem').lower()
+DEFAULT_FILE_STORAGE = 'django.core.files.storage.FileSystemStorage'
+
+if MEDIA_STORAGE == 's3':
     DEFAULT_FILE_STORAGE = 'storages.backends.s3boto3.S3Boto3Storage'
     AWS_ACCESS_KEY_ID = os.environ.get('AWS_ACCESS_KEY_ID')
     AWS_SECRET_ACCESS_KEY = os.environ.get('AWS_SECRET_ACCESS_KEY')
@@ -281,6 +337,58 @@ if IS_PRODUCTION and os.environ.get('AWS_ACCESS_KEY_ID'):
     AWS_S3_REGION_NAME = os.environ.get('AWS_S3_REGION_NAME', 'us-east-1')
     AWS_S3_CUSTOM_DOMAIN = f'{AWS_STORAGE_BUCKET_NAME}.s3.amazonaws.com'
     MEDIA_URL = f'https://{AWS_S3_CUSTOM_DOMAIN}/media/'
+    # Object names are content hashes, so objects never change (see legacyprime/storage.py)
+    AWS_S3_OBJECT_PARAMETERS = {'CacheControl': 'public, max-age=31536000, immutable'}
+
+# Django 5 only reads STORAGES. Media goes through the content-addressed
+# wrapper (dedup + refcounts) on top of DEFAULT_FILE_STORAGE.
+STORAGES = {
+    'default': {
+        'BACKEND': 'legacyprime.storage.ContentAddressedStorage',
+        'OPTIONS': {'backend': DEFAULT_FILE_STORAGE},
+    },
+    'staticfiles': {
+        'BACKEND': STATICFILES_STORAGE,
+    },
+}
+
+# Media under MEDIA_URL is served by legacyprime.media with an ownership
+# check; URLs from the API carry a signed token that changes once per
+# MEDIA_URL_WINDOW_SECONDS (so the URL, and the browser's cached copy, stay
+# the same for that long) and is accepted for MEDIA_URL_MAX_AGE after it
+MEDIA_PROTECTED = os.environ.get('MEDIA_PROTECTED', 'true').lower() == 'true'
+MEDIA_URL_MAX_AGE = int(os.environ.get('MEDIA_URL_MAX_AGE', str(24 * 3600)))
+MEDIA_URL_WINDOW_SECONDS = int(os.environ.get('MEDIA_URL_WINDOW_SECONDS', str(24 * 3600)))
+# Hand file transfers to the front proxy: '' (Django sends the file),
+# 'x-accel-redirect' (nginx, internal location at MEDIA_ACCEL_PREFIX
+# aliased to MEDIA_ROOT) or 'x-sendfile' (Apache/lighttpd). Set it in
+# production whenever a proxy can do this: without it every byte goes
+# through the ASGI worker's event loop
+MEDIA_ACCEL = os.environ.get('MEDIA_ACCEL', '').lower()
+MEDIA_ACCEL_PREFIX = os.environ.get('MEDIA_ACCEL_PREFIX', '/internal-media/')
+
+# Unreferenced media blobs are deleted by a background collector after
+# the grace period; the collector runs at most once per interval
+MEDIA_GC_GRACE_SECONDS = int(os.environ.get('MEDIA_GC_GRACE_SECONDS', '3600'))
+MEDIA_GC_INTERVAL_SECONDS = int(os.environ.get('MEDIA_GC_INTERVAL_SECONDS', '600'))
+
+# Deposit proof images are re-encoded in the background (see transactions/proofs.py)
+PROOF_IMAGE_MAX_DIMENSION = int(os.environ.get('PROOF_IMAGE_MAX_DIMENSION', '2048'))
+PROOF_PREVIEW_SIZE = int(os.environ.get('PROOF_PREVIEW_SIZE', '1024'))
+PROOF_THUMBNAIL_SIZE = int(os.environ.get('PROOF_THUMBNAIL_SIZE', '320'))
+PROOF_JPEG_QUALITY = int(os.environ.get('PROOF_JPEG_QUALITY', '82'))
+# Largest pHash/dHash Hamming distances (of 64 bits) flagged as the same proof
+PROOF_PHASH_MAX_DISTANCE = int(os.environ.get('PROOF_PHASH_MAX_DISTANCE', '6'))
+PROOF_DHASH_MAX_DISTANCE = int(os.environ.get('PROOF_DHASH_MAX_DISTANCE', '10'))
+
+# Chunked uploads (uploads app): per-purpose size limits, largest chunk per
+# request, and how long an unfinished upload may sit idle before purging
+UPLOAD_MAX_SIZES = {
+    'deposit_proof': int(os.environ.get('UPLOAD_MAX_DEPOSIT_PROOF', str(10 * 1024 * 1024))),
+    'profile_picture': int(os.environ.get('UPLOAD_MAX_PROFILE_PICTURE', str(5 * 1024 * 1024))),
+}
+UPLOAD_MAX_CHUNK_SIZE = int(os.environ.get('UPLOAD_MAX_CHUNK_SIZE', str(2 * 1024 * 1024)))
+UPLOAD_EXPIRY_HOURS = int(os.environ.get('UPLOAD_EXPIRY_HOURS', '24'))
 
 # --- GENERAL SETTINGS ---
 LANGUAGE_CODE = 'en-us'
@@ -296,6 +404,24 @@ DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', 'noreply@legacyprime.c
 EMAIL_HOST_PASSWORD = os.environ.get('SENDGRID_API_KEY', '')
 EMAIL_DEBUG = DEBUG
 
+# Outbound email queue (notifications/email_queue.py). Views only enqueue;
+# messages are sent from the background pool right after commit. Failures
+# are retried with exponential backoff (BASE * 2^(attempt-1), capped at MAX)
+# until MAX_ATTEMPTS, by a sweep on the background pool every SWEEP_INTERVAL
+# seconds, or by the `process_email_queue` worker (set the interval to 0
+# when running one)
+EMAIL_QUEUE_SEND_ON_ENQUEUE = os.environ.get('EMAIL_QUEUE_SEND_ON_ENQUEUE', 'true').lower() == 'true'
+EMAIL_QUEUE_WORKERS = int(os.environ.get('EMAIL_QUEUE_WORKERS', '4'))
+EMAIL_QUEUE_POLL_SECONDS = float(os.environ.get('EMAIL_QUEUE_POLL_SECONDS', '1'))
+EMAIL_QUEUE_MAX_ATTEMPTS = int(os.environ.get('EMAIL_QUEUE_MAX_ATTEMPTS', '6'))
+EMAIL_QUEUE_BACKOFF_BASE_SECONDS = int(os.environ.get('EMAIL_QUEUE_BACKOFF_BASE_SECONDS', '30'))
+EMAIL_QUEUE_BACKOFF_MAX_SECONDS = int(os.environ.get('EMAIL_QUEUE_BACKOFF_MAX_SECONDS', '3600'))
+# A message still 'sending' after this long is assumed lost with its worker and retried
+EMAIL_QUEUE_CLAIM_TIMEOUT_SECONDS = int(os.environ.get('EMAIL_QUEUE_CLAIM_TIMEOUT_SECONDS', '300'))
+EMAIL_QUEUE_SWEEP_INTERVAL_SECONDS = int(os.environ.get('EMAIL_QUEUE_SWEEP_INTERVAL_SECONDS', '60'))
+# Sent and dead messages are deleted by `purge_emails` after this long
+EMAIL_QUEUE_RETENTION_HOURS = int(os.environ.get('EMAIL_QUEUE_RETENTION_HOURS', '168'))
+
 PROJECT_NAME = "Legacy Prime"
 
 # --- LOGGING ---
@@ -0,0 +1,145 @@
+"""
+Content-addressed media storage.
+
+`ContentAddressedStorage` wraps the configured media backend (local
+`MEDIA_ROOT` or S3) and stores every file under the SHA-256 of its
+bytes, e.g. `cas/3f/a1/3fa1...e9.jpg`. Identical uploads share one
+object, reference counts live in `uploads.StoredBlob`, and deleting a
+file only drops a reference; the bytes are garbage-collected in the
+background (see `uploads/blobs.py`). Because a name can never point at
+different content, media is served with an immutable cache policy.
+Local URLs carry a signed access token for `legacyprime.media`.
+
+Names under `PASSTHROUGH_PREFIXES` (temporary upload parts) and files
+stored before this backend existed are handled by the wrapped backend
+as before.
+"""
+import hashlib
+import os
+from tempfile import SpooledTemporaryFile
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import Storage
+from django.utils.deconstruct import deconstructible
+from django.utils.module_loading import import_string
+
+from . import background
+
+CAS_PREFIX = 'cas/'
+PASSTHROUGH_PREFIXES = ('uploads/partial/',)
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+# Non-seekable uploads are hashed into a spool that moves to disk past this size
+SPOOL_MAX_SIZE = 1024 * 1024
+
+
+def is_content_addressed(name):
+    return bool(name) and name.startswith(CAS_PREFIX)
+
+
+def _seekable(content):
+    try:
+        return content.seekable()
+    except (AttributeError, ValueError):
+        return False
+
+
+@deconstructible
+class ContentAddressedStorage(Storage):
+    def __init__(self, backend='django.core.files.storage.FileSystemStorage', options=None):
+        self.backend_path = backend
+        self.backend_options = options or {}
+        self.backend = import_string(backend)(**self.backend_options)
+
+    # --- writes ---
+
+    def get_available_name(self, name, max_length=None):
+        # Content-addressed names never collide with different content
+        return name
+
+    def _digest(self, content):
+        """Return `(sha256 hex, size, readable content)` for `content`."""
+        sha = hashlib.sha256()
+        size = 0
+        spool = None if _seekable(content) else SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+        for chunk in content.chunks():
+            sha.update(chunk)
+            size += len(chunk)
+            if spool is not None:
+                spool.write(chunk)
+        if spool is None:
+            content.seek(0)
+            return sha.hexdigest(), size, content
+        spool.seek(0)
+        return sha.hexdigest(), size, File(spool)
+
+    def _save(self, name, content):
+        if name.startswith(PASSTHROUGH_PREFIXES):
+            return self.backend.save(name, content)
+
+        from uploads import blobs
+
+        digest, size, readable = self._digest(content)
+        ext = os.path.splitext(name)[1].lower()
+        cas_name = f'{CAS_PREFIX}{digest[:2]}/{digest[2:4]}/{digest}{ext}'
+
+        def write():
+            if self.backend.exists(cas_name):
+                return
+            stored = self.backend.save(cas_name, readable)
+            if stored != cas_name:
+                # Lost a race to write the same bytes; keep the first copy
+                self.backend.delete(stored)
+
+        blobs.add_reference(cas_name, size, write)
+        return cas_name
+
+    # --- deletes ---
+
+    def delete(self, name):
+        if not name:
+            return
+        if is_content_addressed(name):
+            from uploads import blobs
+            if blobs.release(name):
+                return
+        # Untracked file: nothing else can point at it, remove it off-request
+        background.submit_on_commit(self.backend.delete, name)
+
+    def delete_blob(self, name):
+        """Remove a blob's bytes; only the garbage collector calls this."""
+        self.backend.delete(name)
+
+    # --- reads, delegated ---
+
+    def _open(self, name, mode='rb'):
+        return self.backend.open(name, mode)
+
+    def exists(self, name):
+        return self.backend.exists(name)
+
+    def url(self, name):
+        url = self.backend.url(name)
+        if settings.MEDIA_PROTECTED and url.startswith(settings.MEDIA_URL):
+            # Served by legacyprime.media, which accepts this token in place of a login
+            from .media import sign
+            url = f'{url}?t={sign(name)}'
+        return url
+
+    def size(self, name):
+        return self.backend.size(name)
+
+    def path(self, name):
+        return self.backend.path(name)
+
+    def listdir(self, path):
+        return self.backend.listdir(path)
+
+    def get_accessed_time(self, name):
+        return self.backend.get_accessed_time(name)
+
+    def get_created_time(self, name):
+        return self.backend.get_created_time(name)
+
+    def get_modified_time(self, name):
+        return self.backend.get_modified_time(name)
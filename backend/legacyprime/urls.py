@@ -1,7 +1,7 @@
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.contrib import admin
 from django.conf import settings
-from django.conf.urls.static import static
+from .media import ProtectedMediaView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -9,7 +9,11 @@ urlpatterns = [
     path('api/transactions/', include('transactions.urls')),
     path('api/wallet/', include('wallet.urls')),
     path('api/notifications/', include('notifications.urls')),
+    path('api/uploads/', include('uploads.urls')),
 ]
 
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+# Local media is always served through the ownership check; S3 serves its own
+if settings.MEDIA_URL.startswith('/'):
+    urlpatterns += [
+        re_path(r'^%s(?P<path>.+)$' % settings.MEDIA_URL.lstrip('/'), ProtectedMediaView.as_view(), name='media'),
+    ]
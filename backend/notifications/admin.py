@@ -0,0 +1,49 @@
+from django.contrib import admin
+from . import announcements, email_queue
+from .models import Announcement, OutboundEmail
+
+
+@admin.register(Announcement)
+class AnnouncementAdmin(admin.ModelAdmin):
+    list_display = ('title', 'level', 'country', 'created_by', 'created_at', 'broadcast_at', 'expires_at')
+    list_filter = ('level',)
+    search_fields = ('title', 'message', 'country')
+    readonly_fields = ('created_by', 'created_at', 'broadcast_at')
+
+    def save_model(self, request, obj, form, change):
+        if not change:
+            obj.created_by = request.user
+        super().save_model(request, obj, form, change)
+        if change:
+            # Edits are not re-broadcast, but later clients see them
+            announcements.forget(obj)
+        else:
+            announcements.schedule(obj)
+
+    def delete_model(self, request, obj):
+        announcements.forget(obj)
+        super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        for obj in queryset:
+            announcements.forget(obj)
+        super().delete_queryset(request, queryset)
+
+
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'recipients', 'status', 'attempts', 'next_attempt_at', 'created_at', 'sent_at')
+    list_filter = ('status', 'template_name')
+    search_fields = ('subject', 'recipients', 'idempotency_key')
+    # The context can hold an OTP code
+    exclude = ('context',)
+    readonly_fields = [field.name for field in OutboundEmail._meta.fields if field.name != 'context']
+    actions = ['retry_now']
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.action(description='Retry selected emails now')
+    def retry_now(self, request, queryset):
+        count = email_queue.retry(queryset)
+        self.message_user(request, f'{count} email(s) queued again')
@@ -0,0 +1,142 @@
+"""
+System-wide announcements.
+
+Sending one `group_send` per `user_{id}` group would cost a message per
+user. Instead every realtime connection also joins:
+
+- one of ANNOUNCEMENT_SHARDS global shard groups (`user_id % shards`),
+- a segment group for the user's country, if they have one.
+
+`broadcast()` runs on the background pool once the announcement is
+committed. A global announcement is sent to the shard groups one at a
+time, so no single `group_send` has to reach every socket at once and
+the event loop serves other connections in between. A country
+announcement is a single `group_send` to its segment group.
+
+Clients that connect later call `latest_for()` (via the
+`announcements/latest/` endpoint). It is answered from the cache, which
+is written on broadcast.
+"""
+import asyncio
+
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.text import slugify
+
+from legacyprime import background
+from . import dispatch
+from .models import Announcement
+
+EVENT_TYPE = 'announcement'
+LATEST_KEY_TEMPLATE = 'notifications:announcement:latest:{segment}'
+GLOBAL_SEGMENT = '*'
+
+
+def segment(country):
+    """Group-name-safe key for a country; '' if none."""
+    return slugify(country)[:60]
+
+
+def shard_group(user_id):
+    return f'announcements_{user_id % settings.ANNOUNCEMENT_SHARDS}'
+
+
+def country_group(country):
+    return f'announcements_country_{segment(country)}'
+
+
+def groups_for(user):
+    """Announcement groups a connection of `user` joins."""
+    groups = [shard_group(user.pk)]
+    if segment(getattr(user, 'country', '')):
+        groups.append(country_group(user.country))
+    return groups
+
+
+def target_groups(announcement):
+    if announcement.country:
+        return [country_group(announcement.country)]
+    return [f'announcements_{shard}' for shard in range(settings.ANNOUNCEMENT_SHARDS)]
+
+
+def serialize(announcement):
+    return {
+        'id': announcement.pk,
+        'title': announcement.title,
+        'message': announcement.message,
+        'level': announcement.level,
+        'country': announcement.country,
+        'created_at': announcement.created_at.isoformat(),
+        'expires_at': announcement.expires_at.isoformat() if announcement.expires_at else None,
+    }
+
+
+def schedule(announcement):
+    """Broadcast `announcement` from the background pool once the transaction commits."""
+    background.submit_on_commit(broadcast, announcement.pk)
+
+
+async def _send_chunked(layer, groups, message):
+    for group in groups:
+        await layer.group_send(group, message)
+        # Let the loop serve other connections between shards
+        await asyncio.sleep(0)
+
+
+def broadcast(announcement_id):
+    announcement = Announcement.objects.filter(pk=announcement_id).first()
+    if announcement is None:
+        return
+    remember(announcement)
+    layer = get_channel_layer()
+    if layer is not None:
+        message = {'type': EVENT_TYPE, 'data': serialize(announcement)}
+        dispatch.run_on_loop(_send_chunked, layer, target_groups(announcement), message)
+    Announcement.objects.filter(pk=announcement_id).update(broadcast_at=timezone.now())
+
+
+def _key(country):
+    return LATEST_KEY_TEMPLATE.format(segment=segment(country) or GLOBAL_SEGMENT)
+
+
+def remember(announcement):
+    """Make `announcement` the cached latest one of its segment."""
+    cache.set(_key(announcement.country), serialize(announcement), None)
+
+
+def forget(announcement):
+    cache.delete(_key(announcement.country))
+
+
+def _load_latest(country):
+    announcement = Announcement.objects.filter(country__iexact=country).order_by('-id').first()
+    # False rather than None so "nothing yet" is cached too
+    return serialize(announcement) if announcement else False
+
+
+def latest_for(user):
+    """The newest unexpired announcement addressed to `user`, as a dict, or None."""
+    countries = ['']
+    if segment(getattr(user, 'country', '')):
+        countries.append(user.country)
+    keys = {_key(country): country for country in countries}
+    cached = cache.get_many(list(keys))
+
+    candidates = []
+    for key, country in keys.items():
+        value = cached.get(key)
+        if value is None:
+            value = _load_latest(country)
+            cache.set(key, value, None)
+        if value:
+            candidates.append(value)
+
+    now = timezone.now()
+    current = [
+        value for value in candidates
+        if value['expires_at'] is None or parse_datetime(value['expires_at']) > now
+    ]
+    return max(current, key=lambda value: value['id']) if current else None
@@ -5,3 +5,6 @@ class NotificationsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'notifications'
     verbose_name = 'LegacyPrime Notifications'
+
+    def ready(self):
+        import notifications.signals  # Import signals
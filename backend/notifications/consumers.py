@@ -1,51 +1,152 @@
+import asyncio
+
 from channels.generic.websocket import AsyncJsonWebsocketConsumer
 from channels.db import database_sync_to_async
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import AnonymousUser
-from django.middleware.csrf import CsrfViewMiddleware
-from asgiref.sync import async_to_sync
+from django.conf import settings
+from urllib.parse import parse_qs
+
+from . import announcements, dispatch, metrics, outbox
 
 User = get_user_model()
 
+# Consumer handler (channel-layer message type) -> frame type sent to the client
+FRAME_TYPES = {
+    'transaction_update': 'transaction_update',
+    'balance_update': 'balance_update',
+    'notification_update': 'notification',
+    'announcement': 'announcement',
+}
+# Close code for clients that cannot keep up; they reconnect with last_seq
+SLOW_CLIENT_CLOSE_CODE = 4008
+
 class UserNotificationConsumer(AsyncJsonWebsocketConsumer):
+    """
+    Per-user realtime feed.
+
+    Events are not written to the socket from the channel-layer handlers.
+    They go into a per-connection buffer that a flusher task drains
+    NOTIFICATION_BATCH_WINDOW_MS after the first event arrives, so a burst
+    leaves as one `batch` frame. A pending `balance_update` is replaced by
+    a newer one. A client whose buffer grows past
+    NOTIFICATION_BUFFER_HIGH_WATER (because sends to it are not completing)
+    is disconnected instead of being buffered without limit.
+    """
+    pending = ()
+    flusher = None
+
     async def connect(self):
-        # Get token from query string
-        query_string = self.scope.get('query_string', b'').decode()
-        params = dict(param.split('=') for param in query_string.split('&') if param)
-        
-        if 'token' not in params:
-            await self.close()
-            return
-            
-        # Get token and validate it's a proper CSRF token
-        token = params['token']
-        csrf = CsrfViewMiddleware()
-        
-        # If token is valid, get the associated user from the session
-        if not csrf._check_token(token):
-            await self.close()
-            return
-            
-        # Get user from the session and validate
+        # Authenticated by JWTAuthMiddleware, which refuses the handshake
+        # without a valid access token
         user = self.scope.get('user', AnonymousUser())
         if not user or user.is_anonymous:
             await self.close()
             return
-        
+
+        self.replayed = set()
+        self.pending = []
+        dispatch.bind_loop()
+
         # Join user-specific group
         self.user_group_name = f"user_{user.id}"
         await self.channel_layer.group_add(
             self.user_group_name,
             self.channel_name
         )
+        # System-wide announcements: a shard of the global audience, plus
+        # the user's country segment
+        self.announcement_groups = announcements.groups_for(user)
+        for group in self.announcement_groups:
+            await self.channel_layer.group_add(group, self.channel_name)
         await self.accept()
 
+        # Reconnecting clients pass the `seq` of the last event they saw
+        params = parse_qs(self.scope.get('query_string', b'').decode())
+        last_seq = params.get('last_seq', [''])[0]
+        if last_seq.isdigit():
+            await self.replay(user.id, int(last_seq))
+
+    async def replay(self, user_id, last_seq):
+        """Send everything after `last_seq` as one `replay` frame."""
+        events, resync = await database_sync_to_async(outbox.replay)(
+            user_id, last_seq, settings.NOTIFICATION_REPLAY_LIMIT
+        )
+        self.replayed = {event['seq'] for event in events}
+        await self.send_json({
+            'type': 'replay',
+            'events': [self.frame(event) for event in events],
+            'resync': resync,
+        })
+
+    def frame(self, event):
+        frame = {'type': FRAME_TYPES[event['type']], 'data': event['data']}
+        if 'seq' in event:
+            frame['seq'] = event['seq']
+        return frame
+
+    async def forward(self, event):
+        # Events already sent by the replay may also arrive live. Only those
+        # are skipped: seqs are ids allocated by several workers, so live
+        # events can arrive out of order, and a lower seq is not a duplicate
+        seq = event.get('seq')
+        if seq is not None and seq in self.replayed:
+            self.replayed.discard(seq)
+            return
+
+        frame = self.frame(event)
+        if frame['type'] == 'balance_update':
+            # Only the latest balance matters
+            superseded = [f for f in self.pending if f['type'] == 'balance_update']
+            if superseded:
+                self.pending = [f for f in self.pending if f['type'] != 'balance_update']
+                metrics.count('events_coalesced', len(superseded))
+                metrics.buffer_changed(-len(superseded))
+        self.pending.append(frame)
+        metrics.buffer_changed(1)
+
+        if len(self.pending) > settings.NOTIFICATION_BUFFER_HIGH_WATER:
+            await self.drop_slow_client()
+        elif self.flusher is None:
+            self.flusher = asyncio.ensure_future(self.flush())
+
+    async def flush(self):
+        await asyncio.sleep(settings.NOTIFICATION_BATCH_WINDOW_MS / 1000)
+        try:
+            # Whatever arrives while a frame is being sent goes in the next one
+            while self.pending:
+                frames, self.pending = self.pending, []
+                metrics.buffer_changed(-len(frames))
+                if len(frames) == 1:
+                    await self.send_json(frames[0])
+                else:
+                    await self.send_json({'type': 'batch', 'events': frames})
+                metrics.count('frames_sent')
+                metrics.count('events_sent', len(frames))
+        finally:
+            self.flusher = None
+
+    async def drop_slow_client(self):
+        metrics.count('slow_disconnects')
+        self.discard_pending()
+        await self.close(code=SLOW_CLIENT_CLOSE_CODE)
+
+    def discard_pending(self):
+        if self.flusher is not None:
+            self.flusher.cancel()
+            self.flusher = None
+        metrics.buffer_changed(-len(self.pending))
+        self.pending = []
+
     async def disconnect(self, close_code):
+        self.discard_pending()
         if hasattr(self, 'user_group_name'):
             await self.channel_layer.group_discard(
                 self.user_group_name,
                 self.channel_name
             )
+        for group in getattr(self, 'announcement_groups', ()):
+            await self.channel_layer.group_discard(group, self.channel_name)
 
     async def receive_json(self, content):
         # Handle any messages from client if needed
@@ -53,21 +154,22 @@ class UserNotificationConsumer(AsyncJsonWebsocketConsumer):
 
     async def transaction_update(self, event):
         """Handle transaction updates (deposits/withdrawals)"""
-        await self.send_json({
-            'type': 'transaction_update',
-            'data': event['data']
-        })
-    
+        await self.forward(event)
+
     async def balance_update(self, event):
         """Handle balance updates"""
-        await self.send_json({
-            'type': 'balance_update',
-            'data': event['data']
-        })
-    
+        await self.forward(event)
+
     async def notification_update(self, event):
         """Handle general notifications"""
-        await self.send_json({
-            'type': 'notification',
-            'data': event['data']
-        })
\ No newline at end of file
+        await self.forward(event)
+
+    async def announcement(self, event):
+        """Handle system-wide announcements"""
+        await self.forward(event)
+
+    async def notification_batch(self, event):
+        """Handle several events coalesced into one channel-layer message"""
+        for item in event['events']:
+            if item['type'] in FRAME_TYPES:
+                await self.forward(item)
@@ -0,0 +1,258 @@
+"""
+Batched, commit-deferred delivery of realtime events.
+
+Events for a user's WebSocket group (`user_{id}`) are never sent by the
+code that produces them:
+
+- `queue()` registers the event with `transaction.on_commit`, so nothing
+  is announced for work that is rolled back;
+- inside `batch()` events are held until the block exits and are then
+  handed over together (still after commit);
+- committed events land in one process-wide pending list that a single
+  background task drains. Each drain groups the events by user and makes
+  one `group_send` per user, however many events the commits produced.
+  Only the last `balance_update` of a user is kept, and a balance queued
+  without a value is read from the wallet when it is sent.
+
+Before sending, each drain writes its events to the `OutboxEvent` table
+in one insert; the row id becomes the event's `seq`, which clients send
+back as `last_seq` to have missed events replayed on reconnect. The
+insert is retried with backoff (SQLite refuses writes while another
+transaction holds the lock), because a lost row cannot be replayed; the
+channel-layer send is best-effort. Events still pending when the process
+exits are delivered by `flush()`, registered with atexit.
+
+The channel layer is only called from the shared background pool, never
+from the request thread. When the process also serves WebSockets (the
+ASGI worker), the sends are run on the server's event loop, registered by
+`bind_loop()`: InMemoryChannelLayer only wakes receivers on that loop,
+and channels_redis keeps its connection pool per loop.
+"""
+import asyncio
+import atexit
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from channels.layers import get_channel_layer
+from django.db import DatabaseError, transaction
+
+from legacyprime import background
+from .models import OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+# Channel-layer message carrying several events; handled by
+# UserNotificationConsumer.notification_batch
+BATCH_TYPE = 'notification.batch'
+BALANCE_TYPE = 'balance_update'
+# Seconds a drain waits for the server loop to finish its sends
+SEND_TIMEOUT = 30
+# Outbox inserts: attempts, and the first delay (doubled after each failure)
+STORE_ATTEMPTS = 5
+STORE_RETRY_SECONDS = 0.1
+
+_local = threading.local()
+_pending = []
+_pending_lock = threading.Lock()
+_draining = False
+_loop = None
+
+
+def _reset_after_fork():
+    global _pending, _pending_lock, _draining, _loop
+    _pending = []
+    _pending_lock = threading.Lock()
+    _draining = False
+    _loop = None
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def bind_loop():
+    """Route channel-layer sends through the running event loop (call from async consumers)."""
+    global _loop
+    _loop = asyncio.get_running_loop()
+
+
+def run_on_loop(coroutine_function, *args):
+    """Run `coroutine_function(*args)` on the bound server loop if it is running, else on a new one."""
+    loop = _loop
+    if loop is not None and loop.is_running():
+        return asyncio.run_coroutine_threadsafe(coroutine_function(*args), loop).result(SEND_TIMEOUT)
+    # Not async_to_sync: it needs a new executor future, which is refused
+    # once interpreter shutdown has begun (management commands exiting)
+    return asyncio.run(coroutine_function(*args))
+
+
+def group_name(user_id):
+    return f'user_{user_id}'
+
+
+def queue(user_id, event):
+    """Send `event` (a consumer message: `{'type': ..., 'data': ...}`) to `user_id` after commit."""
+    buffer = getattr(_local, 'buffer', None)
+    if buffer is not None:
+        buffer.append((user_id, event))
+    else:
+        transaction.on_commit(lambda: _enqueue([(user_id, event)]))
+
+
+@contextmanager
+def batch():
+    """
+    Collect the events queued in the block and hand them over together
+    once it exits without error. Nested blocks join the outer one.
+    """
+    if getattr(_local, 'buffer', None) is not None:
+        yield
+        return
+
+    _local.buffer = buffer = []
+    try:
+        yield
+    finally:
+        _local.buffer = None
+    # Only reached when the block did not raise
+    if buffer:
+        transaction.on_commit(lambda: _enqueue(buffer))
+
+
+def _enqueue(events):
+    global _draining
+    with _pending_lock:
+        _pending.extend(events)
+        if _draining:
+            return
+        _draining = True
+    try:
+        background.submit(_drain)
+    except RuntimeError:
+        # The interpreter is shutting down; flush() delivers them at exit
+        with _pending_lock:
+            _draining = False
+
+
+def _drain():
+    global _draining
+    while True:
+        with _pending_lock:
+            if not _pending:
+                _draining = False
+                return
+            events = _pending[:]
+            _pending.clear()
+        _deliver(events)
+
+
+def flush():
+    """Deliver the pending events on the calling thread (run at exit)."""
+    while True:
+        with _pending_lock:
+            events = _pending[:]
+            _pending.clear()
+        if not events:
+            return
+        _deliver(events)
+
+
+atexit.register(flush)
+
+
+def _deliver(events):
+    # Never raises: one broken batch must not stall later events
+    try:
+        _send(events)
+    except Exception:
+        logger.exception('Failed to deliver %d realtime event(s)', len(events))
+
+
+def coalesce(events):
+    """Group `(user_id, event)` pairs by user, keeping only each user's last balance update."""
+    by_user = {}
+    for user_id, event in events:
+        by_user.setdefault(user_id, []).append(event)
+    for user_id, user_events in by_user.items():
+        balances = [e for e in user_events if e['type'] == BALANCE_TYPE]
+        if len(balances) > 1:
+            by_user[user_id] = [e for e in user_events if e['type'] != BALANCE_TYPE or e is balances[-1]]
+    return by_user
+
+
+def _fill_balances(by_user):
+    from wallet.models import Wallet
+
+    missing = {
+        user_id for user_id, user_events in by_user.items()
+        for event in user_events if event['type'] == BALANCE_TYPE and event['data'] is None
+    }
+    if not missing:
+        return
+    balances = dict(Wallet.objects.filter(user_id__in=missing).values_list('user_id', 'balance'))
+    for user_id, user_events in by_user.items():
+        if user_id not in missing:
+            continue
+        by_user[user_id] = [
+            {**event, 'data': {'balance': str(balances.get(user_id, '0.00'))}}
+            if event['type'] == BALANCE_TYPE and event['data'] is None else event
+            for event in user_events
+        ]
+
+
+def _store(by_user):
+    """Persist the events to the outbox and tag each with its `seq`."""
+    rows = [
+        OutboxEvent(user_id=user_id, type=event['type'], data=event['data'])
+        for user_id, user_events in by_user.items() for event in user_events
+    ]
+    OutboxEvent.objects.bulk_create(rows)
+    sequence = iter(rows)
+    for user_id, user_events in by_user.items():
+        by_user[user_id] = [{**event, 'seq': next(sequence).pk} for event in user_events]
+
+
+def messages(by_user):
+    """One channel-layer message per user: the event itself, or a batch of them."""
+    for user_id, user_events in by_user.items():
+        if len(user_events) == 1:
+            yield group_name(user_id), user_events[0]
+        else:
+            yield group_name(user_id), {'type': BATCH_TYPE, 'events': user_events}
+
+
+async def _group_send_all(layer, outgoing):
+    for group, message in outgoing:
+        await layer.group_send(group, message)
+
+
+def _store_with_retry(by_user):
+    for attempt in range(STORE_ATTEMPTS):
+        try:
+            _fill_balances(by_user)
+            _store(by_user)
+            return
+        except DatabaseError:
+            if attempt == STORE_ATTEMPTS - 1:
+                raise
+            time.sleep(STORE_RETRY_SECONDS * 2 ** attempt)
+
+
+def _send(events):
+    layer = get_channel_layer()
+    if layer is None:
+        return
+    by_user = coalesce(events)
+    try:
+        _store_with_retry(by_user)
+    except DatabaseError:
+        # Still sent live below, without a `seq`; these cannot be replayed
+        logger.exception('Failed to store %d realtime event(s) in the outbox', len(events))
+    try:
+        run_on_loop(_group_send_all, layer, list(messages(by_user)))
+    except Exception:
+        # Stored events reach clients through replay when they reconnect
+        logger.exception('Failed to send %d realtime event(s)', len(events))
@@ -0,0 +1,242 @@
+"""
+Persistent queue for transactional email.
+
+API views call `enqueue()` and return: rendering the templates and the
+provider call (SendGrid) happen off the request path.
+
+- `enqueue()` stores an OutboundEmail with `get_or_create` on its
+  idempotency key and, with EMAIL_QUEUE_SEND_ON_ENQUEUE, hands it to the
+  background pool once the transaction commits.
+- `run_worker()` (the `process_email_queue` command) claims due messages
+  and sends them on a pool of EMAIL_QUEUE_WORKERS threads.
+- Without that worker, `sweep()` does the same from the background pool
+  at most once per EMAIL_QUEUE_SWEEP_INTERVAL_SECONDS. `enqueue()`
+  schedules it, and it schedules itself again while anything is pending.
+- A failed attempt is retried after an exponential backoff with jitter.
+  After EMAIL_QUEUE_MAX_ATTEMPTS the message is marked dead.
+
+The template context (an OTP code, say) is cleared once a message is
+sent or dead, and `purge()` (the `purge_emails` command) deletes those
+rows after EMAIL_QUEUE_RETENTION_HOURS.
+
+A message is claimed (queued -> sending) under SELECT ... FOR UPDATE SKIP
+LOCKED where the database has it, otherwise by a conditional UPDATE, so
+no two workers send it at the same time. Delivery is at-least-once: a
+worker that dies mid-send leaves the row 'sending', and it is picked up
+again after EMAIL_QUEUE_CLAIM_TIMEOUT_SECONDS.
+"""
+import hashlib
+import json
+import logging
+import random
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from legacyprime import background
+from .models import OutboundEmail
+from .utils import send_transactional_email
+
+logger = logging.getLogger(__name__)
+
+SWEEP_LOCK_KEY = 'email_queue:sweep:scheduled'
+PURGE_BATCH_SIZE = 1000
+
+
+def _default_key(subject, recipients, template_name, context):
+    payload = json.dumps([subject, recipients, template_name, context], sort_keys=True, default=str)
+    return 'sha256:' + hashlib.sha256(payload.encode()).hexdigest()
+
+
+def enqueue(subject, recipient_list, template_name, context=None, from_email=None, idempotency_key=None):
+    """
+    Store an email for delivery; returns `(email, created)`.
+
+    Enqueueing again with the same `idempotency_key` (by default a hash of
+    the message itself) returns the existing row and sends nothing new.
+    `context` must be JSON-serializable.
+    """
+    recipients = list(recipient_list)
+    context = context or {}
+    key = idempotency_key or _default_key(subject, recipients, template_name, context)
+    email, created = OutboundEmail.objects.get_or_create(idempotency_key=key, defaults={
+        'subject': subject,
+        'recipients': recipients,
+        'template_name': template_name,
+        'context': context,
+        'from_email': from_email or '',
+    })
+    if created and settings.EMAIL_QUEUE_SEND_ON_ENQUEUE:
+        background.submit_on_commit(send_now, email.pk)
+    transaction.on_commit(schedule_sweep)
+    return email, created
+
+
+def _due(now):
+    stale = now - timedelta(seconds=settings.EMAIL_QUEUE_CLAIM_TIMEOUT_SECONDS)
+    return (
+        Q(status=OutboundEmail.STATUS_QUEUED, next_attempt_at__lte=now)
+        | Q(status=OutboundEmail.STATUS_SENDING, claimed_at__lt=stale)
+    )
+
+
+def _mark_claimed(queryset, now):
+    return queryset.update(status=OutboundEmail.STATUS_SENDING, claimed_at=now, attempts=F('attempts') + 1)
+
+
+def claim(limit):
+    """Claim up to `limit` due messages for the caller; returns their ids."""
+    now = timezone.now()
+    due = OutboundEmail.objects.filter(_due(now)).order_by('next_attempt_at')
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            ids = list(due.select_for_update(skip_locked=True).values_list('pk', flat=True)[:limit])
+            _mark_claimed(OutboundEmail.objects.filter(pk__in=ids), now)
+        return ids
+    # A row another worker claimed first matches nothing here
+    return [
+        pk for pk in due.values_list('pk', flat=True)[:limit]
+        if _mark_claimed(OutboundEmail.objects.filter(_due(now), pk=pk), now)
+    ]
+
+
+def send_now(email_id):
+    """Claim and send one message if it is still due."""
+    now = timezone.now()
+    if _mark_claimed(OutboundEmail.objects.filter(_due(now), pk=email_id), now):
+        deliver(email_id)
+
+
+def backoff(attempt):
+    """Seconds to wait after failed attempt number `attempt` (1-based)."""
+    delay = min(
+        settings.EMAIL_QUEUE_BACKOFF_BASE_SECONDS * 2 ** (attempt - 1),
+        settings.EMAIL_QUEUE_BACKOFF_MAX_SECONDS,
+    )
+    # Jitter, so messages failed by one provider outage do not retry in one burst
+    return delay * random.uniform(0.5, 1)
+
+
+def deliver(email_id):
+    """Send a claimed message and record the outcome; returns True if sent."""
+    email = OutboundEmail.objects.get(pk=email_id)
+    try:
+        sent = send_transactional_email(
+            subject=email.subject,
+            recipient_list=email.recipients,
+            template_name=email.template_name,
+            context=email.context,
+            from_email=email.from_email or None,
+        )
+        if not sent:
+            raise RuntimeError('The email backend sent no messages')
+    except Exception as exc:
+        _failed(email, exc)
+        return False
+    OutboundEmail.objects.filter(pk=email.pk).update(
+        status=OutboundEmail.STATUS_SENT, sent_at=timezone.now(), last_error='', context={},
+    )
+    return True
+
+
+def _failed(email, exc):
+    error = f'{type(exc).__name__}: {exc}'[:2000]
+    if email.attempts >= settings.EMAIL_QUEUE_MAX_ATTEMPTS:
+        logger.error('Giving up on email %s after %s attempts: %s', email.pk, email.attempts, error)
+        OutboundEmail.objects.filter(pk=email.pk).update(
+            status=OutboundEmail.STATUS_DEAD, last_error=error, context={},
+        )
+        return
+    OutboundEmail.objects.filter(pk=email.pk).update(
+        status=OutboundEmail.STATUS_QUEUED,
+        last_error=error,
+        next_attempt_at=timezone.now() + timedelta(seconds=backoff(email.attempts)),
+    )
+
+
+def retry(queryset):
+    """
+    Queue the given messages again now, with a fresh set of attempts.
+    Sent and dead messages have lost their context and are left alone.
+    """
+    return queryset.exclude(status__in=(OutboundEmail.STATUS_SENT, OutboundEmail.STATUS_DEAD)).update(
+        status=OutboundEmail.STATUS_QUEUED, attempts=0, next_attempt_at=timezone.now(),
+    )
+
+
+def schedule_sweep():
+    """Run `sweep()` on the background pool, at most once per EMAIL_QUEUE_SWEEP_INTERVAL_SECONDS."""
+    interval = settings.EMAIL_QUEUE_SWEEP_INTERVAL_SECONDS
+    if interval and cache.add(SWEEP_LOCK_KEY, True, interval):
+        background.submit(sweep)
+
+
+def sweep():
+    """
+    Hand due messages (retries and stale claims) to the background pool,
+    up to EMAIL_QUEUE_WORKERS at a time, and schedule the next sweep
+    while anything is still queued or being sent.
+    """
+    for email_id in claim(settings.EMAIL_QUEUE_WORKERS):
+        background.submit(deliver, email_id)
+    pending = (OutboundEmail.STATUS_QUEUED, OutboundEmail.STATUS_SENDING)
+    if OutboundEmail.objects.filter(status__in=pending).exists():
+        timer = threading.Timer(settings.EMAIL_QUEUE_SWEEP_INTERVAL_SECONDS, schedule_sweep)
+        timer.daemon = True
+        timer.start()
+
+
+def purge(before, batch_size=PURGE_BATCH_SIZE):
+    """Delete sent and dead messages created before `before`, a batch at a time. Returns the count."""
+    done = (OutboundEmail.STATUS_SENT, OutboundEmail.STATUS_DEAD)
+    total = 0
+    while True:
+        ids = list(
+            OutboundEmail.objects
+            .filter(status__in=done, created_at__lt=before)
+            .order_by('created_at')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return total
+        total += OutboundEmail.objects.filter(id__in=ids).delete()[0]
+
+
+def _deliver_in_thread(email_id):
+    try:
+        return deliver(email_id)
+    except Exception:
+        logger.exception('Email %s could not be delivered', email_id)
+        return False
+    finally:
+        connections.close_all()
+
+
+def run_worker(workers, poll_seconds, stop=None, once=False):
+    """
+    Claim and send due messages on `workers` threads until `stop` (a
+    threading.Event) is set, or with `once` until nothing is due.
+    Returns the number of messages sent.
+    """
+    stop = stop or threading.Event()
+    in_flight = set()
+    sent = 0
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='email') as executor:
+        while not stop.is_set():
+            if len(in_flight) < workers:
+                for email_id in claim(workers - len(in_flight)):
+                    in_flight.add(executor.submit(_deliver_in_thread, email_id))
+            if not in_flight:
+                if once:
+                    break
+                stop.wait(poll_seconds)
+                continue
+            done, in_flight = wait(in_flight, timeout=poll_seconds, return_when=FIRST_COMPLETED)
+            sent += sum(future.result() for future in done)
+    return sent + sum(future.result() for future in in_flight)
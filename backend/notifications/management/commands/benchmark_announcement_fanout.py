@@ -0,0 +1,122 @@
+import asyncio
+import time
+import uuid
+
+from asgiref.sync import async_to_sync
+from channels.layers import InMemoryChannelLayer
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+
+from notifications import announcements, dispatch
+from notifications.models import Announcement
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark announcement fan-out to many subscribed channels through '
+        'the sharded groups, against one group_send per user, on the in-memory '
+        'or Redis channel layer'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sockets', type=int, default=50000, help='Subscribed channels')
+        parser.add_argument('--shards', type=int, default=settings.ANNOUNCEMENT_SHARDS)
+        parser.add_argument('--layer', choices=('memory', 'redis'), default='memory')
+        parser.add_argument('--redis-url', default='redis://127.0.0.1:6379/0')
+        parser.add_argument(
+            '--baseline-sample', type=int, default=1000,
+            help='Users sent to one by one for the per-user baseline (extrapolated to all; 0 to skip)',
+        )
+
+    def handle(self, *args, **options):
+        layer = self._layer(options)
+        with override_settings(ANNOUNCEMENT_SHARDS=options['shards']):
+            async_to_sync(self._run)(layer, options)
+
+    def _layer(self, options):
+        # Large enough that no channel drops a message during the run
+        if options['layer'] == 'memory':
+            return InMemoryChannelLayer(capacity=10, group_expiry=3600)
+        try:
+            from channels_redis.core import RedisChannelLayer
+        except ImportError:
+            raise CommandError('channels_redis is not installed')
+        return RedisChannelLayer(
+            hosts=[options['redis_url']], prefix=f'fanout-bench-{uuid.uuid4().hex[:8]}',
+            capacity=10, group_expiry=600,
+        )
+
+    async def _run(self, layer, options):
+        count = options['sockets']
+        # Unsaved: everyone, no country segment
+        announcement = Announcement(title='Benchmark', message='Fan-out benchmark')
+        message = {'type': announcements.EVENT_TYPE, 'data': {'id': 0, 'title': announcement.title}}
+
+        started = time.perf_counter()
+        try:
+            channels = [await layer.new_channel() for _ in range(count)]
+            for user_id, channel in enumerate(channels):
+                await layer.group_add(announcements.shard_group(user_id), channel)
+        except Exception as exc:
+            raise CommandError(f'Cannot reach the channel layer: {exc}') from exc
+        self.stdout.write(f'{count} channels subscribed in {time.perf_counter() - started:.2f}s')
+
+        groups = announcements.target_groups(announcement)
+        elapsed, delivered = await self._measure(
+            layer, channels, announcements._send_chunked(layer, groups, message),
+        )
+        self._report(f'sharded broadcast ({len(groups)} group_send)', count, elapsed, delivered)
+
+        # What it costs without shard groups: one group_send per user group
+        sample = channels[:options['baseline_sample']]
+        if sample:
+            for user_id, channel in enumerate(sample):
+                await layer.group_add(dispatch.group_name(user_id), channel)
+
+            async def per_user():
+                for user_id in range(len(sample)):
+                    await layer.group_send(dispatch.group_name(user_id), message)
+
+            elapsed, delivered = await self._measure(layer, sample, per_user())
+            self._report(f'per-user groups ({len(sample)} group_send)', len(sample), elapsed, delivered)
+            self.stdout.write(f'  extrapolated to {count} users: {elapsed[1] * count / len(sample):.1f}s')
+
+        await layer.flush()
+
+    async def _measure(self, layer, channels, sending):
+        """Time from the first send until every channel has received one message."""
+        started = time.perf_counter()
+        if isinstance(layer, InMemoryChannelLayer):
+            # InMemoryChannelLayer.receive() scans every channel and group on
+            # each call, which would make the check itself quadratic: count
+            # the queued messages instead
+            await sending
+            sent_at = time.perf_counter() - started
+            delivered = 0
+            for channel in channels:
+                queue = layer.channels.get(channel)
+                if queue is not None and not queue.empty():
+                    queue.get_nowait()
+                    delivered += 1
+            return (sent_at, time.perf_counter() - started), delivered
+
+        sent_at = None
+
+        async def send():
+            nonlocal sent_at
+            await sending
+            sent_at = time.perf_counter() - started
+
+        receivers = [layer.receive(channel) for channel in channels]
+        results = await asyncio.gather(send(), *receivers, return_exceptions=True)
+        delivered = sum(1 for result in results[1:] if isinstance(result, dict))
+        return (sent_at, time.perf_counter() - started), delivered
+
+    def _report(self, label, count, elapsed, delivered):
+        sent, done = elapsed
+        style = self.style.SUCCESS if delivered == count else self.style.ERROR
+        self.stdout.write(style(
+            f'{label}: sends finished in {sent * 1000:.0f}ms, all delivered in {done * 1000:.0f}ms '
+            f'({delivered / done:.0f} deliveries/s), {delivered}/{count} delivered'
+        ))
@@ -0,0 +1,151 @@
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from rest_framework.test import APIRequestFactory
+
+from accounts.models import OTP
+from accounts.views_password_reset import RequestPasswordResetView
+from legacyprime.fake_email_backend import FakeProviderBackend
+from notifications import email_queue
+from notifications.models import OutboundEmail
+from notifications.utils import send_transactional_email
+
+User = get_user_model()
+
+
+def _percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def _summary(values):
+    return (
+        f'p50 {_percentile(values, 0.5) * 1000:.0f}ms, p99 {_percentile(values, 0.99) * 1000:.0f}ms, '
+        f'max {max(values, default=0) * 1000:.0f}ms'
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark password-reset requests end to end against a local fake '
+        'email provider: request latency with an inline send, and request '
+        'plus enqueue-to-delivery latency through the email queue'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--emails', type=int, default=200, help='Password-reset requests through the queue')
+        parser.add_argument('--inline-sample', type=int, default=20, help='Inline sends for the baseline (0 to skip)')
+        parser.add_argument('--delay-ms', type=int, default=200, help='Fake provider time per message')
+        parser.add_argument('--failure-rate', type=float, default=0.0, help='Fake provider failure probability')
+        parser.add_argument('--workers', type=int, default=settings.EMAIL_QUEUE_WORKERS)
+        parser.add_argument('--poll-seconds', type=float, default=0.05)
+        parser.add_argument('--backoff-base', type=int, default=1, help='EMAIL_QUEUE_BACKOFF_BASE_SECONDS for the run')
+        parser.add_argument(
+            '--send-on-enqueue', action='store_true',
+            help='Also send from the background pool right after enqueue (EMAIL_QUEUE_SEND_ON_ENQUEUE)',
+        )
+        parser.add_argument('--timeout', type=float, default=120.0, help='Give up waiting for delivery after this long')
+
+    def handle(self, *args, **options):
+        overrides = {
+            'EMAIL_BACKEND': 'legacyprime.fake_email_backend.FakeProviderBackend',
+            'EMAIL_FAKE_PROVIDER_DELAY_MS': options['delay_ms'],
+            'EMAIL_FAKE_PROVIDER_FAILURE_RATE': options['failure_rate'],
+            'EMAIL_QUEUE_SEND_ON_ENQUEUE': options['send_on_enqueue'],
+            'EMAIL_QUEUE_BACKOFF_BASE_SECONDS': options['backoff_base'],
+            # Only the worker under test sends
+            'EMAIL_QUEUE_SWEEP_INTERVAL_SECONDS': 0,
+        }
+        run_id = uuid.uuid4().hex[:8]
+        emails = [f'emailbench-{run_id}-{i}@example.com' for i in range(options['emails'])]
+        User.objects.bulk_create([
+            User(email=email, username=f'emailbench-{run_id}-{i}', is_active=True)
+            for i, email in enumerate(emails)
+        ])
+        try:
+            with override_settings(**overrides):
+                if options['inline_sample']:
+                    self._inline(options)
+                self._queued(emails, options)
+        finally:
+            keys = [f'otp:{pk}' for pk in OTP.objects.filter(email__in=emails).values_list('pk', flat=True)]
+            OutboundEmail.objects.filter(idempotency_key__in=keys).delete()
+            OTP.objects.filter(email__in=emails).delete()
+            User.objects.filter(email__in=emails).delete()
+
+    def _inline(self, options):
+        """What each request cost when the view sent the email itself."""
+        latencies = []
+        failures = 0
+        for i in range(options['inline_sample']):
+            started = time.perf_counter()
+            try:
+                send_transactional_email(
+                    subject=f'{settings.PROJECT_NAME} - Password Reset Code',
+                    recipient_list=[f'inline-{i}@example.com'],
+                    template_name='notifications/otp_email.html',
+                    context={'project_name': settings.PROJECT_NAME, 'otp_code': '123456'},
+                )
+            except ConnectionError:
+                # The view answered 500
+                failures += 1
+            latencies.append(time.perf_counter() - started)
+        self.stdout.write(
+            f'inline send: request {_summary(latencies)}, '
+            f'{failures}/{len(latencies)} requests failed with the provider'
+        )
+
+    def _queued(self, emails, options):
+        FakeProviderBackend.accepted.clear()
+        view = RequestPasswordResetView.as_view()
+        factory = APIRequestFactory()
+        stop = threading.Event()
+        worker = threading.Thread(
+            target=email_queue.run_worker, args=(options['workers'], options['poll_seconds'], stop),
+        )
+        worker.start()
+        try:
+            request_latencies = []
+            started = time.perf_counter()
+            for email in emails:
+                request = factory.post('/api/accounts/request-password-reset/', {'email': email}, format='json')
+                request_started = time.perf_counter()
+                response = view(request)
+                request_latencies.append(time.perf_counter() - request_started)
+                if response.status_code != 200:
+                    self.stderr.write(f'{email}: HTTP {response.status_code} {response.data}')
+
+            keys = [f'otp:{pk}' for pk in OTP.objects.filter(email__in=emails).values_list('pk', flat=True)]
+            queued = OutboundEmail.objects.filter(idempotency_key__in=keys)
+            pending = (OutboundEmail.STATUS_QUEUED, OutboundEmail.STATUS_SENDING)
+            deadline = time.monotonic() + options['timeout']
+            while queued.filter(status__in=pending).exists() and time.monotonic() < deadline:
+                time.sleep(0.05)
+            elapsed = time.perf_counter() - started
+        finally:
+            stop.set()
+            worker.join()
+
+        created = {row.recipients[0]: row.created_at.timestamp() for row in queued}
+        delivered = {}
+        for message, accepted_at in FakeProviderBackend.accepted:
+            recipient = message.to[0]
+            if recipient in created and recipient not in delivered:
+                delivered[recipient] = accepted_at - created[recipient]
+        counts = {status: queued.filter(status=status).count() for status, _ in OutboundEmail.STATUS_CHOICES}
+        attempts = sum(queued.values_list('attempts', flat=True))
+
+        self.stdout.write(f'queued send: request {_summary(request_latencies)}')
+        self.stdout.write(
+            f'  enqueue to provider: {_summary(list(delivered.values()))}; '
+            f'{len(delivered)} delivered in {elapsed:.1f}s ({len(delivered) / elapsed:.1f}/s) '
+            f'with {options["workers"]} worker(s), {attempts} attempt(s)'
+        )
+        self.stdout.write('  ' + ' '.join(f'{status}={count}' for status, count in counts.items()))
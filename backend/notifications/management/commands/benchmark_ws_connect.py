@@ -0,0 +1,129 @@
+import asyncio
+import statistics
+import time
+import uuid
+
+from asgiref.sync import async_to_sync
+from asgiref.testing import ApplicationCommunicator
+from channels.auth import AuthMiddlewareStack
+from channels.generic.websocket import AsyncWebsocketConsumer
+from channels.routing import URLRouter
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import path
+from rest_framework_simplejwt.tokens import AccessToken
+
+from notifications.middleware import JWTAuthMiddleware, identity_cache
+
+User = get_user_model()
+
+
+class _AcceptConsumer(AsyncWebsocketConsumer):
+    async def connect(self):
+        if self.scope['user'].is_anonymous:
+            await self.close()
+        else:
+            await self.accept()
+
+
+async def _handshake(application, url, headers):
+    """Open and close one WebSocket; returns True if it was accepted."""
+    path, _, query = url.partition('?')
+    communicator = ApplicationCommunicator(application, {
+        'type': 'websocket',
+        'path': path,
+        'query_string': query.encode(),
+        'headers': headers,
+        'subprotocols': [],
+    })
+    await communicator.send_input({'type': 'websocket.connect'})
+    response = await communicator.receive_output(timeout=5)
+    connected = response['type'] == 'websocket.accept'
+    if connected:
+        await communicator.send_input({'type': 'websocket.disconnect', 'code': 1000})
+    await communicator.wait(timeout=5)
+    return connected
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark a storm of WebSocket handshakes through the session-based '
+        'AuthMiddlewareStack and through JWTAuthMiddleware'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--connects', type=int, default=2000, help='Handshakes per scenario')
+        parser.add_argument('--users', type=int, default=200, help='Distinct users reconnecting')
+        parser.add_argument('--concurrency', type=int, default=100, help='Handshakes in flight at once')
+
+    def handle(self, *args, **options):
+        run_id = uuid.uuid4().hex[:8]
+        users = [
+            User.objects.create(email=f'wsbench-{run_id}-{i}@example.com', username=f'wsbench-{run_id}-{i}', is_active=True)
+            for i in range(max(options['users'], 1))
+        ]
+        try:
+            sessions = []
+            for user in users:
+                client = Client()
+                client.force_login(user)
+                sessions.append(client.cookies[settings.SESSION_COOKIE_NAME].value)
+            tokens = [str(AccessToken.for_user(user)) for user in users]
+
+            router = URLRouter([path('ws/', _AcceptConsumer.as_asgi())])
+            cookie = settings.SESSION_COOKIE_NAME.encode()
+            self._run(
+                'session (AuthMiddlewareStack)', AuthMiddlewareStack(router), options,
+                lambda i: ('/ws/', [(b'cookie', cookie + b'=' + sessions[i % len(sessions)].encode())]),
+            )
+            identity_cache.clear()
+            self._run(
+                'jwt (JWTAuthMiddleware)', JWTAuthMiddleware(router), options,
+                lambda i: (f'/ws/?token={tokens[i % len(tokens)]}', []),
+            )
+            self.stdout.write(f'identity cache: {identity_cache.hits} hits, {identity_cache.misses} misses')
+            self._run(
+                'jwt, invalid token', JWTAuthMiddleware(router), options,
+                lambda i: ('/ws/?token=not-a-token', []), expect_accept=False,
+            )
+        finally:
+            User.objects.filter(pk__in=[user.pk for user in users]).delete()
+
+    def _run(self, label, application, options, request, expect_accept=True):
+        count = options['connects']
+        # Database work of the middlewares runs on this thread (thread-sensitive)
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            latencies, wrong = async_to_sync(self._storm)(application, count, options['concurrency'], request, expect_accept)
+            elapsed = time.perf_counter() - started
+
+        latencies.sort()
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+        style = self.style.SUCCESS if not wrong else self.style.ERROR
+        self.stdout.write(style(
+            f'{label}: {count} handshakes in {elapsed:.2f}s ({count / elapsed:.0f}/s), '
+            f'p50 {statistics.median(latencies) * 1000:.2f}ms, p99 {p99 * 1000:.2f}ms, '
+            f'{len(queries) / count:.2f} queries/handshake, {wrong} unexpected result(s)'
+        ))
+
+    async def _storm(self, application, count, concurrency, request, expect_accept):
+        latencies = []
+        wrong = 0
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def handshake(i):
+            nonlocal wrong
+            url, headers = request(i)
+            async with semaphore:
+                started = time.perf_counter()
+                connected = await _handshake(application, url, headers)
+                latencies.append(time.perf_counter() - started)
+                if connected != expect_accept:
+                    wrong += 1
+
+        await asyncio.gather(*(handshake(i) for i in range(count)))
+        return latencies, wrong
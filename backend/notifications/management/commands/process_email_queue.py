@@ -0,0 +1,24 @@
+import signal
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from notifications import email_queue
+
+
+class Command(BaseCommand):
+    help = 'Send queued transactional emails and retry failed ones (runs until SIGINT/SIGTERM)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=settings.EMAIL_QUEUE_WORKERS)
+        parser.add_argument('--poll-seconds', type=float, default=settings.EMAIL_QUEUE_POLL_SECONDS)
+        parser.add_argument('--once', action='store_true', help='Exit once nothing is due')
+
+    def handle(self, *args, **options):
+        stop = threading.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            # Finish the messages being sent, then exit
+            signal.signal(signum, lambda *_: stop.set())
+        sent = email_queue.run_worker(options['workers'], options['poll_seconds'], stop=stop, once=options['once'])
+        self.stdout.write(self.style.SUCCESS(f'Sent {sent} email(s)'))
@@ -0,0 +1,20 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from notifications import email_queue
+
+
+class Command(BaseCommand):
+    help = 'Delete sent and dead outbound emails older than EMAIL_QUEUE_RETENTION_HOURS'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=settings.EMAIL_QUEUE_RETENTION_HOURS)
+        parser.add_argument('--batch-size', type=int, default=email_queue.PURGE_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options['hours'])
+        count = email_queue.purge(cutoff, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Purged {count} outbound email(s)'))
@@ -0,0 +1,20 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from notifications import outbox
+
+
+class Command(BaseCommand):
+    help = 'Delete realtime outbox events older than NOTIFICATION_OUTBOX_RETENTION_HOURS'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=settings.NOTIFICATION_OUTBOX_RETENTION_HOURS)
+        parser.add_argument('--batch-size', type=int, default=outbox.PURGE_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options['hours'])
+        count = outbox.purge(cutoff, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Purged {count} outbox event(s)'))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from notifications import metrics
+
+
+class Command(BaseCommand):
+    help = 'Show delivery counters of the realtime WebSocket connections'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reset',
+            action='store_true',
+            help='Reset the counters after printing them',
+        )
+
+    def handle(self, *args, **options):
+        stats = metrics.stats(reset=options['reset'])
+        self.stdout.write(' '.join(f'{name}={value}' for name, value in stats.items()))
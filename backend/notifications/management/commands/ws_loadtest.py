@@ -0,0 +1,217 @@
+import asyncio
+import json
+import os
+import random
+import resource
+import time
+import uuid
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from notifications import dispatch, metrics
+
+User = get_user_model()
+
+
+def _rss():
+    """Resident set size of this process in bytes."""
+    try:
+        with open('/proc/self/statm') as fh:
+            return int(fh.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        # Peak rather than current outside Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+class _Client:
+    """One simulated WebSocket client driving the ASGI application directly."""
+
+    def __init__(self, application, token, latencies):
+        self.application = application
+        self.token = token
+        self.latencies = latencies
+        self.inbox = asyncio.Queue()
+        self.outbox = asyncio.Queue()
+
+    async def connect(self):
+        scope = {
+            'type': 'websocket',
+            'path': '/ws/notifications/',
+            'query_string': f'token={self.token}'.encode(),
+            'headers': [],
+            'subprotocols': [],
+        }
+        self.task = asyncio.ensure_future(self.application(scope, self.inbox.get, self.outbox.put))
+        await self.inbox.put({'type': 'websocket.connect'})
+        message = await asyncio.wait_for(self.outbox.get(), 10)
+        if message['type'] != 'websocket.accept':
+            return False
+        self.reader = asyncio.ensure_future(self.read())
+        return True
+
+    async def read(self):
+        while True:
+            message = await self.outbox.get()
+            if message['type'] != 'websocket.send':
+                return
+            now = time.perf_counter()
+            frame = json.loads(message['text'])
+            for event in frame['events'] if frame['type'] == 'batch' else [frame]:
+                sent_at = (event.get('data') or {}).get('sent_at')
+                if sent_at is not None:
+                    self.latencies.append(now - sent_at)
+
+    async def close(self):
+        await self.inbox.put({'type': 'websocket.disconnect', 'code': 1000})
+        try:
+            await asyncio.wait_for(self.task, 5)
+        except asyncio.TimeoutError:
+            self.task.cancel()
+        if hasattr(self, 'reader'):
+            self.reader.cancel()
+
+
+class Command(BaseCommand):
+    help = (
+        'Load-test ws/notifications/ in-process: open N authenticated clients '
+        'on the ASGI application, push events through the channel layer and '
+        'report connect rate, delivery latency, memory per connection and '
+        'event-loop lag. InMemoryChannelLayer scans every channel on each '
+        'receive, so large runs are slower on it than on Redis'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=1000, help='Concurrent WebSocket clients')
+        parser.add_argument('--users', type=int, default=0, help='Distinct users (default: one per client)')
+        parser.add_argument('--connect-concurrency', type=int, default=100, help='Handshakes in flight at once')
+        parser.add_argument('--events', type=int, default=5000, help='Events sent through the channel layer')
+        parser.add_argument('--rate', type=float, default=1000.0, help='Events per second')
+        parser.add_argument('--batch-window-ms', type=int, default=None, help='Override NOTIFICATION_BATCH_WINDOW_MS')
+        parser.add_argument('--layer', choices=('memory', 'redis'), default='memory')
+        parser.add_argument('--redis-url', default='redis://127.0.0.1:6379/0', help='Redis (or compatible stand-in)')
+
+    def handle(self, *args, **options):
+        if options['layer'] == 'memory':
+            layer = {'BACKEND': 'channels.layers.InMemoryChannelLayer'}
+        else:
+            layer = {
+                'BACKEND': 'channels_redis.core.RedisChannelLayer',
+                'CONFIG': {'hosts': [options['redis_url']], 'prefix': f'loadtest-{uuid.uuid4().hex[:8]}'},
+            }
+        overrides = {'CHANNEL_LAYERS': {'default': layer}}
+        if options['batch_window_ms'] is not None:
+            overrides['NOTIFICATION_BATCH_WINDOW_MS'] = options['batch_window_ms']
+
+        run_id = uuid.uuid4().hex[:8]
+        user_count = options['users'] or options['clients']
+        User.objects.bulk_create([
+            User(email=f'wsload-{run_id}-{i}@example.com', username=f'wsload-{run_id}-{i}', is_active=True)
+            for i in range(user_count)
+        ])
+        users = list(User.objects.filter(email__startswith=f'wsload-{run_id}-').order_by('pk'))
+        try:
+            with override_settings(**overrides):
+                # Imported here so the consumers pick up the overridden layer
+                from legacyprime.asgi import application
+                async_to_sync(self._run)(application, users, options)
+        finally:
+            User.objects.filter(pk__in=[user.pk for user in users]).delete()
+
+    async def _run(self, application, users, options):
+        layer = get_channel_layer()
+        try:
+            channel = await layer.new_channel()
+            await layer.group_add('loadtest_probe', channel)
+            await layer.group_discard('loadtest_probe', channel)
+        except Exception as exc:
+            raise CommandError(f'Cannot reach the channel layer: {exc}') from exc
+
+        lags = []
+        ticker = asyncio.ensure_future(self._watch_loop(lags))
+        latencies = []
+        tokens = [str(AccessToken.for_user(user)) for user in users]
+
+        # Connect
+        clients = [
+            _Client(application, tokens[i % len(tokens)], latencies)
+            for i in range(options['clients'])
+        ]
+        rss_before = _rss()
+        semaphore = asyncio.Semaphore(options['connect_concurrency'])
+
+        async def connect(client):
+            async with semaphore:
+                return await client.connect()
+
+        started = time.perf_counter()
+        accepted = await asyncio.gather(*(connect(client) for client in clients), return_exceptions=True)
+        connect_time = time.perf_counter() - started
+        failures = sum(1 for result in accepted if result is not True)
+        if failures == len(clients):
+            raise CommandError(f'No client could connect: {accepted[0]!r}')
+        per_connection = (_rss() - rss_before) / max(len(clients) - failures, 1)
+        self.stdout.write(
+            f'connect: {len(clients) - failures}/{len(clients)} in {connect_time:.2f}s '
+            f'({len(clients) / connect_time:.0f}/s), ~{per_connection / 1024:.1f} KiB RSS per connection'
+        )
+
+        # Traffic
+        lags.clear()
+        interval = 1 / options['rate'] if options['rate'] > 0 else 0
+        started = time.perf_counter()
+        # Clients of the same user each get a copy
+        clients_of = [0] * len(users)
+        for i in range(len(clients)):
+            clients_of[i % len(users)] += 1
+        expected = 0
+        for n in range(options['events']):
+            index = random.randrange(len(users))
+            expected += clients_of[index]
+            await layer.group_send(dispatch.group_name(users[index].pk), {
+                'type': 'notification_update',
+                'data': {'message': f'load {n}', 'sent_at': time.perf_counter()},
+            })
+            delay = started + (n + 1) * interval - time.perf_counter()
+            await asyncio.sleep(max(delay, 0))
+        send_time = time.perf_counter() - started
+
+        deadline = time.perf_counter() + 10 + settings.NOTIFICATION_BATCH_WINDOW_MS / 1000
+        while len(latencies) < expected and time.perf_counter() < deadline:
+            await asyncio.sleep(0.05)
+
+        self.stdout.write(
+            f'delivery: {options["events"]} events sent in {send_time:.2f}s, '
+            f'{len(latencies)}/{expected} deliveries received; latency '
+            f'p50 {_percentile(latencies, 0.5) * 1000:.1f}ms, '
+            f'p99 {_percentile(latencies, 0.99) * 1000:.1f}ms, '
+            f'max {max(latencies, default=0) * 1000:.1f}ms '
+            f'(batch window {settings.NOTIFICATION_BATCH_WINDOW_MS}ms)'
+        )
+        self.stdout.write(
+            f'event loop lag under load: p50 {_percentile(lags, 0.5) * 1000:.1f}ms, '
+            f'p99 {_percentile(lags, 0.99) * 1000:.1f}ms, max {max(lags, default=0) * 1000:.1f}ms'
+        )
+        self.stdout.write('consumer metrics: ' + ' '.join(f'{k}={v}' for k, v in metrics.snapshot().items()))
+
+        ticker.cancel()
+        await asyncio.gather(*(client.close() for client in clients), return_exceptions=True)
+
+    async def _watch_loop(self, lags, interval=0.01):
+        """Record how late the loop wakes a task sleeping `interval` seconds."""
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(interval)
+            lags.append(max(time.perf_counter() - started - interval, 0))
@@ -0,0 +1,86 @@
+"""
+Delivery metrics for realtime connections.
+
+Consumers bump plain in-process counters (no I/O on the event loop).
+Every NOTIFICATION_METRICS_PUBLISH_SECONDS the deltas are added to
+counters in the configured Django cache from the background pool, so
+with Redis they aggregate across workers, like the summary cache stats.
+
+- frames_sent: WebSocket frames written
+- events_sent: events carried by those frames
+- events_coalesced: balance updates replaced by a newer one before sending
+- slow_disconnects: clients closed for exceeding the buffer high-water mark
+- buffer_depth: events waiting in this process's connection buffers
+  (`max_buffer_depth` is the largest depth published so far)
+"""
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from legacyprime import background
+
+logger = logging.getLogger(__name__)
+
+COUNTERS = ('frames_sent', 'events_sent', 'events_coalesced', 'slow_disconnects')
+KEY_TEMPLATE = 'notifications:realtime:{name}'
+MAX_DEPTH_KEY = KEY_TEMPLATE.format(name='max_buffer_depth')
+
+totals = dict.fromkeys(COUNTERS, 0)
+buffer_depth = 0
+_unpublished = dict.fromkeys(COUNTERS, 0)
+_max_depth = 0
+_published_at = time.monotonic()
+
+
+def count(name, n=1):
+    totals[name] += n
+    _unpublished[name] += n
+    _maybe_publish()
+
+
+def buffer_changed(delta):
+    global buffer_depth, _max_depth
+    buffer_depth += delta
+    _max_depth = max(_max_depth, buffer_depth)
+
+
+def snapshot():
+    """This process's counters and current buffer depth."""
+    return {**totals, 'buffer_depth': buffer_depth}
+
+
+def _maybe_publish():
+    global _published_at, _unpublished, _max_depth
+    now = time.monotonic()
+    if now - _published_at < settings.NOTIFICATION_METRICS_PUBLISH_SECONDS:
+        return
+    deltas, max_depth = _unpublished, _max_depth
+    _unpublished, _max_depth, _published_at = dict.fromkeys(COUNTERS, 0), buffer_depth, now
+    background.submit(_publish, deltas, max_depth)
+
+
+def _publish(deltas, max_depth):
+    try:
+        for name, delta in deltas.items():
+            if delta:
+                key = KEY_TEMPLATE.format(name=name)
+                cache.add(key, 0, timeout=None)
+                cache.incr(key, delta)
+        if max_depth > (cache.get(MAX_DEPTH_KEY) or 0):
+            cache.set(MAX_DEPTH_KEY, max_depth, timeout=None)
+    except Exception:
+        # Diagnostics only
+        logger.debug('Could not publish realtime metrics', exc_info=True)
+
+
+def stats(reset=False):
+    """Return the published counters of all workers (optionally resetting them)."""
+    keys = [KEY_TEMPLATE.format(name=name) for name in COUNTERS] + [MAX_DEPTH_KEY]
+    values = cache.get_many(keys)
+    if reset:
+        cache.delete_many(keys)
+    result = {name: values.get(KEY_TEMPLATE.format(name=name), 0) for name in COUNTERS}
+    result['max_buffer_depth'] = values.get(MAX_DEPTH_KEY, 0)
+    return result
@@ -0,0 +1,138 @@
+"""
+JWT authentication for WebSocket connections.
+
+`JWTAuthMiddleware` replaces Channels' `AuthMiddlewareStack`, which
+looked the user up through the session (two queries per connect) even
+though the SPA authenticates with SimpleJWT access tokens.
+
+The access token comes from the `token` query parameter (browsers
+cannot set headers on a WebSocket) or an `Authorization: Bearer` header.
+Its signature, expiry and type are checked in memory; the user is then
+taken from a small per-process cache, so reconnect storms do not touch
+the database. Entries live for WS_IDENTITY_CACHE_SECONDS and are dropped
+when the user is saved in this process.
+
+Connections without a valid token for an active user are refused during
+the handshake: the inner application is never called and the client
+gets an HTTP 403 instead of an accepted-then-closed socket.
+"""
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import parse_qs
+
+from channels.db import database_sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+
+class IdentityCache:
+    """Bounded LRU of `user_id -> (user, expires_at)`, shared by the worker's connections."""
+
+    def __init__(self, size, ttl):
+        self.size = size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry[1] < time.monotonic():
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, user_id, user):
+        with self._lock:
+            self._entries[user_id] = (user, time.monotonic() + self.ttl)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def discard(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+
+identity_cache = IdentityCache(settings.WS_IDENTITY_CACHE_SIZE, settings.WS_IDENTITY_CACHE_SECONDS)
+
+# user_id -> task loading that user, so a burst of handshakes for one
+# user shares a single query
+_loading = {}
+
+
+def _raw_token(scope):
+    token = parse_qs(scope.get('query_string', b'').decode()).get('token')
+    if token:
+        return token[0]
+    for name, value in scope.get('headers', ()):
+        if name == b'authorization':
+            parts = value.decode().split()
+            if len(parts) == 2 and parts[0] in api_settings.AUTH_HEADER_TYPES:
+                return parts[1]
+    return None
+
+
+def _load_user(user_id):
+    return get_user_model().objects.filter(
+        **{api_settings.USER_ID_FIELD: user_id, 'is_active': True}
+    ).first()
+
+
+async def get_user(scope):
+    """The active user the scope's access token belongs to, or None."""
+    raw = _raw_token(scope)
+    if not raw:
+        return None
+    try:
+        token = AccessToken(raw)
+        user_id = token[api_settings.USER_ID_CLAIM]
+    except (TokenError, KeyError):
+        return None
+
+    user = identity_cache.get(user_id)
+    if user is not None:
+        return user
+
+    task = _loading.get(user_id)
+    if task is None:
+        task = _loading[user_id] = asyncio.ensure_future(database_sync_to_async(_load_user)(user_id))
+        task.add_done_callback(lambda _: _loading.pop(user_id, None))
+    user = await asyncio.shield(task)
+    if user is not None:
+        identity_cache.set(user_id, user)
+    return user
+
+
+class JWTAuthMiddleware:
+    """Populate `scope['user']` from a SimpleJWT access token, refusing the handshake otherwise."""
+
+    def __init__(self, inner):
+        self.inner = inner
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'websocket':
+            return await self.inner(scope, receive, send)
+
+        user = await get_user(scope)
+        if user is None:
+            message = await receive()
+            if message['type'] == 'websocket.connect':
+                # Close before accept: the server answers the handshake with 403
+                await send({'type': 'websocket.close', 'code': 4401})
+            return
+
+        return await self.inner(dict(scope, user=user), receive, send)
@@ -0,0 +1,113 @@
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+
+
+class OutboxEvent(models.Model):
+    """
+    A realtime event as delivered to a user's WebSocket group.
+
+    The primary key doubles as the event's sequence number: it only grows,
+    so for every user `id > last_seq` is exactly what a reconnecting client
+    has missed. Rows are kept for NOTIFICATION_OUTBOX_RETENTION_HOURS (see
+    the `purge_notifications` command).
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='outbox_events')
+    # Consumer handler name, e.g. 'transaction_update'
+    type = models.CharField(max_length=32)
+    data = models.JSONField()
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            # Replay: WHERE user_id = ? AND id > ? ORDER BY id
+            models.Index(fields=['user', 'id'], name='outbox_user_seq_idx'),
+            # Retention purge
+            models.Index(fields=['created_at'], name='outbox_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.type} #{self.pk} for user {self.user_id}"
+
+
+class Announcement(models.Model):
+    """
+    A message for every connected user, or for the users of one country.
+
+    Stored once and broadcast through sharded channel-layer groups rather
+    than per-user groups (see announcements.py).
+    """
+    LEVEL_INFO = 'info'
+    LEVEL_WARNING = 'warning'
+    LEVEL_CRITICAL = 'critical'
+    LEVEL_CHOICES = [
+        (LEVEL_INFO, 'Info'),
+        (LEVEL_WARNING, 'Warning'),
+        (LEVEL_CRITICAL, 'Critical'),
+    ]
+
+    title = models.CharField(max_length=200)
+    message = models.TextField()
+    level = models.CharField(max_length=16, choices=LEVEL_CHOICES, default=LEVEL_INFO)
+    country = models.CharField(
+        max_length=100, blank=True,
+        help_text='Only users with this country (as on their profile); blank for everyone',
+    )
+    expires_at = models.DateTimeField(null=True, blank=True)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL, related_name='+',
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    broadcast_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    class Meta:
+        ordering = ['-id']
+
+    def __str__(self):
+        return self.title
+
+
+class OutboundEmail(models.Model):
+    """
+    A transactional email waiting for, or done with, delivery.
+
+    Rows are written by `email_queue.enqueue()` and sent by the background
+    pool or the `process_email_queue` worker (see email_queue.py).
+    `idempotency_key` is unique, so enqueueing the same message twice
+    stores and sends it once.
+    """
+    STATUS_QUEUED = 'queued'
+    STATUS_SENDING = 'sending'
+    STATUS_SENT = 'sent'
+    STATUS_DEAD = 'dead'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_SENDING, 'Sending'),
+        (STATUS_SENT, 'Sent'),
+        (STATUS_DEAD, 'Dead'),
+    ]
+
+    idempotency_key = models.CharField(max_length=128, unique=True)
+    subject = models.CharField(max_length=255)
+    recipients = models.JSONField()
+    template_name = models.CharField(max_length=200)
+    context = models.JSONField(default=dict, blank=True)
+    from_email = models.CharField(max_length=254, blank=True)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-id']
+        indexes = [
+            # Worker: WHERE status = ? AND next_attempt_at <= ?
+            models.Index(fields=['status', 'next_attempt_at'], name='outbound_email_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} to {', '.join(self.recipients)} ({self.status})"
@@ -0,0 +1,52 @@
+"""
+Replay and retention for the realtime event outbox (`OutboxEvent`).
+
+Every event delivered through dispatch.py is stored with a sequence
+number (its row id). A client that reconnects with `last_seq` gets what
+it missed in one frame; see `UserNotificationConsumer`.
+"""
+from .models import OutboxEvent
+
+PURGE_BATCH_SIZE = 10000
+
+
+def replay(user_id, last_seq, limit):
+    """
+    Return `(events, resync)` for a client whose last seen event is `last_seq`.
+
+    `events` are the user's later events in order, as consumer messages
+    with their `seq`. `resync` is True when the outbox cannot cover the
+    gap: `last_seq` has been purged (or never existed), or more than
+    `limit` events were missed. The client should then reload its data
+    over the REST API; `events` is empty in that case. `last_seq=0`
+    means the client has seen no event yet.
+    """
+    # Fetch last_seq itself as well: if it is gone, so may be later events
+    rows = list(
+        OutboxEvent.objects
+        .filter(user_id=user_id, id__gte=last_seq)
+        .order_by('id')
+        .values_list('id', 'type', 'data')[:limit + 2]
+    )
+    if last_seq == 0:
+        rows.insert(0, None)
+    elif not rows or rows[0][0] != last_seq:
+        return [], True
+    if len(rows) > limit + 1:
+        return [], True
+    return [{'type': type_, 'data': data, 'seq': seq} for seq, type_, data in rows[1:]], False
+
+
+def purge(before, batch_size=PURGE_BATCH_SIZE):
+    """Delete events created before `before`, oldest first, a batch at a time. Returns the count."""
+    total = 0
+    while True:
+        ids = list(
+            OutboxEvent.objects
+            .filter(created_at__lt=before)
+            .order_by('created_at')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return total
+        total += OutboxEvent.objects.filter(id__in=ids).delete()[0]
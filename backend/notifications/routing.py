@@ -1,9 +1,15 @@
 from django.urls import path
-from . import consumers
+from . import consumers, streams
 
 # Use `path` which matches the typical Channels examples and avoids
 # potential regex mismatches when the incoming scope path includes
 # leading/trailing slashes. This will match `/ws/notifications/`.
 websocket_urlpatterns = [
     path('ws/notifications/', consumers.UserNotificationConsumer.as_asgi()),
-]
\ No newline at end of file
+]
+
+# Served in front of Django by legacyprime/asgi.py (see streams.py)
+http_urlpatterns = [
+    path('api/notifications/stream/', streams.EventStream()),
+    path('api/notifications/poll/', streams.LongPoll()),
+]
@@ -1,68 +1,54 @@
+from django.conf import settings
 from django.db.models.signals import post_save
 from django.dispatch import receiver
-from transactions.models import Deposit, Withdrawal
+
+from transactions.signals import transaction_status_changed
+from transactions.transitions import APPROVED, REJECTED
+from notifications import dispatch
+from notifications.middleware import identity_cache
 from notifications.utils import send_notification_to_user, send_transaction_update, send_balance_update
 
-@receiver(post_save, sender=Deposit)
-def deposit_post_save(sender, instance, created, **kwargs):
-    if not created and instance.status in ['approved', 'rejected']:
-        transaction_type = 'deposit'
-        # Send notification to user
-        send_notification_to_user(
-            instance.user.id,
-            f"Your deposit of {instance.amount} has been {instance.status}!",
-            "success" if instance.status == 'approved' else "error"
-        )
-        
-        # Send detailed transaction update
-        send_transaction_update(
-            instance.user.id,
-            f"{transaction_type}_{instance.status}",
-            {
-                "type": transaction_type,
-                "transaction": {
-                    "id": instance.id,
-                    "type": transaction_type,
-                    "amount": str(instance.amount),
-                    "status": instance.status,
-                    "created_at": instance.created_at.isoformat(),
-                    "updated_at": instance.updated_at.isoformat()
-                }
-            }
-        )
-        
-        # Send balance update if approved
-        if instance.status == 'approved':
-            send_balance_update(instance.user.id, str(instance.user.wallet.balance))
+# Status changes are announced through `transaction_status_changed`, which
+# approve()/reject() and the bulk engine send once the change has committed
+# (one signal per batch). Per-row post_save is no longer involved.
+
 
-@receiver(post_save, sender=Withdrawal)
-def withdrawal_post_save(sender, instance, created, **kwargs):
-    if not created and instance.status in ['approved', 'rejected']:
-        transaction_type = 'withdrawal'
-        # Send notification to user
-        send_notification_to_user(
-            instance.user.id,
-            f"Your withdrawal of {instance.amount} has been {instance.status}!",
-            "success" if instance.status == 'approved' else "error"
-        )
-        
-        # Send detailed transaction update
-        send_transaction_update(
-            instance.user.id,
-            f"{transaction_type}_{instance.status}",
-            {
-                "type": transaction_type,
-                "transaction": {
-                    "id": instance.id,
+@receiver(transaction_status_changed)
+def transaction_status_notify(sender, instances, status, **kwargs):
+    if status not in (APPROVED, REJECTED):
+        return
+    transaction_type = sender._meta.model_name
+
+    # Everything below goes out as one group_send per user
+    with dispatch.batch():
+        for instance in instances:
+            send_notification_to_user(
+                instance.user_id,
+                f"Your {transaction_type} of {instance.amount} has been {status}!",
+                "success" if status == APPROVED else "error"
+            )
+            send_transaction_update(
+                instance.user_id,
+                f"{transaction_type}_{status}",
+                {
                     "type": transaction_type,
-                    "amount": str(instance.amount),
-                    "status": instance.status,
-                    "created_at": instance.created_at.isoformat(),
-                    "updated_at": instance.updated_at.isoformat()
+                    "transaction": {
+                        "id": instance.id,
+                        "type": transaction_type,
+                        "amount": str(instance.amount),
+                        "status": status,
+                        "created_at": instance.created_at.isoformat() if instance.created_at else None,
+                    }
                 }
-            }
-        )
-        
-        # Send balance update if approved
-        if instance.status == 'approved':
-            send_balance_update(instance.user.id, str(instance.user.wallet.balance))
\ No newline at end of file
+            )
+
+        if status == APPROVED:
+            # Read at send time, once per user however many approvals
+            for user_id in {instance.user_id for instance in instances}:
+                send_balance_update(user_id)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def forget_websocket_identity(sender, instance, **kwargs):
+    # New WebSocket handshakes must see deactivation at once (in this process)
+    identity_cache.discard(instance.pk)
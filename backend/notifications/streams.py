@@ -0,0 +1,241 @@
+"""
+Realtime fallbacks for clients that cannot open `ws/notifications/`.
+
+- `EventStream` (GET api/notifications/stream/): Server-Sent Events.
+  It resumes from `Last-Event-ID`, or `?last_event_id=` on the first
+  connect, using the outbox.
+- `LongPoll` (GET api/notifications/poll/?last_seq=N): answers as soon
+  as there are events after N, or with an empty list after
+  NOTIFICATION_LONGPOLL_TIMEOUT_SECONDS. Without `last_seq` it answers
+  at once with the sequence number to start from. When the outbox cannot
+  cover the gap it answers `resync` with the newest sequence number: the
+  client reloads over the REST API and polls on from there.
+
+The event stream also carries announcements (see announcements.py).
+
+Both are plain ASGI applications mounted in legacyprime/asgi.py in front
+of Django. They never hold a thread: each client is one coroutine that
+subscribes a private channel to the same `user_{id}` group as
+UserNotificationConsumer, waits on it and watches `http.disconnect`.
+Authentication is the WebSocket one (JWT in `?token=` or an
+Authorization header), and CORS is answered here because Django's
+middleware is not involved.
+"""
+import asyncio
+import json
+from urllib.parse import parse_qs
+
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db.models import Max
+
+from . import announcements, dispatch, outbox
+from .consumers import FRAME_TYPES
+from .middleware import get_user
+from .models import OutboxEvent
+
+
+def _header(scope, name):
+    for key, value in scope.get('headers', ()):
+        if key == name:
+            return value.decode('latin-1')
+    return None
+
+
+def _query(scope, name):
+    return parse_qs(scope.get('query_string', b'').decode()).get(name, [''])[0]
+
+
+def _cors_headers(scope):
+    origin = _header(scope, b'origin')
+    if origin and origin in settings.CORS_ALLOWED_ORIGINS:
+        return [(b'access-control-allow-origin', origin.encode()), (b'vary', b'Origin')]
+    return []
+
+
+def frame(event):
+    return {'type': FRAME_TYPES[event['type']], 'data': event['data'], 'seq': event.get('seq')}
+
+
+def _events(message):
+    """The events carried by one channel-layer message."""
+    events = message['events'] if message['type'] == dispatch.BATCH_TYPE else [message]
+    return [event for event in events if event['type'] in FRAME_TYPES]
+
+
+def _latest_seq(user_id):
+    return OutboxEvent.objects.filter(user_id=user_id).aggregate(seq=Max('id'))['seq'] or 0
+
+
+class Subscription:
+    """A private channel added to `groups` for the life of one request."""
+
+    def __init__(self, groups):
+        self.layer = get_channel_layer()
+        self.groups = groups
+
+    async def __aenter__(self):
+        dispatch.bind_loop()
+        self.channel = await self.layer.new_channel()
+        for group in self.groups:
+            await self.layer.group_add(group, self.channel)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        for group in self.groups:
+            await self.layer.group_discard(group, self.channel)
+
+    def receive(self):
+        return asyncio.ensure_future(self.layer.receive(self.channel))
+
+
+async def _wait_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+class _RealtimeApp:
+    """Shared plumbing: preflight, authentication and JSON errors."""
+
+    async def __call__(self, scope, receive, send):
+        if scope['method'] == 'OPTIONS':
+            return await self.respond(scope, send, 204, b'', [
+                (b'access-control-allow-methods', b'GET, OPTIONS'),
+                (b'access-control-allow-headers', b'authorization, last-event-id'),
+                (b'access-control-max-age', b'86400'),
+            ])
+        if scope['method'] != 'GET':
+            return await self.error(scope, send, 405, 'Method not allowed')
+        user = await get_user(scope)
+        if user is None:
+            return await self.error(scope, send, 401, 'Authentication credentials were not provided or are invalid')
+        await self.serve(scope, receive, send, user)
+
+    async def respond(self, scope, send, status, body, headers=()):
+        await send({'type': 'http.response.start', 'status': status, 'headers': [*headers, *_cors_headers(scope)]})
+        await send({'type': 'http.response.body', 'body': body})
+
+    async def error(self, scope, send, status, message):
+        await self.respond(scope, send, status, json.dumps({'error': message}).encode(), [
+            (b'content-type', b'application/json'),
+        ])
+
+
+class EventStream(_RealtimeApp):
+
+    async def serve(self, scope, receive, send, user):
+        last_event_id = _header(scope, b'last-event-id') or _query(scope, 'last_event_id')
+        disconnected = asyncio.ensure_future(_wait_disconnect(receive))
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.NOTIFICATION_STREAM_MAX_SECONDS
+
+        groups = [dispatch.group_name(user.pk), *announcements.groups_for(user)]
+        async with Subscription(groups) as subscription:
+            await send({'type': 'http.response.start', 'status': 200, 'headers': [
+                (b'content-type', b'text/event-stream'),
+                (b'cache-control', b'no-cache'),
+                # nginx must not buffer the stream
+                (b'x-accel-buffering', b'no'),
+                *_cors_headers(scope),
+            ]})
+            replayed = set()
+            chunk = b'retry: 3000\n\n'
+            if last_event_id.isdigit():
+                events, resync = await database_sync_to_async(outbox.replay)(
+                    user.pk, int(last_event_id), settings.NOTIFICATION_REPLAY_LIMIT
+                )
+                chunk += b'event: resync\ndata: {}\n\n' if resync else b''
+                for event in events:
+                    chunk += self.encode(event)
+                    replayed.add(event['seq'])
+
+            received = subscription.receive()
+            try:
+                while True:
+                    await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+                    timeout = min(settings.NOTIFICATION_STREAM_KEEPALIVE_SECONDS, deadline - loop.time())
+                    if timeout <= 0:
+                        # EventSource reconnects with Last-Event-ID
+                        break
+                    done, _ = await asyncio.wait({received, disconnected}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                    if disconnected in done:
+                        return
+                    if received not in done:
+                        chunk = b': keepalive\n\n'
+                        continue
+                    chunk = b''
+                    for event in _events(received.result()):
+                        # Replayed events may also arrive live; live events
+                        # can arrive out of seq order, so only those are skipped
+                        if event.get('seq') in replayed:
+                            replayed.discard(event['seq'])
+                            continue
+                        chunk += self.encode(event)
+                    received = subscription.receive()
+                await send({'type': 'http.response.body', 'body': b''})
+            finally:
+                received.cancel()
+                disconnected.cancel()
+
+    def encode(self, event):
+        event = frame(event)
+        lines = f"event: {event['type']}\ndata: {json.dumps(event['data'], separators=(',', ':'))}\n\n"
+        if event['seq'] is not None:
+            lines = f"id: {event['seq']}\n" + lines
+        return lines.encode()
+
+
+class LongPoll(_RealtimeApp):
+
+    async def serve(self, scope, receive, send, user):
+        last_seq = _query(scope, 'last_seq')
+        if not last_seq.isdigit():
+            # First poll: tell the client where to start from
+            latest = await database_sync_to_async(_latest_seq)(user.pk)
+            return await self.reply(scope, send, [], latest, False)
+        last_seq = int(last_seq)
+
+        disconnected = asyncio.ensure_future(_wait_disconnect(receive))
+        replay = database_sync_to_async(outbox.replay)
+        # Subscribe before reading the outbox so nothing falls in between
+        # Announcements are not in the outbox; long-poll clients fetch the
+        # latest one from announcements/latest/
+        async with Subscription([dispatch.group_name(user.pk)]) as subscription:
+            received = subscription.receive()
+            try:
+                events, resync = await replay(user.pk, last_seq, settings.NOTIFICATION_REPLAY_LIMIT)
+                if not events and not resync:
+                    done, _ = await asyncio.wait(
+                        {received, disconnected},
+                        timeout=settings.NOTIFICATION_LONGPOLL_TIMEOUT_SECONDS,
+                        return_when=asyncio.FIRST_COMPLETED,
+                    )
+                    if disconnected in done:
+                        return
+                    if received in done:
+                        # The message is only a wake-up: give the rest of a
+                        # burst a moment, then read it all from the outbox
+                        await asyncio.sleep(settings.NOTIFICATION_BATCH_WINDOW_MS / 1000)
+                        events, resync = await replay(user.pk, last_seq, settings.NOTIFICATION_REPLAY_LIMIT)
+            finally:
+                received.cancel()
+                disconnected.cancel()
+
+        if resync:
+            # The client's last_seq would resync again on every poll
+            last_seq = await database_sync_to_async(_latest_seq)(user.pk)
+        elif events:
+            last_seq = events[-1]['seq']
+        await self.reply(scope, send, events, last_seq, resync)
+
+    async def reply(self, scope, send, events, last_seq, resync):
+        body = json.dumps({
+            'events': [frame(event) for event in events],
+            'last_seq': last_seq,
+            'resync': resync,
+        }).encode()
+        await self.respond(scope, send, 200, body, [
+            (b'content-type', b'application/json'),
+            (b'cache-control', b'no-store'),
+        ])
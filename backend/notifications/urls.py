@@ -1,7 +1,8 @@
 from django.urls import path
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
-from .utils import send_transactional_email
+from . import email_queue
+from .views import LatestAnnouncementView
 from django.conf import settings
 import json
 
@@ -15,22 +16,21 @@ def send_otp(request):
     if not email or not otp_code:
         return JsonResponse({'detail': 'email and otp_code required'}, status=400)
     try:
-        sent = send_transactional_email(
+        # Keyed on the message itself, so a retried request sends it once
+        email_queue.enqueue(
             subject=f"{settings.PROJECT_NAME} - Your verification code",
             recipient_list=[email],
             template_name='notifications/otp_email.html',
             context={'project_name': settings.PROJECT_NAME, 'otp_code': otp_code},
             from_email=getattr(settings, 'DEFAULT_FROM_EMAIL', None),
-            fail_silently=False,
         )
-        if not sent:
-            return JsonResponse({'detail': 'Failed to send OTP'}, status=500)
         return JsonResponse({'detail': 'OTP sent'}, status=200)
     except Exception as e:
         return JsonResponse({'detail': str(e)}, status=500)
 
 urlpatterns = [
     path('send-otp/', send_otp, name='send-otp'),
+    path('announcements/latest/', LatestAnnouncementView.as_view(), name='announcement-latest'),
     path('debug/cors/', lambda request: JsonResponse({
         'ok': True,
         'origin': request.META.get('HTTP_ORIGIN'),
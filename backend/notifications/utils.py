@@ -6,6 +6,8 @@ from django.core.mail import EmailMultiAlternatives
 from django.template.loader import render_to_string
 from django.utils.html import strip_tags
 
+from . import dispatch
+
 logger = logging.getLogger(__name__)
 
 
@@ -93,3 +95,35 @@ def send_transactional_email(
             return 0
         raise
 
+
+def send_notification_to_user(user_id: int, message: str, level: str = 'info') -> None:
+    """
+    Queue a general notification for the user's open WebSocket connections.
+
+    Like the other `send_*` helpers below, this never touches the channel
+    layer itself: the event is delivered after the current transaction
+    commits, batched with the user's other events (see dispatch.py).
+    """
+    dispatch.queue(user_id, {
+        'type': 'notification_update',
+        'data': {'message': message, 'level': level},
+    })
+
+
+def send_transaction_update(user_id: int, action: str, data: Dict[str, Any]) -> None:
+    """Queue a deposit/withdrawal update; `action` is e.g. 'deposit_approved'."""
+    dispatch.queue(user_id, {
+        'type': 'transaction_update',
+        'data': {'action': action, **data},
+    })
+
+
+def send_balance_update(user_id: int, balance: Optional[str] = None) -> None:
+    """
+    Queue a balance update. With `balance=None` the wallet balance is read
+    when the event is sent, once for all users in the batch.
+    """
+    dispatch.queue(user_id, {
+        'type': dispatch.BALANCE_TYPE,
+        'data': {'balance': balance} if balance is not None else None,
+    })
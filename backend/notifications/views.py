@@ -0,0 +1,11 @@
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from . import announcements
+
+
+class LatestAnnouncementView(APIView):
+    """Latest announcement for the user, for clients that were not connected when it went out."""
+
+    def get(self, request):
+        return Response({'announcement': announcements.latest_for(request.user)})
@@ -1,5 +1,155 @@
-from django.contrib import admin
-from .models import Deposit, Withdrawal
+from django.contrib import admin, messages
+from django.db.models import Exists, OuterRef
+from django.urls import reverse
+from django.utils.html import format_html
+from .models import ArchivedPeriod, Deposit, TransactionArchive, Withdrawal
+from .bulk import bulk_approve, bulk_reject
 
-admin.site.register(Deposit)
-admin.site.register(Withdrawal)
\ No newline at end of file
+
+def _report(modeladmin, request, result, verb):
+    count = len(result.approved) if verb == 'approved' else len(result.rejected)
+    modeladmin.message_user(request, f"{count} transaction(s) {verb}.", messages.SUCCESS)
+    if result.insufficient:
+        modeladmin.message_user(
+            request,
+            f"{len(result.insufficient)} withdrawal(s) rejected for insufficient balance.",
+            messages.WARNING,
+        )
+    if result.skipped:
+        modeladmin.message_user(
+            request,
+            f"{len(result.skipped)} transaction(s) skipped because they were not pending.",
+            messages.INFO,
+        )
+
+
+@admin.action(description="Approve selected pending transactions")
+def approve_selected(modeladmin, request, queryset):
+    ids = list(queryset.values_list('pk', flat=True))
+    _report(modeladmin, request, bulk_approve(modeladmin.model, ids), 'approved')
+
+
+@admin.action(description="Reject selected pending transactions")
+def reject_selected(modeladmin, request, queryset):
+    ids = list(queryset.values_list('pk', flat=True))
+    _report(modeladmin, request, bulk_reject(modeladmin.model, ids), 'rejected')
+
+
+class TransitionAdminMixin:
+    """
+    Keep `status` out of the add and change forms.
+
+    A saved status would skip the ledger posting, or leave one behind
+    (approved -> pending). Every change goes through the approve/reject
+    actions, which follow the transitions: approved is final.
+    """
+
+    def get_readonly_fields(self, request, obj=None):
+        return (*super().get_readonly_fields(request, obj), 'status')
+
+
+class DuplicateProofFilter(admin.SimpleListFilter):
+    title = 'duplicate proof'
+    parameter_name = 'duplicate_proof'
+
+    def lookups(self, request, model_admin):
+        return (('yes', 'Yes'), ('no', 'No'))
+
+    def queryset(self, request, queryset):
+        if self.value() == 'yes':
+            return queryset.filter(proof_duplicate_of__isnull=False)
+        if self.value() == 'no':
+            return queryset.filter(proof_duplicate_of__isnull=True)
+        return queryset
+
+
+@admin.register(Deposit)
+class DepositAdmin(TransitionAdminMixin, admin.ModelAdmin):
+    list_display = ('reference', 'user', 'amount', 'method', 'proof', 'duplicate', 'status', 'created_at')
+    list_filter = ('status', DuplicateProofFilter, 'method', 'created_at')
+    search_fields = ('reference', 'user__email')
+    list_select_related = ('user',)
+    readonly_fields = ('proof_review', 'duplicate', 'proof_width', 'proof_height', 'proof_processed_at', 'proof_error')
+    actions = (approve_selected, reject_selected)
+
+    def get_queryset(self, request):
+        # Whether the matching deposit is still here or has been archived
+        return super().get_queryset(request).annotate(
+            duplicate_live=Exists(Deposit.objects.filter(pk=OuterRef('proof_duplicate_of'))),
+        )
+
+    @admin.display(description='Proof')
+    def proof(self, obj):
+        # Never inline the full upload in the changelist
+        if obj.proof_thumbnail:
+            return format_html(
+                '<a href="{}" target="_blank"><img src="{}" alt="" style="max-height: 48px"></a>',
+                (obj.proof_preview or obj.proof_thumbnail).url, obj.proof_thumbnail.url,
+            )
+        if obj.proof_error:
+            return format_html('<span style="color: #ba2121" title="{}">unreadable</span>', obj.proof_error)
+        if obj.proof_image:
+            return 'processing' if obj.proof_processed_at is None else format_html(
+                '<a href="{}" target="_blank">file</a>', obj.proof_image.url,
+            )
+        return '-'
+
+    @admin.display(description='Same proof as')
+    def duplicate(self, obj):
+        if obj.proof_duplicate_of is None:
+            return '-'
+        label = f"#{obj.proof_duplicate_of} (distance {obj.proof_duplicate_distance})"
+        if getattr(obj, 'duplicate_live', True):
+            url = reverse('admin:transactions_deposit_change', args=[obj.proof_duplicate_of])
+        else:
+            label += ', archived'
+            url = reverse('admin:transactions_transactionarchive_changelist') + (
+                f'?kind=DEPOSIT&source_id={obj.proof_duplicate_of}'
+            )
+        return format_html('<a href="{}" style="color: #ba2121">{}</a>', url, label)
+
+    @admin.display(description='Proof preview')
+    def proof_review(self, obj):
+        if obj.proof_preview:
+            return format_html(
+                '<a href="{}" target="_blank"><img src="{}" alt="" style="max-width: 100%"></a>',
+                obj.proof_image.url, obj.proof_preview.url,
+            )
+        return self.proof(obj)
+
+
+@admin.register(Withdrawal)
+class WithdrawalAdmin(TransitionAdminMixin, admin.ModelAdmin):
+    list_display = ('reference', 'user', 'amount', 'withdrawal_address', 'status', 'created_at')
+    list_filter = ('status', 'created_at')
+    search_fields = ('reference', 'user__email', 'withdrawal_address')
+    list_select_related = ('user',)
+    actions = (approve_selected, reject_selected)
+
+
+@admin.register(TransactionArchive)
+class TransactionArchiveAdmin(admin.ModelAdmin):
+    list_display = ('reference', 'kind', 'user', 'amount', 'status', 'created_at', 'archived_at')
+    list_filter = ('kind', 'status')
+    search_fields = ('reference', 'user__email')
+    list_select_related = ('user',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ArchivedPeriod)
+class ArchivedPeriodAdmin(admin.ModelAdmin):
+    list_display = ('month', 'deposits', 'withdrawals', 'archived_at')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
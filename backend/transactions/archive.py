@@ -0,0 +1,182 @@
+"""
+Archive tier for closed transaction periods.
+
+`archive_month()` moves the approved and rejected deposits and
+withdrawals of one finished calendar month out of the hot tables and
+into `TransactionArchive`, a batch at a time. Pending transactions stay
+where they are so they can still be approved. Balances are untouched:
+they come from the ledger and the daily rollups, which refer to
+transactions only by id. So do proof hashes and duplicate flags: an
+archived deposit's flag is copied to its archive row, and its ProofHash
+stays indexed for later duplicate checks.
+
+On PostgreSQL the archive is partitioned by month (see migration 0005)
+and each month gets its own partition before rows are moved in, so
+date-bounded reads only scan the partitions they need.
+
+`archive_horizon()` is the first instant not covered by the archive.
+History and export readers add the archive to their query only when
+the requested range starts before it.
+"""
+from datetime import datetime, time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import ArchivedPeriod, Deposit, TransactionArchive, Withdrawal
+
+PENDING = 'pending'
+BATCH_SIZE = 5000
+HORIZON_CACHE_KEY = 'transactions:archive:horizon'
+
+# (model, archive kind, ArchivedPeriod counter)
+SOURCES = (
+    (Deposit, 'DEPOSIT', 'deposits'),
+    (Withdrawal, 'WITHDRAWAL', 'withdrawals'),
+)
+
+
+def next_month(month):
+    return month.replace(year=month.year + 1, month=1) if month.month == 12 else month.replace(month=month.month + 1)
+
+
+def month_bounds(month):
+    """Aware `[start, end)` datetimes of the calendar month containing `month`."""
+    month = month.replace(day=1)
+    start = timezone.make_aware(datetime.combine(month, time.min))
+    end = timezone.make_aware(datetime.combine(next_month(month), time.min))
+    return start, end
+
+
+def archive_horizon():
+    """
+    Return the end of the latest archived month, or None if nothing has
+    been archived. `archive_month` refreshes the cached value; the
+    timeout bounds how long a process with its own cache (locmem) misses
+    a month archived elsewhere.
+    """
+    horizon = cache.get(HORIZON_CACHE_KEY)
+    if horizon is None:
+        horizon = _load_horizon()
+        cache.set(HORIZON_CACHE_KEY, horizon, settings.ARCHIVE_HORIZON_CACHE_SECONDS)
+    return horizon or None
+
+
+def _load_horizon():
+    month = ArchivedPeriod.objects.values_list('month', flat=True).first()
+    # False rather than None so "no archive" is cached too
+    return month_bounds(month)[1] if month else False
+
+
+def reaches_archive(date_from):
+    """True if a range starting at `date_from` (None = unbounded) may include archived rows."""
+    horizon = archive_horizon()
+    return horizon is not None and (date_from is None or date_from < horizon)
+
+
+def ensure_partition(month):
+    """Create the archive partition for `month` (PostgreSQL only)."""
+    if connection.vendor != 'postgresql':
+        return
+    table = TransactionArchive._meta.db_table
+    start, end = month_bounds(month)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE TABLE IF NOT EXISTS {table}_y{start:%Y}m{start:%m} "
+            f"PARTITION OF {table} FOR VALUES FROM (%s) TO (%s)",
+            [start, end],
+        )
+
+
+def _archive_row(instance, kind):
+    proof_image = instance.proof_image.name if kind == 'DEPOSIT' and instance.proof_image else ''
+    return TransactionArchive(
+        kind=kind,
+        source_id=instance.pk,
+        user_id=instance.user_id,
+        reference=instance.reference,
+        amount=instance.amount,
+        method=getattr(instance, 'method', ''),
+        proof_image=proof_image,
+        withdrawal_address=getattr(instance, 'withdrawal_address', ''),
+        status=instance.status,
+        created_at=instance.created_at,
+        proof_duplicate_of=getattr(instance, 'proof_duplicate_of', None),
+        proof_duplicate_distance=getattr(instance, 'proof_duplicate_distance', None),
+    )
+
+
+def _move_batch(model, kind, start, end, batch_size):
+    with transaction.atomic():
+        batch = list(
+            model.objects
+            .filter(created_at__gte=start, created_at__lt=end)
+            .exclude(status=PENDING)
+            .order_by('pk')
+            .select_for_update()[:batch_size]
+        )
+        if not batch:
+            return 0
+        TransactionArchive.objects.bulk_create([_archive_row(instance, kind) for instance in batch])
+        model.objects.filter(pk__in=[instance.pk for instance in batch]).delete()
+        return len(batch)
+
+
+def archive_month(month, batch_size=BATCH_SIZE):
+    """
+    Move the closed transactions of `month` into the archive.
+
+    Each batch is its own transaction, so the command can be interrupted
+    and re-run safely. Returns `{'deposits': n, 'withdrawals': n}`.
+    """
+    month = month.replace(day=1)
+    start, end = month_bounds(month)
+    ensure_partition(month)
+
+    moved = {}
+    for model, kind, counter in SOURCES:
+        total = 0
+        while True:
+            count = _move_batch(model, kind, start, end, batch_size)
+            total += count
+            if count < batch_size:
+                break
+        moved[counter] = total
+
+    period, _ = ArchivedPeriod.objects.get_or_create(month=month)
+    ArchivedPeriod.objects.filter(pk=period.pk).update(
+        deposits=F('deposits') + moved['deposits'],
+        withdrawals=F('withdrawals') + moved['withdrawals'],
+        archived_at=timezone.now(),
+    )
+    cache.set(HORIZON_CACHE_KEY, _load_horizon(), settings.ARCHIVE_HORIZON_CACHE_SECONDS)
+    return moved
+
+
+def archivable_months(before):
+    """First days of the months with closed hot rows older than `before` (a date)."""
+    cutoff = month_bounds(before)[0]
+    months = set()
+    for model, _, _ in SOURCES:
+        oldest = (
+            model.objects
+            .filter(created_at__lt=cutoff)
+            .exclude(status=PENDING)
+            .order_by('created_at')
+            .values_list('created_at', flat=True)
+            .first()
+        )
+        if oldest:
+            months.add(timezone.localdate(oldest).replace(day=1))
+    if not months:
+        return []
+
+    current, last = min(months), before.replace(day=1)
+    result = []
+    while current < last:
+        result.append(current)
+        current = next_month(current)
+    return result
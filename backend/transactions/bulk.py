@@ -0,0 +1,169 @@
+"""
+Bulk approval/rejection of pending deposits and withdrawals.
+
+A batch is processed inside one database transaction:
+
+1. the pending rows are locked and loaded in one query;
+2. for approvals, the affected wallets are locked once (in primary key
+   order, to avoid deadlocks with concurrent batches) and every user's
+   running balance is advanced in memory, oldest transaction first;
+3. ledger entries are inserted with `bulk_create`; wallets, daily
+   rollups and transaction statuses are written with `bulk_update`
+   (new rollup days with `bulk_create`).
+
+Per-row model signals are bypassed; `transaction_status_changed` is sent
+once per batch after commit so notifications never announce a change
+that was rolled back.
+"""
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import List
+
+from django.db import transaction
+from django.utils import timezone
+
+from wallet import cache as summary_cache
+from wallet import rollups
+from wallet.models import LedgerEntry, Wallet
+from .models import Deposit, Withdrawal
+from .signals import transaction_status_changed
+
+APPROVED = 'approved'
+REJECTED = 'rejected'
+PENDING = 'pending'
+
+BATCH_SIZE = 1000
+
+
+@dataclass
+class BulkResult:
+    approved: List[int] = field(default_factory=list)
+    rejected: List[int] = field(default_factory=list)
+    # Withdrawals rejected because the wallet could not cover them
+    insufficient: List[int] = field(default_factory=list)
+    skipped: List[int] = field(default_factory=list)
+
+    def as_dict(self):
+        return {
+            'approved': self.approved,
+            'rejected': self.rejected,
+            'insufficient_balance': self.insufficient,
+            'skipped': self.skipped,
+        }
+
+
+def _kind(model):
+    if model is Deposit:
+        return LedgerEntry.KIND_DEPOSIT
+    if model is Withdrawal:
+        return LedgerEntry.KIND_WITHDRAWAL
+    raise ValueError(f"Unsupported transaction model: {model!r}")
+
+
+def bulk_reject(model, ids):
+    """Reject every pending transaction of `model` whose id is in `ids`."""
+    _kind(model)
+    result = BulkResult()
+    with transaction.atomic():
+        pending = list(
+            model.objects.select_for_update()
+            .filter(pk__in=ids, status=PENDING)
+            .order_by('pk')
+        )
+        for tx in pending:
+            tx.status = REJECTED
+            result.rejected.append(tx.pk)
+        model.objects.bulk_update(pending, ['status'], batch_size=BATCH_SIZE)
+        _notify_on_commit(model, pending, REJECTED)
+
+    result.skipped = sorted(set(ids) - set(result.rejected))
+    return result
+
+
+def bulk_approve(model, ids):
+    """
+    Approve every pending transaction of `model` whose id is in `ids`.
+
+    Withdrawals that the user's balance cannot cover at their turn are
+    rejected, matching the single-approval behaviour.
+    """
+    kind = _kind(model)
+    result = BulkResult()
+
+    with transaction.atomic():
+        pending = list(
+            model.objects.select_for_update()
+            .filter(pk__in=ids, status=PENDING)
+            .order_by('created_at', 'pk')
+        )
+        user_ids = {tx.user_id for tx in pending}
+
+        # Make sure every user has a wallet, then lock them all in one go
+        Wallet.objects.bulk_create(
+            [Wallet(user_id=uid) for uid in user_ids],
+            ignore_conflicts=True,
+        )
+        wallets = {
+            w.user_id: w
+            for w in Wallet.objects.select_for_update().filter(user_id__in=user_ids).order_by('pk')
+        }
+
+        entries = []
+        by_user = defaultdict(list)
+        for tx in pending:
+            wallet = wallets[tx.user_id]
+            if kind == LedgerEntry.KIND_DEPOSIT:
+                wallet.balance += tx.amount
+                wallet.total_deposits += tx.amount
+            elif wallet.balance >= tx.amount:
+                wallet.balance -= tx.amount
+                wallet.total_withdrawals += tx.amount
+            else:
+                tx.status = REJECTED
+                result.insufficient.append(tx.pk)
+                continue
+
+            tx.status = APPROVED
+            result.approved.append(tx.pk)
+            entry = LedgerEntry(
+                user_id=tx.user_id,
+                kind=kind,
+                amount=tx.amount,
+                balance_after=wallet.balance,
+                total_deposits=wallet.total_deposits,
+                total_withdrawals=wallet.total_withdrawals,
+                source_id=tx.pk,
+                reference=tx.reference or '',
+            )
+            entries.append(entry)
+            by_user[tx.user_id].append(entry)
+
+        LedgerEntry.objects.bulk_create(entries, batch_size=BATCH_SIZE)
+        rollups.record_many(entries)
+        now = timezone.now()
+        changed_wallets = [wallets[uid] for uid in by_user]
+        for wallet in changed_wallets:
+            wallet.last_updated = now
+        Wallet.objects.bulk_update(
+            changed_wallets,
+            ['balance', 'total_deposits', 'total_withdrawals', 'last_updated'],
+            batch_size=BATCH_SIZE,
+        )
+        model.objects.bulk_update(pending, ['status'], batch_size=BATCH_SIZE)
+
+        for uid in by_user:
+            summary_cache.invalidate_on_commit(uid)
+
+        _notify_on_commit(model, [tx for tx in pending if tx.status == APPROVED], APPROVED)
+        _notify_on_commit(model, [tx for tx in pending if tx.status == REJECTED], REJECTED)
+
+    result.skipped = sorted(set(ids) - set(result.approved) - set(result.insufficient))
+    return result
+
+
+def _notify_on_commit(model, instances, status):
+    if not instances:
+        return
+    transaction.on_commit(lambda: transaction_status_changed.send(
+        sender=model, instances=instances, status=status,
+    ))
@@ -0,0 +1,121 @@
+"""
+Near-duplicate proof detection with a multi-index Hamming lookup.
+
+Each proof's 64-bit pHash is split into four 16-bit chunks, each stored
+in its own indexed column. If two hashes differ in at most `d` bits,
+then by the pigeonhole principle at least one chunk differs in at most
+`d // 4` bits. A lookup therefore only fetches rows where some chunk is
+within that radius of the query's chunk: an indexed `IN` list per
+column, ORed together. The few candidates are then checked exactly on
+both pHash and dHash. With millions of proofs that is a handful of
+index probes and a few dozen rows per query.
+"""
+from dataclasses import dataclass
+from itertools import combinations
+
+from django.conf import settings
+from django.db.models import Q
+
+from .models import Deposit, ProofHash
+from .phash import distance
+
+CHUNKS = 4
+CHUNK_BITS = 16
+CHUNK_MASK = (1 << CHUNK_BITS) - 1
+SIGN_BIT = 1 << 63
+
+
+@dataclass(frozen=True)
+class Match:
+    deposit_id: int
+    user_id: int
+    distance: int
+
+
+def to_signed(value):
+    """Store an unsigned 64-bit hash in a signed BIGINT column."""
+    return value - (1 << 64) if value & SIGN_BIT else value
+
+
+def to_unsigned(value):
+    return value + (1 << 64) if value < 0 else value
+
+
+def split(value):
+    return [(value >> (CHUNK_BITS * (CHUNKS - 1 - i))) & CHUNK_MASK for i in range(CHUNKS)]
+
+
+def _within(chunk, radius):
+    """Every 16-bit value at most `radius` bits away from `chunk`."""
+    values = [chunk]
+    for flips in range(1, radius + 1):
+        for bits in combinations(range(CHUNK_BITS), flips):
+            value = chunk
+            for bit in bits:
+                value ^= 1 << bit
+            values.append(value)
+    return values
+
+
+def find_matches(phash, dhash, exclude_deposit=None, max_distance=None, max_dhash_distance=None):
+    """Indexed proofs within the configured distances, closest first."""
+    if max_distance is None:
+        max_distance = settings.PROOF_PHASH_MAX_DISTANCE
+    if max_dhash_distance is None:
+        max_dhash_distance = settings.PROOF_DHASH_MAX_DISTANCE
+
+    radius = max_distance // CHUNKS
+    match = Q()
+    for index, chunk in enumerate(split(phash)):
+        match |= Q(**{f'chunk{index}__in': _within(chunk, radius)})
+    candidates = ProofHash.objects.filter(match)
+    if exclude_deposit is not None:
+        candidates = candidates.exclude(deposit_id=exclude_deposit)
+
+    matches = []
+    for deposit_id, user_id, other_phash, other_dhash in candidates.values_list(
+        'deposit_id', 'user_id', 'phash', 'dhash',
+    ):
+        p_distance = distance(phash, to_unsigned(other_phash))
+        if p_distance <= max_distance and distance(dhash, to_unsigned(other_dhash)) <= max_dhash_distance:
+            matches.append(Match(deposit_id, user_id, p_distance))
+    matches.sort(key=lambda m: (m.distance, m.deposit_id))
+    return matches
+
+
+def record(deposit_id, user_id, phash, dhash):
+    """
+    Index one deposit's proof hashes and flag the deposit if an earlier
+    deposit's proof looks the same. Returns the closest earlier Match
+    or None.
+
+    Proofs are not always hashed in deposit order (backfills, retries),
+    so later deposits that match and are not flagged yet are flagged
+    against this one too.
+    """
+    matches = find_matches(phash, dhash, exclude_deposit=deposit_id)
+    earlier = [m for m in matches if m.deposit_id < deposit_id]
+    chunks = split(phash)
+    ProofHash.objects.update_or_create(
+        deposit_id=deposit_id,
+        defaults={
+            'user_id': user_id,
+            'phash': to_signed(phash),
+            'dhash': to_signed(dhash),
+            **{f'chunk{i}': chunk for i, chunk in enumerate(chunks)},
+        },
+    )
+    best = earlier[0] if earlier else None
+    Deposit.objects.filter(pk=deposit_id).update(
+        proof_duplicate_of=best.deposit_id if best else None,
+        proof_duplicate_distance=best.distance if best else None,
+    )
+    for later in (m for m in matches if m.deposit_id > deposit_id):
+        Deposit.objects.filter(pk=later.deposit_id, proof_duplicate_of__isnull=True).update(
+            proof_duplicate_of=deposit_id, proof_duplicate_distance=later.distance,
+        )
+    return best
+
+
+def forget(deposit_id):
+    ProofHash.objects.filter(deposit_id=deposit_id).delete()
@@ -0,0 +1,93 @@
+"""
+Streaming statement exports.
+
+Rows come from the same ordered UNION query as the transaction history,
+read in keyset pages of CHUNK_SIZE rows, and each page is encoded into
+one chunk of the response body. Only one page is ever held in memory,
+whatever the size of the statement. The archive tier is only read when
+the requested range starts before its horizon.
+
+Under ASGI the body must be an async iterator: Django buffers a sync
+iterator in full (`sync_to_async(list)`) before sending anything, so
+`astream()` fetches each page through `sync_to_async` instead. `stream()`
+is the same for WSGI and other sync callers.
+"""
+import csv
+import io
+import json
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .archive import reaches_archive
+from .history import history_queryset, serialize_row
+
+CHUNK_SIZE = 2000
+CSV_COLUMNS = ('id', 'type', 'date', 'amount', 'status', 'method', 'withdrawal_address', 'proof_image')
+
+
+def fetch_page(user, cursor=None, status=None, date_from=None, date_to=None, include_archive=False):
+    """Return `(rows, next_cursor)` for one page; `next_cursor` is None after the last page."""
+    fetched = list(history_queryset(
+        user, status=status, cursor=cursor, date_from=date_from, date_to=date_to,
+        limit=CHUNK_SIZE, include_archive=include_archive,
+    )[:CHUNK_SIZE])
+    rows = [serialize_row(values) for values in fetched]
+    if len(fetched) < CHUNK_SIZE:
+        return rows, None
+    last = rows[-1]
+    return rows, (last['date'], last['type'], last['id'])
+
+
+def encode_csv(rows, first):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if first:
+        writer.writerow(CSV_COLUMNS)
+    for row in rows:
+        writer.writerow([row.get(column) if row.get(column) is not None else '' for column in CSV_COLUMNS])
+    return buffer.getvalue()
+
+
+def encode_ndjson(rows, first):
+    return ''.join(json.dumps(row, cls=DjangoJSONEncoder) + '\n' for row in rows)
+
+
+FORMATS = {
+    'csv': (encode_csv, 'text/csv', 'csv'),
+    'ndjson': (encode_ndjson, 'application/x-ndjson', 'ndjson'),
+}
+
+
+def _filters(status, date_from, date_to):
+    return {
+        'status': status,
+        'date_from': date_from,
+        'date_to': date_to,
+        'include_archive': reaches_archive(date_from),
+    }
+
+
+def stream(user, output, status=None, date_from=None, date_to=None):
+    """Encoded chunks of the statement, one per page."""
+    encode = FORMATS[output][0]
+    filters = _filters(status, date_from, date_to)
+    rows, cursor = fetch_page(user, **filters)
+    yield encode(rows, True)
+    while cursor is not None:
+        rows, cursor = fetch_page(user, cursor, **filters)
+        yield encode(rows, False)
+
+
+def astream(user, output, status=None, date_from=None, date_to=None):
+    """Like `stream()`, for ASGI. Call from sync code; pages are read through `sync_to_async`."""
+    return _astream(user, FORMATS[output][0], _filters(status, date_from, date_to))
+
+
+async def _astream(user, encode, filters):
+    fetch = sync_to_async(fetch_page)
+    rows, cursor = await fetch(user, **filters)
+    yield encode(rows, True)
+    while cursor is not None:
+        rows, cursor = await fetch(user, cursor, **filters)
+        yield encode(rows, False)
@@ -0,0 +1,161 @@
+"""
+Unified, database-ordered transaction history.
+
+Deposits and withdrawals are combined with a single `UNION ALL` query
+ordered by `(created_at, type, id)` descending, and paged with a keyset
+cursor instead of page numbers. The cursor predicate is pushed into both
+branches of the union, so fetching any page only reads `page_size + 1`
+rows from the `(user, created_at)` indexes, however long the history is.
+
+Closed months moved to the archive tier (see `archive.py`) are added as
+a third branch only when the requested range reaches past the archive
+horizon.
+"""
+import base64
+import binascii
+from datetime import datetime
+
+from django.core.files.storage import default_storage
+from django.db import connection
+from django.db.models import CharField, F, Q, Value
+
+from . import archive
+from .models import Deposit, TransactionArchive, Withdrawal
+
+DEPOSIT = 'DEPOSIT'
+WITHDRAWAL = 'WITHDRAWAL'
+
+COLUMNS = ('id', 'amount', 'type', 'status', 'date', 'method', 'proof_image', 'withdrawal_address')
+ORDERING = ('-date', '-type', '-id')
+DATE_COLUMN = COLUMNS.index('date')
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(row):
+    raw = f"{row['date'].isoformat()}|{row['type']}|{row['id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(token):
+    """Return `(date, type, id)` for a cursor produced by `encode_cursor`."""
+    try:
+        raw = base64.urlsafe_b64decode(token.encode()).decode()
+        date, t_type, pk = raw.split('|')
+        if t_type not in (DEPOSIT, WITHDRAWAL):
+            raise ValueError(t_type)
+        return datetime.fromisoformat(date), t_type, int(pk)
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        raise InvalidCursor("Invalid cursor")
+
+
+def _after_cursor(t_type, cursor):
+    """Rows of branch `t_type` that sort strictly after `cursor`."""
+    c_date, c_type, c_id = cursor
+    if t_type < c_type:
+        # Branch sorts after the cursor's branch at equal timestamps
+        return Q(created_at__lte=c_date)
+    if t_type > c_type:
+        return Q(created_at__lt=c_date)
+    return Q(created_at__lt=c_date) | Q(created_at=c_date, pk__lt=c_id)
+
+
+def _branch(model, t_type, user, status=None, cursor=None, date_from=None, date_to=None):
+    qs = model.objects.filter(user=user)
+    if status:
+        qs = qs.filter(status=status)
+    if date_from:
+        qs = qs.filter(created_at__gte=date_from)
+    if date_to:
+        qs = qs.filter(created_at__lt=date_to)
+    if cursor:
+        qs = qs.filter(_after_cursor(t_type, cursor))
+
+    blank = Value('', output_field=CharField())
+    if model is Deposit:
+        extra = {'withdrawal_address': blank}
+    else:
+        extra = {'method': blank, 'proof_image': blank}
+    return (
+        qs.order_by()
+        .annotate(type=Value(t_type, output_field=CharField()), date=F('created_at'), **extra)
+        .values_list(*COLUMNS)
+    )
+
+
+def _archive_branch(user, status=None, cursor=None, date_from=None, date_to=None):
+    qs = TransactionArchive.objects.filter(user=user)
+    if status:
+        qs = qs.filter(status=status)
+    if date_from:
+        qs = qs.filter(created_at__gte=date_from)
+    if date_to:
+        qs = qs.filter(created_at__lt=date_to)
+    if cursor:
+        c_date, c_type, c_id = cursor
+        qs = qs.filter(
+            Q(created_at__lt=c_date)
+            | Q(created_at=c_date, kind__lt=c_type)
+            | Q(created_at=c_date, kind=c_type, source_id__lt=c_id)
+        )
+    return (
+        qs.order_by()
+        .annotate(tx_id=F('source_id'), type=F('kind'), date=F('created_at'))
+        .values_list('tx_id', 'amount', 'type', 'status', 'date', 'method', 'proof_image', 'withdrawal_address')
+    )
+
+
+def history_queryset(user, status=None, cursor=None, date_from=None, date_to=None, limit=None,
+                     include_archive=False):
+    """
+    Ordered `UNION ALL` of the user's deposits and withdrawals as value tuples.
+
+    When the backend allows it, each branch is also limited so the
+    database never reads more than `limit` rows from either table.
+    `include_archive` adds the archived transactions as a third branch.
+    """
+    branches = [
+        (_branch(Deposit, DEPOSIT, user, status, cursor, date_from, date_to), ('-created_at', '-id')),
+        (_branch(Withdrawal, WITHDRAWAL, user, status, cursor, date_from, date_to), ('-created_at', '-id')),
+    ]
+    if include_archive:
+        branches.append((
+            _archive_branch(user, status, cursor, date_from, date_to),
+            ('-created_at', '-kind', '-source_id'),
+        ))
+    if limit and connection.features.supports_slicing_ordering_in_compound:
+        branches = [(qs.order_by(*ordering)[:limit], ordering) for qs, ordering in branches]
+    querysets = [qs for qs, _ in branches]
+    return querysets[0].union(*querysets[1:], all=True).order_by(*ORDERING)
+
+
+def serialize_row(values):
+    row = dict(zip(COLUMNS, values))
+    if row['type'] == DEPOSIT:
+        del row['withdrawal_address']
+        row['proof_image'] = default_storage.url(row['proof_image']) if row['proof_image'] else None
+    else:
+        del row['method']
+        del row['proof_image']
+    return row
+
+
+def history_page(user, page_size, status=None, cursor=None):
+    """
+    Return `(rows, next_cursor)` for one page of the user's history.
+
+    `next_cursor` is None on the last page. The archive is only queried
+    when the page cannot be filled from rows newer than its horizon.
+    """
+    limit = page_size + 1
+    fetched = list(history_queryset(user, status=status, cursor=cursor, limit=limit)[:limit])
+    horizon = archive.archive_horizon()
+    if horizon and (len(fetched) < limit or fetched[-1][DATE_COLUMN] < horizon):
+        fetched = list(history_queryset(
+            user, status=status, cursor=cursor, limit=limit, include_archive=True,
+        )[:limit])
+    rows = [serialize_row(values) for values in fetched[:page_size]]
+    next_cursor = encode_cursor(rows[-1]) if len(fetched) > page_size else None
+    return rows, next_cursor
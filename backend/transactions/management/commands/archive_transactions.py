@@ -0,0 +1,49 @@
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from transactions import archive
+
+
+class Command(BaseCommand):
+    help = (
+        'Move approved and rejected transactions of closed months into the '
+        'archive tier (month-partitioned on PostgreSQL)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keep-months', type=int, default=12,
+                            help='Full months to keep in the hot tables besides the current one')
+        parser.add_argument('--before', help='Archive months before this one (YYYY-MM) instead')
+        parser.add_argument('--batch-size', type=int, default=archive.BATCH_SIZE)
+        parser.add_argument('--dry-run', action='store_true', help='Only list the months that would be archived')
+
+    def handle(self, *args, **options):
+        current = timezone.localdate().replace(day=1)
+        if options['before']:
+            try:
+                before = datetime.strptime(options['before'], '%Y-%m').date()
+            except ValueError:
+                raise CommandError('--before must look like YYYY-MM')
+            if before > current:
+                raise CommandError('Only closed months can be archived')
+        else:
+            before = current
+            for _ in range(max(options['keep_months'], 0)):
+                before = (before - timedelta(days=1)).replace(day=1)
+
+        months = archive.archivable_months(before)
+        if not months:
+            self.stdout.write('Nothing to archive.')
+            return
+
+        for month in months:
+            if options['dry_run']:
+                self.stdout.write(f'Would archive {month:%Y-%m}')
+                continue
+            moved = archive.archive_month(month, batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(
+                f'{month:%Y-%m}: archived {moved["deposits"]} deposit(s) and '
+                f'{moved["withdrawals"]} withdrawal(s)'
+            ))
@@ -0,0 +1,63 @@
+import time
+import uuid
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from transactions.bulk import bulk_approve
+from transactions.models import Deposit, Withdrawal
+from transactions.references import next_references
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Benchmark bulk approval of pending deposits and withdrawals'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', type=int, nargs='+', default=[1000, 10000],
+            help='Number of pending items per run',
+        )
+        parser.add_argument('--users', type=int, default=100, help='Distinct users the items are spread over')
+
+    def handle(self, *args, **options):
+        for size in options['sizes']:
+            self._run(size, options['users'])
+
+    def _run(self, size, user_count):
+        run_id = uuid.uuid4().hex[:8]
+        User.objects.bulk_create([
+            User(email=f'bulk-{run_id}-{i}@example.com', username=f'bulk-{run_id}-{i}')
+            for i in range(user_count)
+        ])
+        users = list(User.objects.filter(email__startswith=f'bulk-{run_id}-'))
+
+        # Half deposits, half smaller withdrawals so most withdrawals are covered
+        references = next_references(size)
+        Deposit.objects.bulk_create([
+            Deposit(user=users[i % len(users)], amount=Decimal('100.00'), reference=references[i])
+            for i in range(size // 2)
+        ])
+        Withdrawal.objects.bulk_create([
+            Withdrawal(user=users[i % len(users)], amount=Decimal('40.00'), reference=references[size // 2 + i])
+            for i in range(size - size // 2)
+        ])
+        deposit_ids = list(Deposit.objects.filter(user__in=users).values_list('pk', flat=True))
+        withdrawal_ids = list(Withdrawal.objects.filter(user__in=users).values_list('pk', flat=True))
+
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            d_result = bulk_approve(Deposit, deposit_ids)
+            w_result = bulk_approve(Withdrawal, withdrawal_ids)
+            elapsed = time.perf_counter() - started
+
+        approved = len(d_result.approved) + len(w_result.approved)
+        self.stdout.write(self.style.SUCCESS(
+            f'{size} items over {len(users)} users: {approved} approved, '
+            f'{len(w_result.insufficient)} rejected for balance, '
+            f'{elapsed:.2f}s ({size / elapsed:.0f} items/s), {len(queries)} queries'
+        ))
@@ -0,0 +1,138 @@
+import asyncio
+import time
+import uuid
+from decimal import Decimal
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import AccessToken
+
+from transactions import exports
+from transactions.models import Deposit, Withdrawal
+from transactions.references import next_references
+
+User = get_user_model()
+
+INSERT_BATCH = 10000
+
+
+def _rss_mb():
+    """Current resident set size of this process in MB (Linux)."""
+    import resource
+    try:
+        with open('/proc/self/statm') as fh:
+            pages = int(fh.read().split()[1])
+        return pages * resource.getpagesize() / (1024 * 1024)
+    except OSError:
+        # Fall back to the peak RSS where /proc is unavailable
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class Command(BaseCommand):
+    help = (
+        'Export a synthetic statement through the ASGI handler (as served by '
+        'uvicorn) and fail if resident memory grows past a fixed ceiling'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000000)
+        parser.add_argument('--output', choices=sorted(exports.FORMATS), default='csv')
+        parser.add_argument('--max-rss-growth-mb', type=float, default=64.0,
+                            help='Allowed RSS growth over the baseline while exporting')
+        parser.add_argument('--user', type=int, help='Export an existing user instead of generating rows')
+
+    def handle(self, *args, **options):
+        if options['user']:
+            user = User.objects.get(pk=options['user'])
+        else:
+            user = self._generate(options['rows'])
+
+        baseline = _rss_mb()
+        started = time.perf_counter()
+        status, chunks, size, peak, first_byte = async_to_sync(self._export)(user, options['output'])
+        elapsed = time.perf_counter() - started
+        peak = max(peak, _rss_mb())
+        if status != 200:
+            raise CommandError(f'Export answered HTTP {status}')
+
+        growth = peak - baseline
+        summary = (
+            f'{chunks} chunks / {size / (1024 * 1024):.1f} MB of {options["output"]} in {elapsed:.1f}s '
+            f'(first byte after {first_byte * 1000:.0f}ms), '
+            f'RSS baseline {baseline:.1f} MB, peak {peak:.1f} MB (+{growth:.1f} MB)'
+        )
+        if growth > options['max_rss_growth_mb']:
+            raise CommandError(summary)
+        self.stdout.write(self.style.SUCCESS(summary))
+
+    async def _export(self, user, output):
+        """GET the export through Django's ASGI handler; returns (status, chunks, bytes, peak RSS, first byte)."""
+        path = reverse('transaction_export')
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': 'GET',
+            'scheme': 'http',
+            'path': path,
+            'raw_path': path.encode(),
+            'query_string': f'output={output}'.encode(),
+            'root_path': '',
+            'headers': [
+                (b'host', b'localhost'),
+                (b'authorization', f'Bearer {AccessToken.for_user(user)}'.encode()),
+            ],
+            'client': ('127.0.0.1', 0),
+            'server': ('localhost', 80),
+        }
+        requested = False
+        started = time.perf_counter()
+        result = {'status': None, 'chunks': 0, 'size': 0, 'peak': _rss_mb(), 'first_byte': None}
+
+        async def receive():
+            nonlocal requested
+            if not requested:
+                requested = True
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+            # The client never disconnects
+            await asyncio.Event().wait()
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                result['status'] = message['status']
+            elif message['type'] == 'http.response.body':
+                if result['first_byte'] is None:
+                    result['first_byte'] = time.perf_counter() - started
+                result['size'] += len(message.get('body', b''))
+                result['chunks'] += 1
+                if result['chunks'] % 10 == 0:
+                    result['peak'] = max(result['peak'], _rss_mb())
+
+        await get_asgi_application()(scope, receive, send)
+        return result['status'], result['chunks'], result['size'], result['peak'], result['first_byte'] or 0
+
+    def _generate(self, count):
+        run_id = uuid.uuid4().hex[:8]
+        user = User.objects.create(email=f'export-{run_id}@example.com', username=f'export-{run_id}', is_active=True)
+        self.stdout.write(f'Generating {count} transactions for {user.email}...')
+        remaining = count
+        while remaining:
+            batch = min(remaining, INSERT_BATCH)
+            references = next_references(batch)
+            with transaction.atomic():
+                Deposit.objects.bulk_create([
+                    Deposit(user=user, amount=Decimal('25.00'), method='USDT-TRC20',
+                            status='approved', reference=references[i])
+                    for i in range(batch // 2)
+                ])
+                Withdrawal.objects.bulk_create([
+                    Withdrawal(user=user, amount=Decimal('10.00'), withdrawal_address='TXYZ',
+                               status='approved', reference=references[batch // 2 + i])
+                    for i in range(batch - batch // 2)
+                ])
+            remaining -= batch
+        return user
@@ -0,0 +1,66 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from transactions import duplicates
+from transactions.models import ProofHash
+
+INSERT_BATCH = 10000
+
+
+class Command(BaseCommand):
+    help = 'Time near-duplicate proof lookups against a synthetic index of perceptual hashes (rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000000)
+        parser.add_argument('--queries', type=int, default=500)
+
+    def handle(self, *args, **options):
+        rng = random.Random(1)
+        with transaction.atomic():
+            known = self._populate(rng, options['rows'])
+
+            timings, found = [], 0
+            for i in range(options['queries']):
+                phash, dhash = known[i % len(known)]
+                # Half the queries are a near-copy of an indexed proof
+                if i % 2 == 0:
+                    phash ^= 1 << rng.randrange(64)
+                    phash ^= 1 << rng.randrange(64)
+                else:
+                    phash, dhash = rng.getrandbits(64), rng.getrandbits(64)
+                started = time.perf_counter()
+                found += bool(duplicates.find_matches(phash, dhash))
+                timings.append(time.perf_counter() - started)
+            transaction.set_rollback(True)
+
+        timings.sort()
+        self.stdout.write(self.style.SUCCESS(
+            f'{options["queries"]} lookups over {options["rows"]} hashes: '
+            f'mean {statistics.mean(timings) * 1000:.2f} ms, '
+            f'p50 {timings[len(timings) // 2] * 1000:.2f} ms, '
+            f'p99 {timings[int(len(timings) * 0.99)] * 1000:.2f} ms; '
+            f'{found} with a match (expected about {(options["queries"] + 1) // 2})'
+        ))
+
+    def _populate(self, rng, count):
+        self.stdout.write(f'Indexing {count} synthetic hashes...')
+        known = []
+        offset = -count  # negative ids never collide with real deposits
+        for start in range(0, count, INSERT_BATCH):
+            rows = []
+            for i in range(start, min(start + INSERT_BATCH, count)):
+                phash, dhash = rng.getrandbits(64), rng.getrandbits(64)
+                chunks = duplicates.split(phash)
+                rows.append(ProofHash(
+                    deposit_id=offset + i, user_id=0,
+                    phash=duplicates.to_signed(phash), dhash=duplicates.to_signed(dhash),
+                    chunk0=chunks[0], chunk1=chunks[1], chunk2=chunks[2], chunk3=chunks[3],
+                ))
+                if len(known) < 1000:
+                    known.append((phash, dhash))
+            ProofHash.objects.bulk_create(rows)
+        return known
@@ -0,0 +1,79 @@
+import io
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from PIL import Image
+
+from transactions.proofs import render
+
+
+def _synthetic_photo(width, height, seed):
+    """A JPEG with smooth gradients and sensor-like noise, carrying EXIF."""
+    gradient = Image.linear_gradient('L').resize((width, height))
+    radial = Image.radial_gradient('L').resize((width, height))
+    noise = Image.effect_noise((width, height), 24 + seed)
+    image = Image.merge('RGB', (gradient, radial, gradient.rotate(90 * seed, expand=False)))
+    image = Image.blend(image, Image.merge('RGB', (noise, noise, noise)), 0.12)
+    exif = Image.Exif()
+    exif[0x0112] = 6  # orientation: rotated 90 degrees
+    exif[0x010F] = 'Synthetic Camera'
+    buffer = io.BytesIO()
+    image.save(buffer, 'JPEG', quality=90, exif=exif.tobytes())
+    return buffer.getvalue()
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure proof-image pipeline throughput on a synthetic backlog '
+        '(decode, EXIF strip, downscale, three re-encodes per image)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--images', type=int, default=10000, help='Backlog size')
+        parser.add_argument('--workers', type=int, default=settings.BACKGROUND_WORKERS)
+        parser.add_argument('--size', default='4032x3024', help='Source photo size, WIDTHxHEIGHT')
+        parser.add_argument('--variants', type=int, default=8, help='Distinct source photos to cycle through')
+
+    def handle(self, *args, **options):
+        try:
+            width, height = (int(v) for v in options['size'].lower().split('x'))
+        except ValueError:
+            raise CommandError('--size must look like 4032x3024')
+
+        sources = [_synthetic_photo(width, height, i) for i in range(max(options['variants'], 1))]
+        count = options['images']
+        self.stdout.write(
+            f'{count} images of {width}x{height} '
+            f'(~{statistics.mean(len(s) for s in sources) / (1024 * 1024):.1f} MB each), '
+            f'{options["workers"]} workers'
+        )
+
+        def task(index):
+            started = time.perf_counter()
+            renditions = render(io.BytesIO(sources[index % len(sources)]))
+            return time.perf_counter() - started, renditions
+
+        latencies, bytes_out = [], 0
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            for latency, renditions in pool.map(task, range(count), chunksize=16):
+                latencies.append(latency)
+                bytes_out += len(renditions.image) + len(renditions.preview) + len(renditions.thumbnail)
+        elapsed = time.perf_counter() - started
+
+        sample = render(io.BytesIO(sources[0]))
+        with Image.open(io.BytesIO(sample.image)) as check:
+            if check.getexif() or 'exif' in check.info:
+                raise CommandError('Processed image still carries EXIF metadata')
+
+        latencies.sort()
+        self.stdout.write(self.style.SUCCESS(
+            f'{count} images in {elapsed:.1f}s ({count / elapsed:.1f} images/s); '
+            f'per image p50 {latencies[len(latencies) // 2] * 1000:.0f} ms, '
+            f'p95 {latencies[int(len(latencies) * 0.95)] * 1000:.0f} ms; '
+            f'output {bytes_out / count / 1024:.0f} KB/image, '
+            f'{sample.width}x{sample.height} after orientation'
+        ))
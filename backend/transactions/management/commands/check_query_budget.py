@@ -0,0 +1,83 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from transactions import archive
+from transactions.models import Deposit, Withdrawal
+from wallet import cache as summary_cache
+from wallet.models import SystemSettings
+
+User = get_user_model()
+
+# Maximum number of SQL statements per request. Raise a budget only together
+# with a matching change in the code path it guards.
+BUDGETS = {
+    # user lookup, ledger lookup (summary cache miss), rollup range,
+    # history page, system settings
+    'dashboard_bootstrap_cold': 5,
+    # same, with the summary served from cache
+    'dashboard_bootstrap_warm': 4,
+    # status update, wallet update + read, ledger insert, rollup upsert
+    # (update, plus insert for the first movement of the day)
+    'approve_deposit': 6,
+    'approve_withdrawal': 6,
+    'reject_deposit': 1,
+}
+
+
+class Command(BaseCommand):
+    help = 'Fail if key request paths issue more SQL queries than their pinned budget'
+
+    def handle(self, *args, **options):
+        failures = []
+        # Everything created here is rolled back at the end
+        with transaction.atomic():
+            user = User.objects.create(
+                email='query-budget@example.com', username='query-budget', is_active=True,
+            )
+            for _ in range(30):
+                Deposit.objects.create(user=user, amount='10.00')
+                Withdrawal.objects.create(user=user, amount='1.00')
+            # The singleton normally exists already; don't count its creation
+            SystemSettings.get_instance()
+            # Likewise the archive horizon, which is cached without expiry
+            archive.archive_horizon()
+
+            client = APIClient()
+            client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+
+            summary_cache.invalidate(user.pk)
+            failures += self._measure('dashboard_bootstrap_cold', lambda: client.get(
+                '/api/transactions/dashboard/bootstrap/', HTTP_HOST='localhost'))
+            failures += self._measure('dashboard_bootstrap_warm', lambda: client.get(
+                '/api/transactions/dashboard/bootstrap/', HTTP_HOST='localhost'))
+
+            deposits = list(Deposit.objects.filter(user=user))
+            withdrawal = Withdrawal.objects.filter(user=user).first()
+            failures += self._measure('approve_deposit', deposits[0].approve)
+            failures += self._measure('approve_withdrawal', withdrawal.approve)
+            failures += self._measure('reject_deposit', deposits[1].reject)
+
+            summary_cache.invalidate(user.pk)
+            transaction.set_rollback(True)
+
+        if failures:
+            raise CommandError('Query budget exceeded:\n' + '\n'.join(failures))
+
+    def _measure(self, name, call):
+        with CaptureQueriesContext(connection) as queries:
+            response = call()
+        status_code = getattr(response, 'status_code', 200)
+        if status_code >= 400:
+            return [f'{name}: request failed with HTTP {status_code}']
+
+        count, budget = len(queries), BUDGETS[name]
+        line = f'{name}: {count} queries (budget {budget})'
+        if count > budget:
+            statements = '\n'.join(f'    {q["sql"]}' for q in queries.captured_queries)
+            return [f'{line}\n{statements}']
+        self.stdout.write(self.style.SUCCESS(line))
+        return []
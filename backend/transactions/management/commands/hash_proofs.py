@@ -0,0 +1,77 @@
+import io
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db.models import Exists, OuterRef
+
+from transactions import duplicates
+from transactions.models import Deposit, ProofHash
+from transactions.proofs import UnreadableProof, proof_hashes
+
+
+def _hash_bytes(data):
+    # Runs in a worker process: pure computation, no database access
+    try:
+        return proof_hashes(io.BytesIO(data))
+    except UnreadableProof:
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        'Compute perceptual hashes for deposit proofs that have none yet, '
+        'in parallel worker processes, and flag near-duplicates'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+        parser.add_argument('--limit', type=int, help='Hash at most this many deposits')
+
+    def handle(self, *args, **options):
+        deposits = (
+            Deposit.objects
+            .exclude(proof_image='')
+            .exclude(proof_image__isnull=True)
+            .filter(~Exists(ProofHash.objects.filter(deposit_id=OuterRef('pk'))))
+            .order_by('pk')
+            .values_list('pk', 'user_id', 'proof_image')
+        )
+        if options['limit']:
+            deposits = deposits[:options['limit']]
+        deposits = list(deposits)
+        if not deposits:
+            self.stdout.write('Nothing to hash.')
+            return
+
+        storage = Deposit._meta.get_field('proof_image').storage
+        # Keep a bounded number of files in flight
+        window = max(options['workers'], 1) * 4
+        hashed = skipped = flagged = 0
+        started = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+            for start in range(0, len(deposits), window):
+                batch = deposits[start:start + window]
+                futures = [pool.submit(_hash_bytes, self._read(storage, name)) for _, _, name in batch]
+                for (deposit_id, user_id, _), future in zip(batch, futures):
+                    result = future.result()
+                    if result is None:
+                        skipped += 1
+                        continue
+                    hashed += 1
+                    flagged += duplicates.record(deposit_id, user_id, *result) is not None
+        elapsed = time.perf_counter() - started
+
+        rate = len(deposits) / elapsed if elapsed else float('inf')
+        self.stdout.write(self.style.SUCCESS(
+            f'{hashed} proof(s) hashed, {skipped} skipped (missing, not an image or unreadable), '
+            f'{flagged} flagged as duplicates in {elapsed:.1f}s ({rate:.1f}/s)'
+        ))
+
+    def _read(self, storage, name):
+        try:
+            with storage.open(name, 'rb') as fh:
+                return fh.read()
+        except OSError:
+            return b''
@@ -0,0 +1,48 @@
+import time
+from concurrent.futures import as_completed
+
+from django.core.management.base import BaseCommand
+
+from legacyprime import background
+from transactions.models import Deposit
+from transactions.proofs import process_proof
+
+
+class Command(BaseCommand):
+    help = 'Process every deposit proof image that has no renditions yet on the background pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, help='Process at most this many deposits')
+
+    def handle(self, *args, **options):
+        ids = (
+            Deposit.objects
+            .filter(proof_processed_at__isnull=True)
+            .exclude(proof_image='')
+            .exclude(proof_image__isnull=True)
+            .order_by('pk')
+            .values_list('pk', flat=True)
+        )
+        if options['limit']:
+            ids = ids[:options['limit']]
+        ids = list(ids)
+        if not ids:
+            self.stdout.write('Nothing to process.')
+            return
+
+        started = time.perf_counter()
+        futures = [background.submit(process_proof, pk) for pk in ids]
+        processed = failed = 0
+        for future in as_completed(futures):
+            try:
+                processed += bool(future.result())
+            except Exception:
+                failed += 1  # logged by the background pool
+        elapsed = time.perf_counter() - started
+
+        rate = len(ids) / elapsed if elapsed else float('inf')
+        style = self.style.SUCCESS if not failed else self.style.WARNING
+        self.stdout.write(style(
+            f'{len(ids)} deposit(s) in {elapsed:.1f}s ({rate:.1f}/s): {processed} processed, '
+            f'{len(ids) - processed - failed} skipped, {failed} failed'
+        ))
@@ -0,0 +1,49 @@
+import multiprocessing
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from transactions.references import next_references
+
+
+def _allocate(args):
+    batches, batch_size = args
+    references = []
+    for _ in range(batches):
+        references.extend(next_references(batch_size))
+    return references
+
+
+class Command(BaseCommand):
+    help = 'Allocate transaction references from many processes and check they are all unique'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=8)
+        parser.add_argument('--per-process', type=int, default=100000, help='References per process')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        processes = options['processes']
+        batch_size = options['batch_size']
+        batches = max(options['per_process'] // batch_size, 1)
+
+        # fork: workers reseed their node id through os.register_at_fork
+        ctx = multiprocessing.get_context('fork')
+        started = time.perf_counter()
+        with ctx.Pool(processes) as pool:
+            results = pool.map(_allocate, [(batches, batch_size)] * processes)
+        elapsed = time.perf_counter() - started
+
+        total = sum(len(r) for r in results)
+        unique = len(set().union(*results))
+        longest = max(len(ref) for r in results for ref in r)
+        ordered = all(r == sorted(r) for r in results)
+
+        summary = (
+            f'{total} references from {processes} processes in {elapsed:.2f}s '
+            f'({total / elapsed:,.0f}/s), {total - unique} duplicates, '
+            f'max length {longest}, per-process ordered: {ordered}'
+        )
+        if unique != total or not ordered:
+            raise CommandError(summary)
+        self.stdout.write(self.style.SUCCESS(summary))
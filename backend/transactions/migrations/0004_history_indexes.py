@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-17 02:34
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0003_deposit_reference_withdrawal_reference'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='deposit',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='deposit_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='withdrawal',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='withdrawal_user_created_idx'),
+        ),
+    ]
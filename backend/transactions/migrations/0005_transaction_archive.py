@@ -0,0 +1,100 @@
+# Generated by Django 5.2.7 on 2026-10-17 02:39
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+ARCHIVE_TABLE = 'transactions_transactionarchive'
+
+
+def create_archive_table(apps, schema_editor):
+    """
+    Create the archive as a month-partitioned table on PostgreSQL.
+
+    Partitioned tables need the partition key in their primary key, so
+    the table is created by hand with `PRIMARY KEY (id, created_at)`;
+    `id` is still unique, which is all the ORM relies on. Monthly
+    partitions are added by `transactions.archive.ensure_partition`
+    before rows are moved in; the DEFAULT partition catches anything
+    else. Other backends get a plain table.
+    """
+    model = apps.get_model('transactions', 'TransactionArchive')
+    if schema_editor.connection.vendor != 'postgresql':
+        schema_editor.create_model(model)
+        return
+
+    user_table = apps.get_model(settings.AUTH_USER_MODEL)._meta.db_table
+    schema_editor.execute(f"""
+        CREATE TABLE {ARCHIVE_TABLE} (
+            id bigint GENERATED BY DEFAULT AS IDENTITY,
+            kind varchar(16) NOT NULL,
+            source_id bigint NOT NULL,
+            user_id bigint NOT NULL REFERENCES {user_table} (id) DEFERRABLE INITIALLY DEFERRED,
+            reference varchar(30) NULL,
+            amount numeric(12, 2) NOT NULL,
+            method varchar(64) NOT NULL,
+            proof_image varchar(100) NOT NULL,
+            withdrawal_address varchar(255) NOT NULL,
+            status varchar(32) NOT NULL,
+            created_at timestamp with time zone NOT NULL,
+            archived_at timestamp with time zone NOT NULL,
+            PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+    """)
+    schema_editor.execute(f"CREATE TABLE {ARCHIVE_TABLE}_default PARTITION OF {ARCHIVE_TABLE} DEFAULT")
+    schema_editor.execute(
+        f"CREATE INDEX archive_user_created_idx ON {ARCHIVE_TABLE} (user_id, created_at DESC, source_id DESC)"
+    )
+
+
+def drop_archive_table(apps, schema_editor):
+    schema_editor.delete_model(apps.get_model('transactions', 'TransactionArchive'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0004_history_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedPeriod',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(unique=True)),
+                ('deposits', models.PositiveIntegerField(default=0)),
+                ('withdrawals', models.PositiveIntegerField(default=0)),
+                ('archived_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['-month'],
+            },
+        ),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='TransactionArchive',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('kind', models.CharField(choices=[('DEPOSIT', 'Deposit'), ('WITHDRAWAL', 'Withdrawal')], max_length=16)),
+                        ('source_id', models.BigIntegerField()),
+                        ('reference', models.CharField(blank=True, max_length=30, null=True)),
+                        ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                        ('method', models.CharField(blank=True, max_length=64)),
+                        ('proof_image', models.CharField(blank=True, max_length=100)),
+                        ('withdrawal_address', models.CharField(blank=True, max_length=255)),
+                        ('status', models.CharField(max_length=32)),
+                        ('created_at', models.DateTimeField()),
+                        ('archived_at', models.DateTimeField(auto_now_add=True)),
+                        ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_transactions', to=settings.AUTH_USER_MODEL)),
+                    ],
+                    options={
+                        'indexes': [models.Index(fields=['user', '-created_at', '-source_id'], name='archive_user_created_idx')],
+                    },
+                ),
+            ],
+        ),
+        migrations.RunPython(create_archive_table, drop_archive_table),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.7 on 2026-10-17 02:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0005_transaction_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='deposit',
+            name='proof_height',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='deposit',
+            name='proof_preview',
+            field=models.ImageField(blank=True, editable=False, null=True, upload_to='proofs/previews/'),
+        ),
+        migrations.AddField(
+            model_name='deposit',
+            name='proof_processed_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='deposit',
+            name='proof_thumbnail',
+            field=models.ImageField(blank=True, editable=False, null=True, upload_to='proofs/thumbs/'),
+        ),
+        migrations.AddField(
+            model_name='deposit',
+            name='proof_width',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+    ]
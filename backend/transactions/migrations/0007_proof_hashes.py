@@ -0,0 +1,38 @@
+# Generated by Django 5.2.7 on 2026-10-17 02:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0006_proof_renditions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProofHash',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('deposit_id', models.BigIntegerField(unique=True)),
+                ('user_id', models.BigIntegerField()),
+                ('phash', models.BigIntegerField()),
+                ('dhash', models.BigIntegerField()),
+                ('chunk0', models.PositiveIntegerField(db_index=True)),
+                ('chunk1', models.PositiveIntegerField(db_index=True)),
+                ('chunk2', models.PositiveIntegerField(db_index=True)),
+                ('chunk3', models.PositiveIntegerField(db_index=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='deposit',
+            name='proof_duplicate_distance',
+            field=models.PositiveSmallIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='deposit',
+            name='proof_duplicate_of',
+            field=models.BigIntegerField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-17 03:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0007_proof_hashes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='deposit',
+            name='proof_error',
+            field=models.CharField(blank=True, editable=False, max_length=255),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-17 03:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0008_deposit_proof_error'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transactionarchive',
+            name='proof_duplicate_distance',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='transactionarchive',
+            name='proof_duplicate_of',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -1,31 +1,31 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
 from django.conf import settings
-import string
-import random
-from django.utils import timezone
-from django.db.models import Max
-
-
-def generate_reference(model_instance):
-    """Generate a unique transaction reference number"""
-    year = timezone.now().strftime('%Y')
-    
-    # Try up to 100 times to generate a unique reference
-    for _ in range(100):
-        # Generate 6 random characters (letters and numbers)
-        chars = string.ascii_uppercase + string.digits
-        random_str = ''.join(random.choices(chars, k=6))
-        reference = f"TXN-{year}-{random_str}"
-        
-        # Check if this reference already exists
-        if not model_instance.__class__.objects.filter(reference=reference).exists():
-            return reference
-    
-    # If we couldn't generate a unique reference after 100 tries,
-    # create one based on the current timestamp and a counter
-    timestamp = timezone.now().strftime('%Y%m%d%H%M%S')
-    last_id = model_instance.__class__.objects.aggregate(Max('id'))['id__max'] or 0
-    return f"TXN-{year}-{timestamp[-6:]}-{last_id + 1}"
+from .references import next_reference, reseed
+
+REFERENCE_ATTEMPTS = 3
+
+
+def generate_reference(model_instance=None):
+    """Generate a unique transaction reference number (no database query)"""
+    return next_reference()
+
+
+def _save_with_new_reference(instance, save, *args, **kwargs):
+    """
+    Save `instance` with a newly generated reference. If the reference
+    collides with another process's (see references.py), draw a new node
+    id and reference and try again.
+    """
+    for attempt in range(REFERENCE_ATTEMPTS):
+        instance.reference = generate_reference(instance)
+        try:
+            # Savepoint, so a collision leaves the caller's transaction usable
+            with transaction.atomic():
+                return save(*args, **kwargs)
+        except IntegrityError as exc:
+            if 'reference' not in str(exc) or attempt == REFERENCE_ATTEMPTS - 1:
+                raise
+            reseed()
 
 
 class Deposit(models.Model):
@@ -34,14 +34,41 @@ class Deposit(models.Model):
     amount = models.DecimalField(max_digits=12, decimal_places=2)
     method = models.CharField(max_length=64, blank=True)
     proof_image = models.ImageField(upload_to='proofs/', null=True, blank=True)
+    # Renditions written by the background pipeline in proofs.py
+    proof_thumbnail = models.ImageField(upload_to='proofs/thumbs/', null=True, blank=True, editable=False)
+    proof_preview = models.ImageField(upload_to='proofs/previews/', null=True, blank=True, editable=False)
+    proof_width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    proof_height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    proof_processed_at = models.DateTimeField(null=True, blank=True, editable=False)
+    # Why a proof image could not be processed (corrupt, truncated, too large)
+    proof_error = models.CharField(max_length=255, blank=True, editable=False)
+    # Closest earlier deposit whose proof looks the same (see duplicates.py)
+    proof_duplicate_of = models.BigIntegerField(null=True, blank=True, editable=False)
+    proof_duplicate_distance = models.PositiveSmallIntegerField(null=True, blank=True, editable=False)
     status = models.CharField(max_length=32, default='pending')
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Serves the per-user, newest-first history stream
+            models.Index(fields=['user', '-created_at', '-id'], name='deposit_user_created_idx'),
+        ]
+
     def save(self, *args, **kwargs):
         if not self.reference:
-            self.reference = generate_reference(self)
+            return _save_with_new_reference(self, super().save, *args, **kwargs)
         super().save(*args, **kwargs)
 
+    def approve(self):
+        """Approve and credit/debit the wallet; returns the resulting status"""
+        from .transitions import approve
+        return approve(self)
+
+    def reject(self):
+        """Reject while still pending"""
+        from .transitions import reject
+        return reject(self)
+
     def __str__(self):
         return f"Deposit {self.id} - {self.amount} - {self.status}"
 
@@ -54,10 +81,101 @@ class Withdrawal(models.Model):
     status = models.CharField(max_length=32, default='pending')
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-id'], name='withdrawal_user_created_idx'),
+        ]
+
     def save(self, *args, **kwargs):
         if not self.reference:
-            self.reference = generate_reference(self)
+            return _save_with_new_reference(self, super().save, *args, **kwargs)
         super().save(*args, **kwargs)
 
+    def approve(self):
+        """Approve and credit/debit the wallet; returns the resulting status"""
+        from .transitions import approve
+        return approve(self)
+
+    def reject(self):
+        """Reject while still pending"""
+        from .transitions import reject
+        return reject(self)
+
     def __str__(self):
         return f"Withdrawal {self.id} - {self.amount} - {self.status}"
+
+
+class ProofHash(models.Model):
+    """
+    Perceptual hashes of one deposit's proof image, indexed for Hamming
+    search (see duplicates.py).
+
+    Hashes are stored as signed 64-bit integers, plus the four 16-bit
+    chunks of the pHash, each with its own index. Rows refer to the
+    deposit by id only so they survive archiving.
+    """
+    deposit_id = models.BigIntegerField(unique=True)
+    user_id = models.BigIntegerField()
+    phash = models.BigIntegerField()
+    dhash = models.BigIntegerField()
+    chunk0 = models.PositiveIntegerField(db_index=True)
+    chunk1 = models.PositiveIntegerField(db_index=True)
+    chunk2 = models.PositiveIntegerField(db_index=True)
+    chunk3 = models.PositiveIntegerField(db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Proof hash of deposit {self.deposit_id}"
+
+
+class TransactionArchive(models.Model):
+    """
+    Closed deposits and withdrawals moved out of the hot tables by the
+    `archive_transactions` command.
+
+    On PostgreSQL the table is range-partitioned by month on `created_at`
+    (see migration 0005), so date-bounded reads only touch the partitions
+    they need. Elsewhere it is a plain table with the same columns.
+    """
+    KIND_CHOICES = [
+        ('DEPOSIT', 'Deposit'),
+        ('WITHDRAWAL', 'Withdrawal'),
+    ]
+
+    kind = models.CharField(max_length=16, choices=KIND_CHOICES)
+    # Primary key of the row in the hot table; still referenced by ledger entries
+    source_id = models.BigIntegerField()
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='archived_transactions')
+    reference = models.CharField(max_length=30, null=True, blank=True)
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    method = models.CharField(max_length=64, blank=True)
+    proof_image = models.CharField(max_length=100, blank=True)
+    withdrawal_address = models.CharField(max_length=255, blank=True)
+    status = models.CharField(max_length=32)
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+    # Kept from the deposit; its ProofHash row survives archiving too
+    proof_duplicate_of = models.BigIntegerField(null=True, blank=True)
+    proof_duplicate_distance = models.PositiveSmallIntegerField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-source_id'], name='archive_user_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"Archived {self.kind.lower()} {self.source_id} - {self.amount} - {self.status}"
+
+
+class ArchivedPeriod(models.Model):
+    """One calendar month whose closed transactions live in the archive."""
+    month = models.DateField(unique=True)
+    deposits = models.PositiveIntegerField(default=0)
+    withdrawals = models.PositiveIntegerField(default=0)
+    archived_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-month']
+
+    def __str__(self):
+        return self.month.strftime('%Y-%m')
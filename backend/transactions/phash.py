@@ -0,0 +1,72 @@
+"""
+Perceptual hashes of proof images, in pure Python on top of Pillow.
+
+Both hashes are 64-bit integers whose Hamming distance grows with how
+different two images look, and stays small across re-encoding,
+rescaling, light cropping and colour shifts:
+
+- `dhash`: the sign of horizontal brightness gradients on a 9x8
+  grayscale thumbnail;
+- `phash`: the low-frequency 8x8 block of the 32x32 DCT-II of the
+  grayscale image, thresholded at its median (DC term excluded).
+"""
+import math
+
+from PIL import Image
+
+HASH_BITS = 64
+DCT_SIZE = 32
+LOW_FREQ = 8
+
+# DCT-II basis rows for the low frequencies only: C[u][x]
+_DCT = [
+    [math.cos(math.pi * (2 * x + 1) * u / (2 * DCT_SIZE)) for x in range(DCT_SIZE)]
+    for u in range(LOW_FREQ)
+]
+
+
+def _grayscale(image, size):
+    if image.mode != 'L':
+        image = image.convert('L')
+    return image.resize(size, Image.Resampling.LANCZOS)
+
+
+def _bits_to_int(bits):
+    value = 0
+    for bit in bits:
+        value = (value << 1) | bit
+    return value
+
+
+def dhash(image):
+    pixels = list(_grayscale(image, (LOW_FREQ + 1, LOW_FREQ)).getdata())
+    width = LOW_FREQ + 1
+    return _bits_to_int(
+        1 if pixels[row * width + col] > pixels[row * width + col + 1] else 0
+        for row in range(LOW_FREQ)
+        for col in range(LOW_FREQ)
+    )
+
+
+def phash(image):
+    pixels = list(_grayscale(image, (DCT_SIZE, DCT_SIZE)).getdata())
+    rows = [pixels[i * DCT_SIZE:(i + 1) * DCT_SIZE] for i in range(DCT_SIZE)]
+    # Separable 2D DCT, keeping only the LOW_FREQ x LOW_FREQ corner:
+    # first along each row, then down each of the kept columns
+    row_coeffs = [[sum(c * p for c, p in zip(basis, row)) for basis in _DCT] for row in rows]
+    coeffs = [
+        sum(_DCT[u][y] * row_coeffs[y][v] for y in range(DCT_SIZE))
+        for u in range(LOW_FREQ)
+        for v in range(LOW_FREQ)
+    ]
+    median = sorted(coeffs[1:])[(len(coeffs) - 1) // 2]
+    return _bits_to_int(1 if c > median else 0 for c in coeffs)
+
+
+def hashes(image):
+    """Return `(phash, dhash)` of a Pillow image."""
+    return phash(image), dhash(image)
+
+
+def distance(a, b):
+    return (a ^ b).bit_count()
@@ -0,0 +1,218 @@
+"""
+Background processing of deposit proof images.
+
+Uploads are stored as they arrive, and `schedule()` queues them on the
+shared background pool once the deposit is committed, so the upload
+request never waits for image work. `process_proof()` then:
+
+1. decodes the upload, letting the JPEG decoder downscale by a power of
+   two (`Image.draft`) when the photo is far larger than needed, and
+   applies the EXIF orientation;
+2. re-encodes it without any metadata (EXIF, GPS, thumbnails) as a
+   progressive JPEG no larger than `PROOF_IMAGE_MAX_DIMENSION`,
+   replacing the original file;
+3. writes a `PROOF_PREVIEW_SIZE` web preview and a
+   `PROOF_THUMBNAIL_SIZE` review thumbnail;
+4. records the dimensions and `proof_processed_at`;
+5. indexes the perceptual hashes and flags near-duplicate proofs
+   (see duplicates.py).
+
+Uploads Pillow cannot identify (PDF proofs) are kept as they are and only
+marked as processed. Images it cannot decode (corrupt or truncated files,
+decompression bombs) are also marked as processed, with the reason in
+`proof_error`, so they are not picked up again on every run.
+"""
+import io
+import os
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.utils import timezone
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from legacyprime import background
+from . import duplicates
+from .models import Deposit
+from .phash import hashes
+
+
+class UnreadableProof(Exception):
+    """The upload looks like an image but cannot be decoded safely."""
+
+
+@dataclass
+class Renditions:
+    image: bytes
+    preview: bytes
+    thumbnail: bytes
+    width: int
+    height: int
+    phash: int
+    dhash: int
+
+
+def _flatten(image):
+    """`image` in RGB, with any transparency composited onto white."""
+    if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+        image = image.convert('RGBA')
+        background_ = Image.new('RGB', image.size, (255, 255, 255))
+        background_.paste(image, mask=image.getchannel('A'))
+        return background_
+    return image.convert('RGB') if image.mode != 'RGB' else image
+
+
+def _encode(image):
+    buffer = io.BytesIO()
+    # No exif/icc arguments: the output carries no metadata at all
+    image.save(buffer, 'JPEG', quality=settings.PROOF_JPEG_QUALITY, optimize=True, progressive=True)
+    return buffer.getvalue()
+
+
+def decode(fp):
+    """
+    The image in file object `fp`, upright, flattened to RGB and no larger
+    than `PROOF_IMAGE_MAX_DIMENSION`, or None if it is not an image Pillow
+    can identify. Raises UnreadableProof if it cannot be decoded.
+    """
+    max_dimension = settings.PROOF_IMAGE_MAX_DIMENSION
+    try:
+        source = Image.open(fp)
+    except UnidentifiedImageError:
+        return None
+    except (OSError, ValueError, Image.DecompressionBombError) as exc:
+        raise UnreadableProof(f'{type(exc).__name__}: {exc}') from exc
+
+    try:
+        with source:
+            # JPEG only: decode at the smallest 1/2, 1/4 or 1/8 scale that is
+            # still at least max_dimension on both sides
+            source.draft('RGB', (max_dimension, max_dimension))
+            image = _flatten(ImageOps.exif_transpose(source))
+    except (OSError, ValueError, Image.DecompressionBombError) as exc:
+        # Truncated data, bad EXIF, or too many pixels once decoded
+        raise UnreadableProof(f'{type(exc).__name__}: {exc}') from exc
+    _shrink(image, max_dimension)
+    return image
+
+
+def _shrink(image, size):
+    # Each rendition is resized in place from the previous, larger one
+    image.thumbnail((size, size), Image.Resampling.LANCZOS)
+
+
+def render(fp):
+    """
+    Return the `Renditions` of the image in file object `fp`, or None if
+    it is not an image Pillow can identify. Raises UnreadableProof if it
+    cannot be decoded.
+    """
+    image = decode(fp)
+    if image is None:
+        return None
+    width, height = image.size
+    data = _encode(image)
+    _shrink(image, settings.PROOF_PREVIEW_SIZE)
+    preview = _encode(image)
+    _shrink(image, settings.PROOF_THUMBNAIL_SIZE)
+    thumbnail = _encode(image)
+    return Renditions(data, preview, thumbnail, width, height, *hashes(image))
+
+
+def proof_hashes(fp):
+    """
+    `(phash, dhash)` of the image in file object `fp`, computed on the
+    same thumbnail as `render()` so backfilled hashes match those taken
+    at upload. None if it is not an image; raises UnreadableProof.
+    """
+    image = decode(fp)
+    if image is None:
+        return None
+    _shrink(image, settings.PROOF_PREVIEW_SIZE)
+    _shrink(image, settings.PROOF_THUMBNAIL_SIZE)
+    return hashes(image)
+
+
+def process_proof(deposit_id):
+    """
+    Normalize one deposit's proof image and write its renditions.
+
+    Returns True if renditions were written. Safe to call twice: already
+    processed deposits are skipped, and a proof replaced while this ran
+    is left for its own run.
+    """
+    deposit = (
+        Deposit.objects
+        .filter(pk=deposit_id, proof_processed_at__isnull=True)
+        .only('pk', 'user_id', 'proof_image')
+        .first()
+    )
+    if deposit is None or not deposit.proof_image:
+        return False
+
+    original = deposit.proof_image
+    try:
+        with original.open('rb') as fh:
+            renditions = render(fh)
+    except UnreadableProof as exc:
+        Deposit.objects.filter(pk=deposit_id, proof_image=original.name).update(
+            proof_processed_at=timezone.now(), proof_error=str(exc)[:255],
+        )
+        return False
+    if renditions is None:
+        Deposit.objects.filter(pk=deposit_id, proof_image=original.name).update(proof_processed_at=timezone.now())
+        return False
+
+    storage = original.storage
+    stem = os.path.splitext(os.path.basename(original.name))[0]
+    names = {
+        'proof_image': storage.save(f'proofs/{stem}.jpg', ContentFile(renditions.image)),
+        'proof_preview': storage.save(f'proofs/previews/{stem}.jpg', ContentFile(renditions.preview)),
+        'proof_thumbnail': storage.save(f'proofs/thumbs/{stem}.jpg', ContentFile(renditions.thumbnail)),
+    }
+    updated = Deposit.objects.filter(pk=deposit_id, proof_image=original.name).update(
+        proof_width=renditions.width,
+        proof_height=renditions.height,
+        proof_processed_at=timezone.now(),
+        **names,
+    )
+    if not updated:
+        # The proof was replaced meanwhile; drop what we wrote
+        for name in names.values():
+            storage.delete(name)
+        return False
+
+    # Only the metadata-free copy is kept
+    storage.delete(original.name)
+    duplicates.record(deposit_id, deposit.user_id, renditions.phash, renditions.dhash)
+    return True
+
+
+def reset_renditions(deposit):
+    """
+    Release `deposit`'s current proof and renditions and clear the
+    processing fields, ready for a new proof. Does not save.
+    """
+    for field in (deposit.proof_image, deposit.proof_thumbnail, deposit.proof_preview):
+        if field:
+            field.storage.delete(field.name)
+    deposit.proof_image = deposit.proof_thumbnail = deposit.proof_preview = None
+    deposit.proof_width = deposit.proof_height = None
+    deposit.proof_processed_at = None
+    deposit.proof_error = ''
+    deposit.proof_duplicate_of = deposit.proof_duplicate_distance = None
+    if deposit.pk:
+        duplicates.forget(deposit.pk)
+
+
+RENDITION_FIELDS = (
+    'proof_image', 'proof_thumbnail', 'proof_preview',
+    'proof_width', 'proof_height', 'proof_processed_at', 'proof_error',
+    'proof_duplicate_of', 'proof_duplicate_distance',
+)
+
+
+def schedule(deposit):
+    """Process `deposit`'s proof in the background once the transaction commits."""
+    if deposit.proof_image:
+        background.submit_on_commit(process_proof, deposit.pk)
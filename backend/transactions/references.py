@@ -0,0 +1,100 @@
+"""
+Transaction reference generator.
+
+References keep the `TXN-YYYY-...` style but are derived without any
+database round trip from an 80-bit, time-ordered identifier:
+
+    42 bits  milliseconds since REFERENCE_EPOCH
+    22 bits  random node id, drawn once per process (and again after fork)
+    16 bits  per-process sequence within the same millisecond
+
+rendered as 16 Crockford base32 characters, e.g. `TXN-2025-01JB3Q8Z5T4M9K2C`.
+
+Inside one process references are strictly increasing and never repeat.
+Across processes two ids can only collide if both processes drew the same
+node id *and* issue a reference in the same millisecond with the same
+sequence number. The unique constraint on `reference` catches that case,
+and the models' `save()` then draws a new node id (`reseed()`) and
+retries with a fresh reference.
+"""
+import os
+import random
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+
+ALPHABET = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'  # Crockford base32
+REFERENCE_EPOCH_MS = 1704067200000  # 2024-01-01T00:00:00Z
+
+NODE_BITS = 22
+SEQUENCE_BITS = 16
+MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+
+
+def _encode(value, length=16):
+    chars = []
+    for _ in range(length):
+        value, digit = divmod(value, 32)
+        chars.append(ALPHABET[digit])
+    return ''.join(reversed(chars))
+
+
+class ReferenceGenerator:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reseed()
+
+    def _reseed(self):
+        self._node = random.SystemRandom().getrandbits(NODE_BITS)
+        self._last_ms = -1
+        self._sequence = 0
+
+    def _next_ids(self, count):
+        ids = []
+        with self._lock:
+            while len(ids) < count:
+                now_ms = int(time.time() * 1000)
+                if now_ms > self._last_ms:
+                    self._last_ms = now_ms
+                    self._sequence = 0
+                elif self._sequence >= MAX_SEQUENCE:
+                    # Sequence exhausted (or clock went backwards): wait for the next millisecond
+                    time.sleep(0.0005)
+                    continue
+                else:
+                    self._sequence += 1
+
+                ms = self._last_ms - REFERENCE_EPOCH_MS
+                value = (ms << (NODE_BITS + SEQUENCE_BITS)) | (self._node << SEQUENCE_BITS) | self._sequence
+                ids.append((self._last_ms, value))
+        return ids
+
+    def generate(self, count=1):
+        """Return `count` new references, in increasing order."""
+        references = []
+        for ms, value in self._next_ids(count):
+            year = datetime.fromtimestamp(ms / 1000, tz=dt_timezone.utc).year
+            references.append(f"TXN-{year}-{_encode(value)}")
+        return references
+
+
+_generator = ReferenceGenerator()
+
+if hasattr(os, 'register_at_fork'):
+    # Forked workers (gunicorn, multiprocessing) must not share a node id
+    os.register_at_fork(after_in_child=_generator._reseed)
+
+
+def reseed():
+    """Draw a new node id, e.g. after a reference collided with another process's."""
+    _generator._reseed()
+
+
+def next_reference():
+    """Return one new transaction reference."""
+    return _generator.generate(1)[0]
+
+
+def next_references(count):
+    """Allocate `count` references at once, e.g. before `bulk_create`."""
+    return _generator.generate(count)
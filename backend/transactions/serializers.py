@@ -1,12 +1,35 @@
 from rest_framework import serializers
 from .models import Deposit, Withdrawal
+from .proofs import reset_renditions
 
 
 class DepositSerializer(serializers.ModelSerializer):
+    # Review thumbnail; the uploaded image until background processing is done
+    proof_thumbnail = serializers.SerializerMethodField()
+
     class Meta:
         model = Deposit
-        fields = ('id', 'reference', 'user', 'amount', 'method', 'proof_image', 'status', 'created_at')
-        read_only_fields = ('reference', 'status', 'created_at', 'user')
+        fields = (
+            'id', 'reference', 'user', 'amount', 'method', 'proof_image', 'proof_thumbnail',
+            'proof_preview', 'proof_width', 'proof_height', 'status', 'created_at',
+        )
+        read_only_fields = (
+            'reference', 'status', 'created_at', 'user',
+            'proof_preview', 'proof_width', 'proof_height',
+        )
+
+    def get_proof_thumbnail(self, obj):
+        image = obj.proof_thumbnail or obj.proof_image
+        if not image:
+            return None
+        request = self.context.get('request')
+        return request.build_absolute_uri(image.url) if request else image.url
+
+    def update(self, instance, validated_data):
+        if 'proof_image' in validated_data:
+            # A new proof invalidates the old one and its renditions
+            reset_renditions(instance)
+        return super().update(instance, validated_data)
 
 
 class WithdrawalSerializer(serializers.ModelSerializer):
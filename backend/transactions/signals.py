@@ -0,0 +1,8 @@
+from django.dispatch import Signal
+
+# Sent after the database transaction that changed the status of one or more
+# deposits/withdrawals has committed.
+#
+# Arguments: sender (Deposit or Withdrawal model), instances (list of the
+# updated transactions), status (the new status).
+transaction_status_changed = Signal()
@@ -0,0 +1,100 @@
+"""
+Status transitions for deposits and withdrawals.
+
+`approve()` and `reject()` replace the old pre_save/post_save signal
+chain with one explicit, single-pass path:
+
+1. a conditional `UPDATE ... SET status = ... WHERE id = ... AND status IN (...)`
+   so each transition happens exactly once, even under concurrent admins;
+2. for approvals, the ledger posting (balance, ledger entry, daily rollup);
+3. side effects (summary cache, `transaction_status_changed` for
+   notifications) registered with `transaction.on_commit`.
+
+The whole transition is retried on lock conflicts via the wallet
+balance retry policy.
+"""
+from django.db import transaction
+
+from wallet.balance import InsufficientBalance, run_with_retry
+from wallet.ledger import post_entry
+from wallet.models import LedgerEntry
+from .signals import transaction_status_changed
+
+PENDING = 'pending'
+APPROVED = 'approved'
+REJECTED = 'rejected'
+
+# Statuses each transition may start from. Both are final: an approved
+# transaction's ledger entry is append-only, and neither the admin nor the
+# bulk actions re-open a rejected one.
+APPROVABLE = (PENDING,)
+REJECTABLE = (PENDING,)
+
+
+class InvalidTransition(Exception):
+    """The transaction is not in a status the transition can start from."""
+
+
+def _ledger_kind(instance):
+    return LedgerEntry.KIND_DEPOSIT if instance._meta.model_name == 'deposit' else LedgerEntry.KIND_WITHDRAWAL
+
+
+def _set_status(instance, status, allowed_from):
+    updated = (
+        type(instance).objects
+        .filter(pk=instance.pk, status__in=allowed_from)
+        .update(status=status)
+    )
+    if not updated:
+        raise InvalidTransition(
+            f"{instance._meta.verbose_name} {instance.pk} cannot become {status}"
+        )
+
+
+def _notify_on_commit(instance, status):
+    transaction.on_commit(lambda: transaction_status_changed.send(
+        sender=type(instance), instances=[instance], status=status,
+    ))
+
+
+def _approve(instance):
+    _set_status(instance, APPROVED, APPROVABLE)
+    try:
+        post_entry(
+            instance.user_id, _ledger_kind(instance), instance.amount,
+            source_id=instance.pk, reference=instance.reference,
+        )
+    except InsufficientBalance:
+        # Only withdrawals can fail this way; they are rejected instead
+        type(instance).objects.filter(pk=instance.pk).update(status=REJECTED)
+        return REJECTED
+    return APPROVED
+
+
+def approve(instance):
+    """
+    Approve a deposit or withdrawal and credit/debit the wallet.
+
+    Returns the resulting status: 'approved', or 'rejected' for a
+    withdrawal the balance cannot cover.
+
+    Raises:
+        InvalidTransition: if the transaction is no longer pending.
+    """
+    status = run_with_retry(_approve, instance)
+    instance.status = status
+    _notify_on_commit(instance, status)
+    return status
+
+
+def reject(instance):
+    """
+    Reject a pending deposit or withdrawal.
+
+    Raises:
+        InvalidTransition: if the transaction is no longer pending.
+    """
+    run_with_retry(_set_status, instance, REJECTED, REJECTABLE)
+    instance.status = REJECTED
+    _notify_on_commit(instance, REJECTED)
+    return REJECTED
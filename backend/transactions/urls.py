@@ -5,14 +5,20 @@ from .views import (
     ListTransactionsView,
     DashboardSummaryView,
     DashboardPerformanceView,
+    DashboardBootstrapView,
     TransactionHistoryView,
+    BulkStatusView,
+    TransactionExportView,
 )
 
 urlpatterns = [
     path('deposit/', CreateDepositView.as_view(), name='deposit'),
     path('withdraw/', CreateWithdrawalView.as_view(), name='withdraw'),
     path('', ListTransactionsView.as_view(), name='transactions'),
+    path('bulk-status/', BulkStatusView.as_view(), name='transaction_bulk_status'),
     path('history/', TransactionHistoryView.as_view(), name='transaction_history'),
+    path('export/', TransactionExportView.as_view(), name='transaction_export'),
     path('dashboard/summary/', DashboardSummaryView.as_view(), name='dashboard_summary'),
     path('dashboard/performance/', DashboardPerformanceView.as_view(), name='dashboard_performance'),
+    path('dashboard/bootstrap/', DashboardBootstrapView.as_view(), name='dashboard_bootstrap'),
 ]
@@ -3,11 +3,24 @@ from rest_framework.response import Response
 from rest_framework import status, permissions
 from .serializers import DepositSerializer, WithdrawalSerializer
 from .models import Deposit, Withdrawal
-from django.db import models
+from .bulk import bulk_approve, bulk_reject
+from . import exports, history
+from datetime import date, datetime, time, timedelta
+from django.contrib.auth import get_user_model
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from wallet import cache as summary_cache
+from wallet import rollups
+from wallet.models import SystemSettings
+from wallet.serializers import SystemSettingsSerializer
+from accounts.serializers import UserProfileSerializer
+from django.urls import reverse
 from django.shortcuts import get_object_or_404
 from itertools import chain
 from operator import attrgetter
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.utils.urls import replace_query_param
 from rest_framework_simplejwt.authentication import JWTAuthentication  # ADD THIS IMPORT
 
 class CreateDepositView(APIView):
@@ -37,7 +50,24 @@ class CreateWithdrawalView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class DepositCursorPagination(CursorPagination):
+    cursor_query_param = 'deposits_cursor'
+    ordering = ('-created_at', '-id')
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100  # hard server-side cap
+
+
+class WithdrawalCursorPagination(DepositCursorPagination):
+    cursor_query_param = 'withdrawals_cursor'
+
+
 class ListTransactionsView(APIView):
+    """Deposits and withdrawals of the user, each list with its own cursor.
+
+    Query params: ?type=deposit|withdrawal|all&status=...&page_size=20
+    &deposits_cursor=...&withdrawals_cursor=...
+    """
     authentication_classes = [JWTAuthentication]  # ADD THIS LINE
     permission_classes = (permissions.IsAuthenticated,)
 
@@ -45,20 +75,62 @@ class ListTransactionsView(APIView):
         # list transactions for authenticated user, support filters
         t_type = request.query_params.get('type')  # deposit|withdrawal|all
         status_filter = request.query_params.get('status')
-        deposits = Deposit.objects.filter(user=request.user)
-        withdrawals = Withdrawal.objects.filter(user=request.user)
+        payload = {}
+        if t_type != 'withdrawal':
+            payload.update(self._page(
+                request, 'deposits', Deposit, DepositSerializer, DepositCursorPagination, status_filter,
+            ))
+        if t_type != 'deposit':
+            payload.update(self._page(
+                request, 'withdrawals', Withdrawal, WithdrawalSerializer, WithdrawalCursorPagination, status_filter,
+            ))
+        return Response(payload)
+
+    def _page(self, request, key, model, serializer_class, pagination_class, status_filter):
+        # Only load the columns the serializer emits
+        queryset = model.objects.filter(user=request.user).only(*serializer_class.Meta.fields)
         if status_filter:
-            deposits = deposits.filter(status=status_filter)
-            withdrawals = withdrawals.filter(status=status_filter)
-        deposits = deposits.order_by('-created_at')
-        withdrawals = withdrawals.order_by('-created_at')
-        d_serializer = DepositSerializer(deposits, many=True, context={'request': request})
-        w_serializer = WithdrawalSerializer(withdrawals, many=True, context={'request': request})
-        if t_type == 'deposit':
-            return Response({'deposits': d_serializer.data})
-        if t_type == 'withdrawal':
-            return Response({'withdrawals': w_serializer.data})
-        return Response({'deposits': d_serializer.data, 'withdrawals': w_serializer.data})
+            queryset = queryset.filter(status=status_filter)
+        paginator = pagination_class()
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        serializer = serializer_class(page, many=True, context={'request': request})
+        return {
+            key: serializer.data,
+            f'{key}_next': paginator.get_next_link(),
+            f'{key}_previous': paginator.get_previous_link(),
+        }
+
+
+class BulkStatusView(APIView):
+    """Approve or reject many pending deposits/withdrawals in one database transaction.
+
+    Body: {"type": "deposit"|"withdrawal", "action": "approve"|"reject", "ids": [1, 2, ...]}
+    """
+    authentication_classes = [JWTAuthentication]
+    permission_classes = (permissions.IsAdminUser,)
+    max_ids = 10000
+
+    def post(self, request):
+        models_by_type = {'deposit': Deposit, 'withdrawal': Withdrawal}
+        model = models_by_type.get(request.data.get('type'))
+        if model is None:
+            return Response({"error": "type must be 'deposit' or 'withdrawal'"}, status=status.HTTP_400_BAD_REQUEST)
+
+        action = request.data.get('action')
+        if action not in ('approve', 'reject'):
+            return Response({"error": "action must be 'approve' or 'reject'"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            ids = [int(pk) for pk in request.data.get('ids') or []]
+        except (TypeError, ValueError):
+            return Response({"error": "ids must be a list of integers"}, status=status.HTTP_400_BAD_REQUEST)
+        if not ids:
+            return Response({"error": "ids is required"}, status=status.HTTP_400_BAD_REQUEST)
+        if len(ids) > self.max_ids:
+            return Response({"error": f"At most {self.max_ids} ids per request"}, status=status.HTTP_400_BAD_REQUEST)
+
+        result = bulk_approve(model, ids) if action == 'approve' else bulk_reject(model, ids)
+        return Response(result.as_dict())
 
 
 class DashboardSummaryView(APIView):
@@ -66,17 +138,8 @@ class DashboardSummaryView(APIView):
     permission_classes = (permissions.IsAuthenticated,)
 
     def get(self, request):
-        # Approved deposits/withdrawals
-        approved_deposits = Deposit.objects.filter(user=request.user, status='approved')
-        approved_withdrawals = Withdrawal.objects.filter(user=request.user, status='approved')
-        total_deposits = approved_deposits.aggregate(total=models.Sum('amount'))['total'] or 0
-        total_withdrawals = approved_withdrawals.aggregate(total=models.Sum('amount'))['total'] or 0
-        balance = total_deposits - total_withdrawals
-        return Response({
-            'total_balance': balance,
-            'total_deposits': total_deposits,
-            'total_withdrawals': total_withdrawals,
-        })
+        # Served from the summary cache, rebuilt from the ledger on a miss
+        return Response(summary_cache.get_summary(request.user))
 
 
 class TransactionPagination(PageNumberPagination):
@@ -85,71 +148,152 @@ class TransactionPagination(PageNumberPagination):
     max_page_size = 100
 
 class TransactionHistoryView(APIView):
+    """Deposits and withdrawals of the user, newest first, keyset paginated.
+
+    Query params: ?status=approved&page_size=20&cursor=<next_cursor>
+    """
     authentication_classes = [JWTAuthentication]  # ADD THIS LINE
     permission_classes = (permissions.IsAuthenticated,)
     pagination_class = TransactionPagination
 
     def get(self, request):
-        # Get all transactions for the user
-        deposits = Deposit.objects.filter(user=request.user)
-        withdrawals = Withdrawal.objects.filter(user=request.user)
+        page_size = self.pagination_class().get_page_size(request)
+
+        cursor = request.query_params.get('cursor')
+        try:
+            cursor = history.decode_cursor(cursor) if cursor else None
+        except history.InvalidCursor:
+            return Response({"error": "Invalid cursor"}, status=status.HTTP_400_BAD_REQUEST)
+
+        rows, next_cursor = history.history_page(
+            request.user,
+            page_size,
+            status=request.query_params.get('status'),
+            cursor=cursor,
+        )
+
+        return Response(history_payload(request, rows, next_cursor))
+
+class TransactionExportView(APIView):
+    """Stream the user's full statement as CSV or NDJSON.
+
+    Query params: ?output=csv|ndjson&status=approved&from=2025-01-01&to=2025-12-31
+    Staff may export another user's statement with ?user=<id>.
+    """
+    authentication_classes = [JWTAuthentication]
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def get(self, request):
+        output = request.query_params.get('output', 'csv')
+        if output not in exports.FORMATS:
+            return Response({"error": "output must be 'csv' or 'ndjson'"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            date_from = self._parse_date(request.query_params.get('from'))
+            date_to = self._parse_date(request.query_params.get('to'))
+        except ValueError:
+            return Response({"error": "Dates must be formatted as YYYY-MM-DD"}, status=status.HTTP_400_BAD_REQUEST)
+        if date_to:
+            date_to += timedelta(days=1)  # inclusive end date
+
+        user = request.user
+        user_id = request.query_params.get('user')
+        if request.user.is_staff and user_id:
+            if not user_id.isdigit():
+                return Response({"error": "user must be a numeric id"}, status=status.HTTP_400_BAD_REQUEST)
+            user = get_object_or_404(get_user_model(), pk=user_id)
+
+        # ASGI buffers a sync iterator in full before sending it
+        stream = exports.astream if isinstance(request._request, ASGIRequest) else exports.stream
+        chunks = stream(user, output, status=request.query_params.get('status'), date_from=date_from, date_to=date_to)
+        _, content_type, extension = exports.FORMATS[output]
+        response = StreamingHttpResponse(chunks, content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="statement-{user.pk}.{extension}"'
+        return response
+
+    @staticmethod
+    def _parse_date(value):
+        if not value:
+            return None
+        day = date.fromisoformat(value)
+        return timezone.make_aware(datetime.combine(day, time.min))
 
-        # Apply filters if provided
-        status_filter = request.query_params.get('status')
-        if status_filter:
-            deposits = deposits.filter(status=status_filter)
-            withdrawals = withdrawals.filter(status=status_filter)
-
-        # Convert querysets to lists and add transaction type
-        deposit_list = [{
-            'id': d.id,
-            'amount': d.amount,
-            'type': 'DEPOSIT',
-            'status': d.status,
-            'date': d.created_at,
-            'method': d.method,
-            'proof_image': d.proof_image.url if d.proof_image else None
-        } for d in deposits]
-
-        withdrawal_list = [{
-            'id': w.id,
-            'amount': w.amount,
-            'type': 'WITHDRAWAL',
-            'status': w.status,
-            'date': w.created_at,
-            'withdrawal_address': w.withdrawal_address
-        } for w in withdrawals]
-
-        # Combine and sort by date
-        all_transactions = deposit_list + withdrawal_list
-        all_transactions.sort(key=lambda x: x['date'], reverse=True)
-
-        # Apply pagination
-        paginator = self.pagination_class()
-        paginated_transactions = paginator.paginate_queryset(all_transactions, request)
-
-        return paginator.get_paginated_response(paginated_transactions)
 
 class DashboardPerformanceView(APIView):
+    """Deposits, withdrawals, net flow and balance over time, from daily rollups.
+
+    Query params: ?granularity=day|week|month&start=2025-01-01&end=2025-12-31
+    (defaults to the last 30 days by day).
+    """
     authentication_classes = [JWTAuthentication]  # ADD THIS LINE
     permission_classes = (permissions.IsAuthenticated,)
+    max_days = 366 * 5
 
     def get(self, request):
-        # return simple time-series per day for last 30 days
-        from django.utils import timezone
-        from datetime import timedelta
+        granularity = request.query_params.get('granularity', 'day')
+        if granularity not in rollups.GRANULARITIES:
+            return Response({"error": "granularity must be day, week or month"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            end = date.fromisoformat(request.query_params['end']) if request.query_params.get('end') else timezone.localdate()
+            start = date.fromisoformat(request.query_params['start']) if request.query_params.get('start') else end - timedelta(days=30)
+        except ValueError:
+            return Response({"error": "Dates must be formatted as YYYY-MM-DD"}, status=status.HTTP_400_BAD_REQUEST)
+        if start > end:
+            return Response({"error": "start must not be after end"}, status=status.HTTP_400_BAD_REQUEST)
+        if (end - start).days > self.max_days:
+            return Response({"error": f"Range cannot exceed {self.max_days} days"}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(performance_payload(request.user, start, end, granularity))
+
+
+def performance_payload(user, start, end, granularity='day', current_balance=None):
+    points = rollups.series(user, start, end, granularity, current_balance=current_balance)
+    return {
+        'granularity': granularity,
+        'start': start,
+        'end': end,
+        # Kept for existing chart consumers: one gap-filled total per bucket
+        'deposits': [{'day': p['period'], 'total': p['deposits']} for p in points],
+        'withdrawals': [{'day': p['period'], 'total': p['withdrawals']} for p in points],
+        'series': points,
+    }
+
 
-        end = timezone.now()
-        start = end - timedelta(days=30)
-        deposits = Deposit.objects.filter(user=request.user, status='approved', created_at__gte=start)
-        withdrawals = Withdrawal.objects.filter(user=request.user, status='approved', created_at__gte=start)
+def history_payload(request, rows, next_cursor, path=None):
+    """Response body for a history page; `next` keeps the query of `path` (default: current URL)."""
+    next_url = None
+    if next_cursor:
+        next_url = replace_query_param(request.build_absolute_uri(path), 'cursor', next_cursor)
+    return {
+        'next': next_url,
+        'next_cursor': next_cursor,
+        'results': rows,
+    }
 
-        # aggregate per day
-        from django.db.models.functions import TruncDate
-        d_by_day = deposits.annotate(day=TruncDate('created_at')).values('day').annotate(total=models.Sum('amount')).order_by('day')
-        w_by_day = withdrawals.annotate(day=TruncDate('created_at')).values('day').annotate(total=models.Sum('amount')).order_by('day')
 
+class DashboardBootstrapView(APIView):
+    """Everything the dashboard needs on first render, in one response.
+
+    Combines dashboard/summary/, dashboard/performance/ (last 30 days),
+    the first page of history/, accounts/profile/ and wallet/settings/.
+    Planned queries: user lookup, rollup range, history page, system
+    settings, plus the ledger lookup on a summary cache miss.
+    """
+    authentication_classes = [JWTAuthentication]
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def get(self, request):
+        user = request.user
+        end = timezone.localdate()
+        summary = summary_cache.get_summary(user)
+        rows, next_cursor = history.history_page(user, TransactionPagination.page_size)
         return Response({
-            'deposits': list(d_by_day),
-            'withdrawals': list(w_by_day),
-        })
\ No newline at end of file
+            'summary': summary,
+            'performance': performance_payload(
+                user, end - timedelta(days=30), end, current_balance=summary['total_balance'],
+            ),
+            'history': history_payload(request, rows, next_cursor, path=reverse('transaction_history')),
+            'profile': UserProfileSerializer(user).data,
+            'settings': SystemSettingsSerializer(SystemSettings.get_instance()).data,
+        })
@@ -0,0 +1,28 @@
+from django.contrib import admin
+from .models import StoredBlob, Upload
+
+
+@admin.register(Upload)
+class UploadAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user', 'purpose', 'filename', 'size', 'offset', 'status', 'updated_at')
+    list_filter = ('purpose', 'status')
+    search_fields = ('filename', 'user__email')
+    list_select_related = ('user',)
+    readonly_fields = ('user', 'purpose', 'filename', 'content_type', 'size', 'offset', 'file', 'status')
+
+
+@admin.register(StoredBlob)
+class StoredBlobAdmin(admin.ModelAdmin):
+    list_display = ('name', 'size', 'refcount', 'orphaned_at', 'created_at')
+    list_filter = ('orphaned_at',)
+    search_fields = ('name',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        # Blobs are released through their refcount (legacyprime/storage.py)
+        return False
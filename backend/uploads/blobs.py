@@ -0,0 +1,86 @@
+"""
+Reference counting and garbage collection for content-addressed media.
+
+`add_reference()` is called for every save and `release()` for every
+delete, so identical bytes are written once and removed only when the
+last field pointing at them lets go. Files are never deleted inline:
+`collect()` removes blobs that have been unreferenced for
+`MEDIA_GC_GRACE_SECONDS`, and `release()` schedules it on the shared
+background pool at most once per `MEDIA_GC_INTERVAL_SECONDS`.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from legacyprime import background
+from .models import StoredBlob
+
+logger = logging.getLogger(__name__)
+
+GC_LOCK_KEY = 'media:gc:scheduled'
+
+
+def add_reference(name, size, write):
+    """
+    Count one more reference to blob `name`, calling `write()` first if
+    the blob is new. A row is only created once its file exists.
+    """
+    if StoredBlob.objects.filter(name=name).update(refcount=F('refcount') + 1, orphaned_at=None):
+        return
+    write()
+    try:
+        with transaction.atomic():
+            StoredBlob.objects.create(name=name, size=size, refcount=1)
+    except IntegrityError:
+        # Someone stored the same bytes concurrently
+        StoredBlob.objects.filter(name=name).update(refcount=F('refcount') + 1, orphaned_at=None)
+
+
+def release(name):
+    """
+    Drop one reference to `name`. Returns False if `name` is not a
+    tracked blob (a file stored before content addressing).
+    """
+    if not StoredBlob.objects.filter(name=name, refcount__gt=0).update(refcount=F('refcount') - 1):
+        return StoredBlob.objects.filter(name=name).exists()
+    if StoredBlob.objects.filter(name=name, refcount=0, orphaned_at__isnull=True).update(orphaned_at=timezone.now()):
+        schedule_collect()
+    return True
+
+
+def schedule_collect():
+    if cache.add(GC_LOCK_KEY, True, settings.MEDIA_GC_INTERVAL_SECONDS):
+        background.submit_on_commit(collect)
+
+
+def collect(storage=None, limit=1000):
+    """Delete blobs unreferenced for longer than the grace period; returns the count."""
+    if storage is None:
+        from django.core.files.storage import default_storage as storage
+
+    cutoff = timezone.now() - timedelta(seconds=settings.MEDIA_GC_GRACE_SECONDS)
+    candidates = list(
+        StoredBlob.objects
+        .filter(refcount=0, orphaned_at__lt=cutoff)
+        .values_list('pk', flat=True)[:limit]
+    )
+    deleted = 0
+    for pk in candidates:
+        with transaction.atomic():
+            # The row lock holds off add_reference() while the file goes
+            blob = StoredBlob.objects.select_for_update().filter(pk=pk, refcount=0).first()
+            if blob is None:
+                continue
+            try:
+                storage.delete_blob(blob.name)
+            except OSError:
+                logger.warning('Could not delete media blob %s', blob.name)
+                continue
+            blob.delete()
+            deleted += 1
+    return deleted
@@ -0,0 +1,202 @@
+"""
+Receiving, joining and discarding chunked uploads.
+
+Request bodies are never parsed: each chunk is copied from
+`request.stream` into the storage backend `READ_SIZE` bytes at a time,
+and the finished file is assembled by streaming the parts back in
+order. Under WSGI the stream is the socket itself. Under ASGI, Django
+spools the whole request body before the view runs, in memory up to
+FILE_UPLOAD_MAX_MEMORY_SIZE and in a temporary file beyond that. What
+bounds memory per request is then UPLOAD_MAX_CHUNK_SIZE, not the size
+of the file being uploaded.
+"""
+import logging
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import Upload, UploadPart
+from .validation import SNIFF_BYTES, PURPOSES, UploadRejected, check_head
+
+logger = logging.getLogger(__name__)
+
+READ_SIZE = 64 * 1024
+# A claimed offset with no stored chunk after this long is from a dead request
+STALE_CLAIM = timedelta(minutes=5)
+
+
+class OffsetConflict(Exception):
+    """The chunk does not start at the upload's current offset."""
+
+
+class IncompleteChunk(Exception):
+    """The client sent fewer bytes than it announced."""
+
+
+class _StreamReader:
+    """Read-only file over exactly `length` bytes of `stream`, after `prefix`."""
+    closed = False
+
+    def __init__(self, stream, length, prefix=b''):
+        self.stream = stream
+        self.size = length
+        self.prefix = prefix
+        self.received = 0
+
+    def seekable(self):
+        return False
+
+    def read(self, size=-1):
+        remaining = self.size - self.received
+        if remaining <= 0:
+            return b''
+        size = remaining if size is None or size < 0 else min(size, remaining)
+        size = min(size, READ_SIZE)
+        if self.prefix:
+            data, self.prefix = self.prefix[:size], self.prefix[size:]
+        else:
+            data = self.stream.read(size)
+        self.received += len(data)
+        return data
+
+
+class _PartsReader:
+    """Read-only file over the stored parts of an upload, in order."""
+    closed = False
+
+    def __init__(self, storage, names, size):
+        self.storage = storage
+        self.names = list(names)
+        self.size = size
+        self.current = None
+
+    def seekable(self):
+        return False
+
+    def read(self, size=-1):
+        size = READ_SIZE if size is None or size < 0 else min(size, READ_SIZE)
+        while True:
+            if self.current is None:
+                if not self.names:
+                    return b''
+                self.current = self.storage.open(self.names.pop(0), 'rb')
+            data = self.current.read(size)
+            if data:
+                return data
+            self.current.close()
+            self.current = None
+
+
+def _read_exactly(stream, count):
+    data = b''
+    while len(data) < count:
+        piece = stream.read(count - len(data))
+        if not piece:
+            break
+        data += piece
+    return data
+
+
+def _claim(upload, offset, length):
+    UploadPart.objects.filter(
+        upload=upload, offset__gte=upload.offset, created_at__lt=timezone.now() - STALE_CLAIM,
+    ).delete()
+    try:
+        with transaction.atomic():
+            return UploadPart.objects.create(upload=upload, offset=offset, length=length)
+    except IntegrityError:
+        raise OffsetConflict(offset)
+
+
+def receive_chunk(upload, offset, length, stream):
+    """
+    Store `length` bytes of `stream` as the chunk at `offset`.
+
+    Returns the upload, completed and assembled if this was the last
+    chunk. Raises OffsetConflict, IncompleteChunk or UploadRejected (the
+    upload is then marked failed and its parts discarded).
+    """
+    if upload.status != Upload.STATUS_UPLOADING:
+        raise UploadRejected("Upload is no longer accepting data.")
+    if offset != upload.offset:
+        raise OffsetConflict(upload.offset)
+    if length <= 0 or length > settings.UPLOAD_MAX_CHUNK_SIZE:
+        raise UploadRejected(f"Chunks must be between 1 and {settings.UPLOAD_MAX_CHUNK_SIZE} bytes.")
+    if offset + length > upload.size:
+        raise UploadRejected("Chunk goes past the declared upload size.")
+
+    part = _claim(upload, offset, length)
+    prefix = b''
+    if offset == 0:
+        prefix = _read_exactly(stream, min(SNIFF_BYTES, length))
+        try:
+            check_head(upload, prefix)
+        except UploadRejected:
+            part.delete()
+            fail(upload)
+            raise
+
+    reader = _StreamReader(stream, length, prefix)
+    name = default_storage.save(f'uploads/partial/{upload.pk}/{offset:012d}', File(reader))
+    if reader.received != length:
+        default_storage.delete(name)
+        part.delete()
+        raise IncompleteChunk(reader.received)
+
+    part.name = name
+    part.save(update_fields=['name'])
+    advanced = Upload.objects.filter(pk=upload.pk, offset=offset).update(
+        offset=offset + length, updated_at=timezone.now(),
+    )
+    if not advanced:
+        default_storage.delete(name)
+        part.delete()
+        raise OffsetConflict(offset)
+
+    upload.offset = offset + length
+    if upload.offset == upload.size:
+        assemble(upload)
+    return upload
+
+
+def assemble(upload):
+    """Join the parts of a fully received upload into its final file."""
+    parts = list(upload.chunks.order_by('offset').values_list('name', flat=True))
+    filename = os.path.basename(upload.filename) or 'upload'
+    name = default_storage.save(
+        PURPOSES[upload.purpose]['upload_to'] + filename,
+        File(_PartsReader(default_storage, parts, upload.size)),
+    )
+    Upload.objects.filter(pk=upload.pk).update(
+        file=name, status=Upload.STATUS_COMPLETE, updated_at=timezone.now(),
+    )
+    upload.file, upload.status = name, Upload.STATUS_COMPLETE
+    _delete_parts(upload)
+
+
+def _delete_parts(upload):
+    for name in upload.chunks.exclude(name='').values_list('name', flat=True):
+        try:
+            default_storage.delete(name)
+        except OSError:
+            logger.warning('Could not delete upload part %s', name)
+    upload.chunks.all().delete()
+
+
+def fail(upload):
+    Upload.objects.filter(pk=upload.pk).update(status=Upload.STATUS_FAILED, updated_at=timezone.now())
+    upload.status = Upload.STATUS_FAILED
+    _delete_parts(upload)
+
+
+def discard(upload):
+    """Delete an upload that was never attached, with everything it stored."""
+    _delete_parts(upload)
+    if upload.file and upload.status != Upload.STATUS_ATTACHED:
+        default_storage.delete(upload.file)
+    upload.delete()
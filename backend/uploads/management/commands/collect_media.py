@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from uploads import blobs
+from uploads.models import StoredBlob
+
+
+class Command(BaseCommand):
+    help = 'Delete content-addressed media blobs that have had no references for the grace period'
+
+    def handle(self, *args, **options):
+        deleted = total = blobs.collect()
+        while deleted:
+            deleted = blobs.collect()
+            total += deleted
+        live = StoredBlob.objects.filter(refcount__gt=0).count()
+        self.stdout.write(self.style.SUCCESS(f'Deleted {total} blob(s); {live} still referenced'))
@@ -0,0 +1,28 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from uploads.chunks import discard
+from uploads.models import Upload
+
+
+class Command(BaseCommand):
+    help = 'Delete unfinished, failed and never-attached uploads idle for longer than UPLOAD_EXPIRY_HOURS'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=settings.UPLOAD_EXPIRY_HOURS)
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options['hours'])
+        stale = (
+            Upload.objects
+            .filter(updated_at__lt=cutoff)
+            .exclude(status=Upload.STATUS_ATTACHED)
+        )
+        count = 0
+        for upload in stale.iterator():
+            discard(upload)
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f'Purged {count} upload(s)'))
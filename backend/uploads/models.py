@@ -0,0 +1,99 @@
+import uuid
+
+from django.conf import settings
+from django.db import models
+
+
+class Upload(models.Model):
+    """
+    A chunked, resumable upload.
+
+    Each PATCH appends one chunk, stored as its own part object in the
+    storage backend (see `UploadPart`); `offset` is the number of bytes
+    received so far.
+    Once `offset == size` the parts are joined into `file` and the upload
+    can be attached to a deposit or to the user's profile.
+    """
+    PURPOSE_DEPOSIT_PROOF = 'deposit_proof'
+    PURPOSE_PROFILE_PICTURE = 'profile_picture'
+    PURPOSE_CHOICES = [
+        (PURPOSE_DEPOSIT_PROOF, 'Deposit proof'),
+        (PURPOSE_PROFILE_PICTURE, 'Profile picture'),
+    ]
+
+    STATUS_UPLOADING = 'uploading'
+    STATUS_COMPLETE = 'complete'
+    STATUS_ATTACHED = 'attached'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_UPLOADING, 'Uploading'),
+        (STATUS_COMPLETE, 'Complete'),
+        (STATUS_ATTACHED, 'Attached'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='uploads')
+    purpose = models.CharField(max_length=32, choices=PURPOSE_CHOICES)
+    filename = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100, blank=True)
+    size = models.BigIntegerField()
+    offset = models.BigIntegerField(default=0)
+    file = models.CharField(max_length=255, blank=True)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_UPLOADING)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'updated_at'], name='upload_status_updated_idx'),
+        ]
+
+    def __str__(self):
+        return f"Upload {self.pk} - {self.filename} - {self.offset}/{self.size}"
+
+
+class UploadPart(models.Model):
+    """
+    One received chunk of an `Upload`.
+
+    The row is created before the chunk is read, so the unique
+    `(upload, offset)` constraint decides between concurrent PATCHes for
+    the same offset. `name` is filled in once the bytes are stored.
+    """
+    upload = models.ForeignKey(Upload, on_delete=models.CASCADE, related_name='chunks')
+    offset = models.BigIntegerField()
+    length = models.PositiveIntegerField()
+    name = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['upload', 'offset'], name='upload_part_unique_offset'),
+        ]
+
+    def __str__(self):
+        return f"{self.upload_id} @ {self.offset}"
+
+
+class StoredBlob(models.Model):
+    """
+    One content-addressed file in media storage and how many model fields
+    point at it (see `legacyprime.storage.ContentAddressedStorage`).
+
+    A blob whose count drops to zero is stamped `orphaned_at` and deleted
+    by the background collector once the grace period has passed.
+    """
+    name = models.CharField(max_length=255, unique=True)
+    size = models.BigIntegerField()
+    refcount = models.PositiveIntegerField(default=0)
+    orphaned_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['orphaned_at'], name='blob_orphaned_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.refcount} ref)"
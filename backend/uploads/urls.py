@@ -0,0 +1,8 @@
+from django.urls import path
+from .views import UploadAttachView, UploadCreateView, UploadDetailView
+
+urlpatterns = [
+    path('', UploadCreateView.as_view(), name='upload_create'),
+    path('<uuid:pk>/', UploadDetailView.as_view(), name='upload_detail'),
+    path('<uuid:pk>/attach/', UploadAttachView.as_view(), name='upload_attach'),
+]
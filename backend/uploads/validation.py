@@ -0,0 +1,82 @@
+"""
+Early validation for chunked uploads.
+
+Declared type and size are checked when the upload is created, the
+real type is sniffed from the first bytes of the first chunk, and no
+chunk may carry the upload past its declared size. A bad file is
+rejected before the rest of it is ever sent.
+"""
+import os
+
+from django.conf import settings
+
+from .models import Upload
+
+# Leading bytes of each accepted format
+SIGNATURES = {
+    'image/jpeg': (b'\xff\xd8\xff',),
+    'image/png': (b'\x89PNG\r\n\x1a\n',),
+    'application/pdf': (b'%PDF-',),
+}
+SNIFF_BYTES = max(len(sig) for sigs in SIGNATURES.values() for sig in sigs)
+
+EXTENSIONS = {
+    'image/jpeg': ('.jpg', '.jpeg'),
+    'image/png': ('.png',),
+    'application/pdf': ('.pdf',),
+}
+
+# Allowed types and the `upload_to` directory of the field each purpose fills
+PURPOSES = {
+    Upload.PURPOSE_DEPOSIT_PROOF: {
+        'types': ('image/jpeg', 'image/png', 'application/pdf'),
+        'upload_to': 'proofs/',
+    },
+    Upload.PURPOSE_PROFILE_PICTURE: {
+        'types': ('image/jpeg', 'image/png'),
+        'upload_to': 'profile_pictures/',
+    },
+}
+
+
+class UploadRejected(ValueError):
+    """The upload cannot be accepted; the message is safe to show."""
+
+
+def max_size(purpose):
+    return settings.UPLOAD_MAX_SIZES[purpose]
+
+
+def check_declaration(purpose, filename, size):
+    """Validate what the client says it will send; returns the expected content type."""
+    if purpose not in PURPOSES:
+        raise UploadRejected("Unknown upload purpose.")
+    if size <= 0:
+        raise UploadRejected("Upload size must be positive.")
+    if size > max_size(purpose):
+        raise UploadRejected(f"File size cannot exceed {max_size(purpose) // (1024 * 1024)}MB.")
+
+    ext = os.path.splitext(filename)[1].lower()
+    for content_type in PURPOSES[purpose]['types']:
+        if ext in EXTENSIONS[content_type]:
+            return content_type
+    allowed = ', '.join(e.lstrip('.').upper() for t in PURPOSES[purpose]['types'] for e in EXTENSIONS[t])
+    raise UploadRejected(f"Only {allowed} files are allowed.")
+
+
+def sniff(head):
+    """Content type of a file starting with `head`, or None."""
+    for content_type, signatures in SIGNATURES.items():
+        if any(head.startswith(sig) for sig in signatures):
+            return content_type
+    return None
+
+
+def check_head(upload, head):
+    """Validate the first bytes of an upload against its declared type."""
+    content_type = sniff(head)
+    if content_type is None or content_type not in PURPOSES[upload.purpose]['types']:
+        raise UploadRejected("File content does not match an allowed type.")
+    if content_type != upload.content_type:
+        raise UploadRejected("File content does not match its extension.")
+    return content_type
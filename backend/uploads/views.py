@@ -0,0 +1,157 @@
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.shortcuts import get_object_or_404
+from rest_framework import permissions, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from transactions import proofs
+from transactions.models import Deposit
+from .chunks import IncompleteChunk, OffsetConflict, discard, receive_chunk
+from .models import Upload
+from .validation import UploadRejected, check_declaration
+
+
+def upload_payload(upload):
+    return {
+        'id': str(upload.pk),
+        'purpose': upload.purpose,
+        'filename': upload.filename,
+        'size': upload.size,
+        'offset': upload.offset,
+        'status': upload.status,
+        'file': default_storage.url(upload.file) if upload.file else None,
+    }
+
+
+class UploadCreateView(APIView):
+    """
+    Start a chunked upload.
+
+    POST {purpose, filename, size}. Type and size are checked against the
+    purpose before a single byte is sent.
+    """
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def post(self, request):
+        purpose = request.data.get('purpose')
+        filename = str(request.data.get('filename') or '')
+        try:
+            size = int(request.data.get('size'))
+        except (TypeError, ValueError):
+            return Response({"error": "Upload size is required"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            content_type = check_declaration(purpose, filename, size)
+        except UploadRejected as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        upload = Upload.objects.create(
+            user=request.user, purpose=purpose, filename=filename[-255:],
+            content_type=content_type, size=size,
+        )
+        return Response(upload_payload(upload), status=status.HTTP_201_CREATED)
+
+
+class UploadDetailView(APIView):
+    """
+    GET: current offset, to resume after a dropped connection.
+    PATCH: append one chunk. The raw body is the chunk and the
+    `Upload-Offset` header must equal the current offset.
+    DELETE: cancel an upload that has not been attached.
+    """
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def get_upload(self, request, pk):
+        return get_object_or_404(Upload, pk=pk, user=request.user)
+
+    def get(self, request, pk):
+        return Response(upload_payload(self.get_upload(request, pk)))
+
+    def patch(self, request, pk):
+        upload = self.get_upload(request, pk)
+        try:
+            offset = int(request.META['HTTP_UPLOAD_OFFSET'])
+            length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except (KeyError, ValueError):
+            return Response(
+                {"error": "Upload-Offset and Content-Length headers are required"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        try:
+            # request.stream is the unparsed body; request.data is never touched
+            receive_chunk(upload, offset, length, request.stream)
+        except OffsetConflict:
+            upload.refresh_from_db()
+            return Response(
+                {"error": "Offset does not match the upload", **upload_payload(upload)},
+                status=status.HTTP_409_CONFLICT,
+            )
+        except IncompleteChunk:
+            return Response(
+                {"error": "Chunk was cut short; resume from the current offset", **upload_payload(upload)},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        except UploadRejected as exc:
+            code = status.HTTP_415_UNSUPPORTED_MEDIA_TYPE if upload.status == Upload.STATUS_FAILED else status.HTTP_400_BAD_REQUEST
+            return Response({"error": str(exc), **upload_payload(upload)}, status=code)
+        return Response(upload_payload(upload))
+
+    def delete(self, request, pk):
+        upload = self.get_upload(request, pk)
+        if upload.status == Upload.STATUS_ATTACHED:
+            return Response({"error": "Upload is already attached"}, status=status.HTTP_400_BAD_REQUEST)
+        discard(upload)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class UploadAttachView(APIView):
+    """
+    Attach a finished upload.
+
+    POST {target: "deposit", id} sets the proof of one of the user's
+    deposits; POST {target: "user"} sets the user's profile picture.
+    """
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def post(self, request, pk):
+        with transaction.atomic():
+            upload = get_object_or_404(Upload.objects.select_for_update(), pk=pk, user=request.user)
+            if upload.status != Upload.STATUS_COMPLETE:
+                return Response({"error": "Upload is not complete"}, status=status.HTTP_400_BAD_REQUEST)
+
+            target = request.data.get('target')
+            if target == 'deposit' and upload.purpose == Upload.PURPOSE_DEPOSIT_PROOF:
+                deposit = Deposit.objects.filter(pk=request.data.get('id'), user=request.user).first()
+                if deposit is None:
+                    return Response({"message": "Not found"}, status=status.HTTP_404_NOT_FOUND)
+                attach_deposit_proof(deposit, upload.file)
+            elif target == 'user' and upload.purpose == Upload.PURPOSE_PROFILE_PICTURE:
+                if str(request.data.get('id', request.user.pk)) != str(request.user.pk):
+                    return Response({"message": "Not found"}, status=status.HTTP_404_NOT_FOUND)
+                attach_profile_picture(request.user, upload.file)
+            else:
+                return Response(
+                    {"error": "Upload cannot be attached to that target"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+            upload.status = Upload.STATUS_ATTACHED
+            upload.save(update_fields=['status', 'updated_at'])
+        return Response(upload_payload(upload))
+
+
+def attach_deposit_proof(deposit, name):
+    proofs.reset_renditions(deposit)
+    deposit.proof_image = name
+    deposit.save(update_fields=proofs.RENDITION_FIELDS)
+    proofs.schedule(deposit)
+
+
+def attach_profile_picture(user, name):
+    if user.profile_picture and user.profile_picture.name != name:
+        # Drops a reference; the storage collects the bytes in the background
+        user.profile_picture.delete(save=False)
+    user.profile_picture = name
+    user.save(update_fields=['profile_picture'])
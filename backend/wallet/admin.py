@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import WithdrawalAccount, Wallet, SystemSettings
+from .models import WithdrawalAccount, Wallet, SystemSettings, LedgerEntry
 
 
 @admin.register(WithdrawalAccount)
@@ -15,7 +15,25 @@ class WalletAdmin(admin.ModelAdmin):
     list_display = ('user', 'balance', 'last_updated')
     list_filter = ('last_updated',)
     search_fields = ('user__email',)
-    readonly_fields = ('user', 'last_updated')
+    # Balance is materialized from the ledger and must not be edited by hand
+    readonly_fields = ('user', 'balance', 'last_updated')
+
+
+@admin.register(LedgerEntry)
+class LedgerEntryAdmin(admin.ModelAdmin):
+    list_display = ('user', 'kind', 'amount', 'balance_after', 'reference', 'created_at')
+    list_filter = ('kind', 'created_at')
+    search_fields = ('user__email', 'reference')
+    readonly_fields = [f.name for f in LedgerEntry._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
 
 
 @admin.register(SystemSettings)
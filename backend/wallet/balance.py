@@ -0,0 +1,113 @@
+"""
+Race-free wallet balance mutations.
+
+Balances are changed with a single conditional statement, e.g.
+
+    UPDATE wallet_wallet SET balance = balance - x WHERE user_id = u AND balance >= x
+
+so the check and the write are one atomic step in the database. The
+UPDATE also takes the row lock for that user's wallet until the
+surrounding transaction commits, which serializes concurrent approvals
+for the same user without blocking anyone else's wallet.
+
+Lock conflicts reported by the database (deadlocks, serialization
+failures, SQLite's "database is locked") are retried with a bounded,
+jittered exponential backoff when we own the outermost transaction.
+"""
+import logging
+import random
+import time
+from dataclasses import dataclass
+from decimal import Decimal
+
+from django.db import OperationalError, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import LedgerEntry, Wallet
+
+logger = logging.getLogger(__name__)
+
+
+class InsufficientBalance(ValueError):
+    """Raised when a withdrawal would take the balance below zero."""
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    attempts: int = 5
+    base_delay: float = 0.01
+    max_delay: float = 0.25
+
+    def delay(self, attempt):
+        """Backoff before retry number `attempt` (1-based), with full jitter."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+
+DEFAULT_RETRY = RetryPolicy()
+
+
+def run_with_retry(func, *args, policy=DEFAULT_RETRY, **kwargs):
+    """
+    Run `func` in its own transaction, retrying on lock conflicts.
+
+    When already inside an atomic block the outer transaction owns the
+    locks, and on PostgreSQL it is aborted by the failure anyway, so the
+    error is propagated to the caller instead of being retried.
+    """
+    if connection.in_atomic_block:
+        return func(*args, **kwargs)
+
+    for attempt in range(1, policy.attempts + 1):
+        try:
+            with transaction.atomic():
+                return func(*args, **kwargs)
+        except OperationalError:
+            if attempt == policy.attempts:
+                raise
+            delay = policy.delay(attempt)
+            logger.warning('Balance update conflict (attempt %s/%s), retrying in %.3fs',
+                           attempt, policy.attempts, delay)
+            time.sleep(delay)
+
+
+def apply_delta(user_id, kind, amount):
+    """
+    Atomically apply one deposit or withdrawal to the user's wallet.
+
+    Must run inside a transaction; the wallet row stays locked until it
+    commits, so callers can safely record the returned balance.
+
+    Returns:
+        Dict with the wallet's `balance`, `total_deposits` and
+        `total_withdrawals` after the change.
+
+    Raises:
+        InsufficientBalance: if a withdrawal exceeds the balance.
+    """
+    amount = Decimal(str(amount))
+    wallets = Wallet.objects.filter(user_id=user_id)
+    now = timezone.now()
+
+    if kind == LedgerEntry.KIND_DEPOSIT:
+        changes = {
+            'balance': F('balance') + amount,
+            'total_deposits': F('total_deposits') + amount,
+            'last_updated': now,
+        }
+        if not wallets.update(**changes):
+            # First movement for this user: create the wallet, then lock it
+            Wallet.objects.get_or_create(user_id=user_id)
+            wallets.update(**changes)
+    elif kind == LedgerEntry.KIND_WITHDRAWAL:
+        changes = {
+            'balance': F('balance') - amount,
+            'total_withdrawals': F('total_withdrawals') + amount,
+            'last_updated': now,
+        }
+        if not wallets.filter(balance__gte=amount).update(**changes):
+            raise InsufficientBalance("Insufficient balance")
+    else:
+        raise ValueError(f"Unknown ledger entry kind: {kind}")
+
+    return wallets.values('balance', 'total_deposits', 'total_withdrawals').get()
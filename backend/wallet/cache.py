@@ -0,0 +1,127 @@
+"""
+Per-user dashboard summary cache.
+
+Holds `total_balance`, `total_deposits` and `total_withdrawals` for each
+user in the configured Django cache (locmem in development, Redis in
+production). Each summary is stored with the per-user generation it was
+built for. Ledger postings bump the generation after commit. A read
+fetches the generation and the summary in one `get_many`, and a summary
+from another generation counts as a miss, so a reader that loaded an
+older entry can only store a summary that is already out of date.
+Generation keys expire after SUMMARY_CACHE_GENERATION_TIMEOUT, and a new
+one starts from the clock.
+
+Hit/miss counters are kept in the same cache so they aggregate across
+workers when Redis is used.
+"""
+import logging
+import time
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import LedgerEntry
+
+logger = logging.getLogger(__name__)
+
+KEY_TEMPLATE = 'wallet:summary:{user_id}'
+GENERATION_KEY_TEMPLATE = 'wallet:summary:{user_id}:generation'
+HITS_KEY = 'wallet:summary:stats:hits'
+MISSES_KEY = 'wallet:summary:stats:misses'
+FIELDS = ('total_balance', 'total_deposits', 'total_withdrawals')
+ZERO = Decimal('0.00')
+
+
+def _generation_key(user_id):
+    return GENERATION_KEY_TEMPLATE.format(user_id=user_id)
+
+
+def _key(user_id):
+    return KEY_TEMPLATE.format(user_id=user_id)
+
+
+def _new_generation(user_id):
+    # Start from the clock, so an expired or evicted generation never
+    # comes back to a number that still has a summary stored
+    cache.add(_generation_key(user_id), time.time_ns(), timeout=_generation_timeout())
+    return cache.get(_generation_key(user_id))
+
+
+def _timeout():
+    return getattr(settings, 'SUMMARY_CACHE_TIMEOUT', 300)
+
+
+def _generation_timeout():
+    return getattr(settings, 'SUMMARY_CACHE_GENERATION_TIMEOUT', 7 * 24 * 3600)
+
+
+def _count(key):
+    try:
+        try:
+            cache.incr(key)
+        except ValueError:
+            # First count since the counter was reset or evicted
+            cache.add(key, 1, timeout=None)
+    except Exception:
+        # Counters are diagnostics only; never fail a request over them
+        logger.debug('Could not bump cache counter %s', key, exc_info=True)
+
+
+def get_summary(user):
+    """Return the dashboard summary for `user`, reading through the cache."""
+    key, generation_key = _key(user.pk), _generation_key(user.pk)
+    found = cache.get_many([key, generation_key])
+    generation = found.get(generation_key)
+    cached = found.get(key)
+    if generation is not None and cached is not None and cached['generation'] == generation:
+        _count(HITS_KEY)
+        return {f: cached[f] for f in FIELDS}
+
+    _count(MISSES_KEY)
+    entry = LedgerEntry.objects.filter(user=user).order_by('-id').first()
+    if entry is None:
+        values = {f: ZERO for f in FIELDS}
+    else:
+        values = _values(entry)
+    if generation is None:
+        generation = _new_generation(user.pk)
+    cache.set(key, {**values, 'generation': generation}, timeout=_timeout())
+    return values
+
+
+def _values(entry):
+    return {
+        'total_balance': entry.balance_after,
+        'total_deposits': entry.total_deposits,
+        'total_withdrawals': entry.total_withdrawals,
+    }
+
+
+def invalidate(user_id):
+    """Move `user_id` to a new generation; the next read rebuilds the summary."""
+    try:
+        cache.incr(_generation_key(user_id))
+    except ValueError:
+        # No generation yet: the next read starts a fresh one
+        pass
+
+
+def invalidate_on_commit(user_id):
+    """Invalidate once the current transaction commits (ledger postings)."""
+    transaction.on_commit(lambda: invalidate(user_id))
+
+
+def stats(reset=False):
+    """Return hit/miss counters (optionally resetting them)."""
+    hits = cache.get(HITS_KEY) or 0
+    misses = cache.get(MISSES_KEY) or 0
+    if reset:
+        cache.delete_many([HITS_KEY, MISSES_KEY])
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': (hits / total) if total else 0.0,
+    }
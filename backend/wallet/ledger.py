@@ -0,0 +1,98 @@
+"""
+Wallet ledger helpers.
+
+Every approved deposit or withdrawal is posted here as one append-only
+`LedgerEntry` carrying the post-entry running balance and totals. The
+latest entry of a user is the source of truth for their balance, so
+balance reads never need to aggregate over transaction history.
+"""
+from decimal import Decimal
+from typing import Optional
+
+from . import cache as summary_cache
+from . import rollups
+from .balance import DEFAULT_RETRY, apply_delta, run_with_retry
+from .models import LedgerEntry
+
+ZERO = Decimal('0.00')
+
+
+def latest_entry(user) -> Optional[LedgerEntry]:
+    """Return the most recent ledger entry for `user` (or None)."""
+    return LedgerEntry.objects.filter(user=user).order_by('-id').first()
+
+
+def current_balance(user) -> Decimal:
+    """Current balance of `user` from the latest ledger entry."""
+    entry = latest_entry(user)
+    return entry.balance_after if entry else ZERO
+
+
+def balance_at(user, when) -> Decimal:
+    """Balance of `user` as it was at the datetime `when`."""
+    entry = (
+        LedgerEntry.objects
+        .filter(user=user, created_at__lte=when)
+        .order_by('-created_at', '-id')
+        .first()
+    )
+    return entry.balance_after if entry else ZERO
+
+
+def summary(user) -> dict:
+    """Balance and lifetime approved totals for the dashboard."""
+    entry = latest_entry(user)
+    if entry is None:
+        return {'total_balance': ZERO, 'total_deposits': ZERO, 'total_withdrawals': ZERO}
+    return {
+        'total_balance': entry.balance_after,
+        'total_deposits': entry.total_deposits,
+        'total_withdrawals': entry.total_withdrawals,
+    }
+
+
+def post_entry(user, kind, amount, source_id=None, reference='', retry=DEFAULT_RETRY):
+    """
+    Append a ledger entry for `user` and update the materialized balance.
+
+    The balance change is a conditional UPDATE on the user's wallet row
+    (see wallet.balance), which also locks that row until commit so the
+    entry records the true post-change balance. The day's rollup is
+    updated under the same lock. Once the transaction
+    commits the user's cached dashboard summary is invalidated.
+
+    Args:
+        user: Owner of the wallet (instance or primary key).
+        kind: LedgerEntry.KIND_DEPOSIT or LedgerEntry.KIND_WITHDRAWAL.
+        amount: Positive amount of the movement.
+        source_id: Id of the Deposit/Withdrawal being posted, if any.
+        reference: Transaction reference, copied for auditing.
+        retry: RetryPolicy used for lock conflicts.
+
+    Returns:
+        The created LedgerEntry.
+
+    Raises:
+        InsufficientBalance: if a withdrawal exceeds the current balance.
+    """
+    user_id = getattr(user, 'pk', user)
+    amount = Decimal(str(amount))
+    return run_with_retry(_post_entry, user_id, kind, amount, source_id, reference, policy=retry)
+
+
+def _post_entry(user_id, kind, amount, source_id, reference):
+    wallet = apply_delta(user_id, kind, amount)
+    entry = LedgerEntry.objects.create(
+        user_id=user_id,
+        kind=kind,
+        amount=amount,
+        balance_after=wallet['balance'],
+        total_deposits=wallet['total_deposits'],
+        total_withdrawals=wallet['total_withdrawals'],
+        source_id=source_id,
+        reference=reference or '',
+    )
+    rollups.record(entry)
+    # The dashboard summary is rebuilt from this entry on the next read
+    summary_cache.invalidate_on_commit(entry.user_id)
+    return entry
@@ -0,0 +1,89 @@
+import threading
+import time
+import uuid
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from transactions.models import Deposit
+from wallet.models import Wallet
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark concurrent deposit approvals against one user and against '
+        'many users, and verify that no balance update is lost'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--approvals', type=int, default=200, help='Deposits approved per scenario')
+        parser.add_argument('--threads', type=int, default=8, help='Concurrent approving workers')
+        parser.add_argument('--users', type=int, default=50, help='Users in the many-users scenario')
+        parser.add_argument('--amount', type=str, default='10.00', help='Amount of each deposit')
+
+    def handle(self, *args, **options):
+        amount = Decimal(options['amount'])
+        run_id = uuid.uuid4().hex[:8]
+        users = [self._make_user(run_id, i) for i in range(max(options['users'], 1))]
+
+        self._run('one user', [users[0]], amount, options)
+        self._run('many users', users, amount, options)
+
+    def _make_user(self, run_id, index):
+        return User.objects.create(
+            email=f'bench-{run_id}-{index}@example.com',
+            username=f'bench-{run_id}-{index}',
+        )
+
+    def _run(self, label, users, amount, options):
+        count = options['approvals']
+        before = {u.pk: self._balance(u) for u in users}
+        deposits = [
+            Deposit.objects.create(user=users[i % len(users)], amount=amount)
+            for i in range(count)
+        ]
+
+        # Round-robin the pending deposits across worker threads
+        buckets = [deposits[i::options['threads']] for i in range(options['threads'])]
+        errors = []
+
+        def worker(batch):
+            try:
+                for deposit in batch:
+                    deposit.approve()
+            except Exception as exc:  # surfaced after the run
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(b,)) for b in buckets]
+        started = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - started
+
+        if errors:
+            raise CommandError(f'{label}: {len(errors)} worker(s) failed: {errors[0]!r}')
+
+        lost = 0
+        for user in users:
+            expected = before[user.pk] + amount * sum(1 for d in deposits if d.user_id == user.pk)
+            if self._balance(user) != expected:
+                lost += 1
+
+        rate = count / elapsed if elapsed else float('inf')
+        style = self.style.SUCCESS if not lost else self.style.ERROR
+        self.stdout.write(style(
+            f'{label}: {count} approvals in {elapsed:.2f}s ({rate:.1f}/s) '
+            f'with {options["threads"]} threads, {lost} wallet(s) with lost updates'
+        ))
+
+    def _balance(self, user):
+        wallet = Wallet.objects.filter(user=user).first()
+        return wallet.balance if wallet else Decimal('0.00')
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.7 on 2026-10-17 02:30
+
+import django.db.models.deletion
+import django.utils.timezone
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet', '0003_walletaddress'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('deposit', 'Deposit'), ('withdrawal', 'Withdrawal')], max_length=16)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('balance_after', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('total_deposits', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('total_withdrawals', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('source_id', models.BigIntegerField(blank=True, null=True)),
+                ('reference', models.CharField(blank=True, max_length=30)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ledger_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Ledger Entry',
+                'verbose_name_plural': 'Ledger Entries',
+                'indexes': [models.Index(fields=['user', '-id'], name='ledger_user_latest_idx'), models.Index(fields=['user', 'created_at'], name='ledger_user_created_idx')],
+                'constraints': [models.UniqueConstraint(fields=('kind', 'source_id'), name='ledger_unique_source')],
+            },
+        ),
+    ]
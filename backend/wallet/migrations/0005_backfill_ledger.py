@@ -0,0 +1,59 @@
+from decimal import Decimal
+
+from django.db import migrations
+
+
+def backfill_ledger(apps, schema_editor):
+    """Replay approved transactions into the ledger, oldest first per user."""
+    Deposit = apps.get_model('transactions', 'Deposit')
+    Withdrawal = apps.get_model('transactions', 'Withdrawal')
+    Wallet = apps.get_model('wallet', 'Wallet')
+    LedgerEntry = apps.get_model('wallet', 'LedgerEntry')
+
+    movements = [
+        ('deposit', d) for d in Deposit.objects.filter(status='approved').iterator()
+    ] + [
+        ('withdrawal', w) for w in Withdrawal.objects.filter(status='approved').iterator()
+    ]
+    movements.sort(key=lambda m: (m[1].user_id, m[1].created_at, m[1].pk))
+
+    state = {}
+    entries = []
+    for kind, tx in movements:
+        balance, deposits, withdrawals = state.get(tx.user_id, (Decimal('0.00'),) * 3)
+        if kind == 'deposit':
+            balance += tx.amount
+            deposits += tx.amount
+        else:
+            balance -= tx.amount
+            withdrawals += tx.amount
+        state[tx.user_id] = (balance, deposits, withdrawals)
+        entries.append(LedgerEntry(
+            user_id=tx.user_id,
+            kind=kind,
+            amount=tx.amount,
+            balance_after=balance,
+            total_deposits=deposits,
+            total_withdrawals=withdrawals,
+            source_id=tx.pk,
+            reference=tx.reference or '',
+            created_at=tx.created_at,
+        ))
+    LedgerEntry.objects.bulk_create(entries, batch_size=1000)
+
+    for user_id, (balance, _, _) in state.items():
+        wallet, _ = Wallet.objects.get_or_create(user_id=user_id)
+        wallet.balance = balance
+        wallet.save(update_fields=['balance'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet', '0004_ledgerentry'),
+        ('transactions', '0003_deposit_reference_withdrawal_reference'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_ledger, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.7 on 2026-10-17 02:31
+
+from decimal import Decimal
+from django.db import migrations, models
+
+
+def copy_totals_from_ledger(apps, schema_editor):
+    """Seed the materialized totals from each user's latest ledger entry."""
+    Wallet = apps.get_model('wallet', 'Wallet')
+    LedgerEntry = apps.get_model('wallet', 'LedgerEntry')
+    for wallet in Wallet.objects.iterator():
+        entry = LedgerEntry.objects.filter(user_id=wallet.user_id).order_by('-id').first()
+        if entry is None:
+            continue
+        wallet.balance = entry.balance_after
+        wallet.total_deposits = entry.total_deposits
+        wallet.total_withdrawals = entry.total_withdrawals
+        wallet.save(update_fields=['balance', 'total_deposits', 'total_withdrawals'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet', '0005_backfill_ledger'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='wallet',
+            name='total_deposits',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14),
+        ),
+        migrations.AddField(
+            model_name='wallet',
+            name='total_withdrawals',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14),
+        ),
+        migrations.RunPython(copy_totals_from_ledger, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.7 on 2026-10-17 02:36
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet', '0006_wallet_totals'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('deposits', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('withdrawals', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('net', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('closing_balance', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Daily Rollup',
+                'verbose_name_plural': 'Daily Rollups',
+                'constraints': [models.UniqueConstraint(fields=('user', 'day'), name='rollup_unique_user_day')],
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+from decimal import Decimal
+
+from django.db import migrations
+from django.utils import timezone
+
+
+def backfill_rollups(apps, schema_editor):
+    """Build daily rollups from the existing ledger entries."""
+    LedgerEntry = apps.get_model('wallet', 'LedgerEntry')
+    DailyRollup = apps.get_model('wallet', 'DailyRollup')
+
+    totals = {}
+    for entry in LedgerEntry.objects.order_by('user_id', 'created_at', 'id').iterator():
+        key = (entry.user_id, timezone.localdate(entry.created_at))
+        row = totals.setdefault(key, [Decimal('0.00'), Decimal('0.00'), Decimal('0.00')])
+        if entry.kind == 'deposit':
+            row[0] += entry.amount
+        else:
+            row[1] += entry.amount
+        row[2] = entry.balance_after
+
+    DailyRollup.objects.bulk_create([
+        DailyRollup(
+            user_id=user_id,
+            day=day,
+            deposits=deposits,
+            withdrawals=withdrawals,
+            net=deposits - withdrawals,
+            closing_balance=closing,
+        )
+        for (user_id, day), (deposits, withdrawals, closing) in totals.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet', '0007_dailyrollup'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
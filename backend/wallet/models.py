@@ -1,5 +1,6 @@
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 from decimal import Decimal
 
 
@@ -16,28 +17,92 @@ class WithdrawalAccount(models.Model):
 class Wallet(models.Model):
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='wallet')
     balance = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    total_deposits = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    total_withdrawals = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
     last_updated = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.user.email}'s wallet - {self.balance}"
 
-    def update_balance(self, amount: Decimal, operation: str):
-        """
-        Update wallet balance with proper decimal handling
-        
-        Args:
-            amount: Decimal amount to add/subtract
-            operation: 'add' for deposits, 'subtract' for withdrawals
-        """
-        amount = Decimal(str(amount))  # Ensure decimal
-        if operation == 'add':
-            self.balance += amount
-        elif operation == 'subtract':
-            if self.balance >= amount:  # Prevent negative balance
-                self.balance -= amount
-            else:
-                raise ValueError("Insufficient balance")
-        self.save()
+
+class LedgerEntry(models.Model):
+    """
+    Append-only record of every balance movement.
+
+    Each entry stores the balance and running totals *after* it was applied,
+    so the current balance (or the balance at any past moment) is a single
+    indexed lookup of the latest entry rather than a scan over history.
+    """
+    KIND_DEPOSIT = 'deposit'
+    KIND_WITHDRAWAL = 'withdrawal'
+    KIND_CHOICES = (
+        (KIND_DEPOSIT, 'Deposit'),
+        (KIND_WITHDRAWAL, 'Withdrawal'),
+    )
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='ledger_entries')
+    kind = models.CharField(max_length=16, choices=KIND_CHOICES)
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    balance_after = models.DecimalField(max_digits=12, decimal_places=2)
+    total_deposits = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    total_withdrawals = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    # Id and reference of the Deposit/Withdrawal that caused the entry.
+    source_id = models.BigIntegerField(null=True, blank=True)
+    reference = models.CharField(max_length=30, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = "Ledger Entry"
+        verbose_name_plural = "Ledger Entries"
+        indexes = [
+            models.Index(fields=['user', '-id'], name='ledger_user_latest_idx'),
+            models.Index(fields=['user', 'created_at'], name='ledger_user_created_idx'),
+        ]
+        constraints = [
+            # A transaction can only ever be posted once
+            models.UniqueConstraint(fields=['kind', 'source_id'], name='ledger_unique_source'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.amount} -> {self.balance_after} ({self.user_id})"
+
+    @property
+    def signed_amount(self):
+        return self.amount if self.kind == self.KIND_DEPOSIT else -self.amount
+
+    def save(self, *args, **kwargs):
+        """Entries are immutable once written"""
+        if self.pk:
+            raise ValueError("Ledger entries are append-only")
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError("Ledger entries are append-only")
+
+
+class DailyRollup(models.Model):
+    """
+    Per-user, per-day totals of approved movements, maintained as ledger
+    entries are posted. `closing_balance` is the balance after the last
+    entry of the day, so balance series need no scan of the ledger.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='daily_rollups')
+    day = models.DateField()
+    deposits = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    withdrawals = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    net = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    closing_balance = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+
+    class Meta:
+        verbose_name = "Daily Rollup"
+        verbose_name_plural = "Daily Rollups"
+        constraints = [
+            # Also the (user, day) index behind range reads
+            models.UniqueConstraint(fields=['user', 'day'], name='rollup_unique_user_day'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} {self.day}: +{self.deposits} -{self.withdrawals}"
 
 
 class SystemSettings(models.Model):
@@ -0,0 +1,163 @@
+"""
+Per-user daily rollups of approved movements.
+
+Rows are upserted from the ledger posting path (under the user's wallet
+row lock), so a chart over any range is a single indexed read of at
+most one row per day, re-bucketed in Python by day, week or month.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db.models import F
+from django.utils import timezone
+
+from .models import DailyRollup, LedgerEntry
+
+ZERO = Decimal('0.00')
+GRANULARITIES = ('day', 'week', 'month')
+LOOKUP_BATCH_SIZE = 500
+
+
+def _movement(entry):
+    if entry.kind == LedgerEntry.KIND_DEPOSIT:
+        return entry.amount, ZERO
+    return ZERO, entry.amount
+
+
+def record(entry):
+    """Add one freshly posted ledger entry to its day's rollup."""
+    day = timezone.localdate(entry.created_at)
+    deposits, withdrawals = _movement(entry)
+    updated = DailyRollup.objects.filter(user_id=entry.user_id, day=day).update(
+        deposits=F('deposits') + deposits,
+        withdrawals=F('withdrawals') + withdrawals,
+        net=F('net') + (deposits - withdrawals),
+        closing_balance=entry.balance_after,
+    )
+    if not updated:
+        DailyRollup.objects.create(
+            user_id=entry.user_id,
+            day=day,
+            deposits=deposits,
+            withdrawals=withdrawals,
+            net=deposits - withdrawals,
+            closing_balance=entry.balance_after,
+        )
+
+
+def record_many(entries):
+    """Add a batch of ledger entries (in posting order) to the rollups."""
+    totals = {}
+    for entry in entries:
+        key = (entry.user_id, timezone.localdate(entry.created_at))
+        deposits, withdrawals = _movement(entry)
+        current = totals.setdefault(key, [ZERO, ZERO, ZERO])
+        current[0] += deposits
+        current[1] += withdrawals
+        current[2] = entry.balance_after
+    if not totals:
+        return
+
+    # One OR term per (user, day) overflows SQLite's expression depth on
+    # large batches: read by user and day range, and match pairs here
+    user_ids = sorted({user_id for user_id, _ in totals})
+    days = [day for _, day in totals]
+    existing = {}
+    for i in range(0, len(user_ids), LOOKUP_BATCH_SIZE):
+        rows = DailyRollup.objects.filter(
+            user_id__in=user_ids[i:i + LOOKUP_BATCH_SIZE], day__range=(min(days), max(days)),
+        )
+        existing.update({(r.user_id, r.day): r for r in rows if (r.user_id, r.day) in totals})
+
+    to_create, to_update = [], []
+    for key, (deposits, withdrawals, closing) in totals.items():
+        row = existing.get(key)
+        if row is None:
+            to_create.append(DailyRollup(
+                user_id=key[0], day=key[1], deposits=deposits, withdrawals=withdrawals,
+                net=deposits - withdrawals, closing_balance=closing,
+            ))
+            continue
+        row.deposits += deposits
+        row.withdrawals += withdrawals
+        row.net += deposits - withdrawals
+        row.closing_balance = closing
+        to_update.append(row)
+
+    DailyRollup.objects.bulk_create(to_create, batch_size=1000)
+    DailyRollup.objects.bulk_update(
+        to_update, ['deposits', 'withdrawals', 'net', 'closing_balance'], batch_size=1000,
+    )
+
+
+def bucket_start(day, granularity):
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def _next_bucket(start, granularity):
+    if granularity == 'week':
+        return start + timedelta(days=7)
+    if granularity == 'month':
+        return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return start + timedelta(days=1)
+
+
+def series(user, start, end, granularity='day', current_balance=None):
+    """
+    Gap-filled deposits/withdrawals/net per bucket between `start` and
+    `end` (inclusive dates), with the balance at the end of each bucket.
+
+    Passing the user's `current_balance` (when already known) saves the
+    opening-balance lookup for ranges that end today or later.
+    """
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"Unknown granularity: {granularity}")
+
+    rows = list(
+        DailyRollup.objects
+        .filter(user=user, day__gte=start, day__lte=end)
+        .order_by('day')
+        .values_list('day', 'deposits', 'withdrawals', 'net', 'closing_balance')
+    )
+    if rows:
+        # Balance before the range = first day's closing balance minus its net
+        balance = rows[0][4] - rows[0][3]
+    elif current_balance is not None and end >= timezone.localdate():
+        balance = current_balance
+    else:
+        balance = (
+            DailyRollup.objects
+            .filter(user=user, day__lt=start)
+            .order_by('-day')
+            .values_list('closing_balance', flat=True)
+            .first()
+        ) or ZERO
+
+    buckets = defaultdict(lambda: [ZERO, ZERO, ZERO, None])
+    for day, deposits, withdrawals, net, closing in rows:
+        bucket = buckets[bucket_start(day, granularity)]
+        bucket[0] += deposits
+        bucket[1] += withdrawals
+        bucket[2] += net
+        bucket[3] = closing
+
+    points = []
+    current = bucket_start(start, granularity)
+    while current <= end:
+        deposits, withdrawals, net, closing = buckets.get(current, (ZERO, ZERO, ZERO, None))
+        if closing is not None:
+            balance = closing
+        points.append({
+            'period': current,
+            'deposits': deposits,
+            'withdrawals': withdrawals,
+            'net': net,
+            'balance': balance,
+        })
+        current = _next_bucket(current, granularity)
+    return points
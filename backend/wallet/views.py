@@ -6,6 +6,8 @@ from django.utils.decorators import method_decorator
 from .serializers import WithdrawalAccountSerializer, SystemSettingsSerializer
 from .serializers import WalletAddressSerializer
 from .models import WithdrawalAccount, SystemSettings, WalletAddress
+from . import ledger
+from transactions import proofs
 from transactions.models import Deposit, Withdrawal
 from transactions.serializers import DepositSerializer, WithdrawalSerializer
 from rest_framework.parsers import MultiPartParser, FormParser
@@ -47,7 +49,9 @@ class DepositRequestView(APIView):
         })
 
         if serializer.is_valid():
-            serializer.save(user=request.user)
+            deposit = serializer.save(user=request.user)
+            # Re-encoding and thumbnails happen off the request
+            proofs.schedule(deposit)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -66,7 +70,9 @@ class ConfirmDepositView(APIView):
         # Only allow attaching proof; admin will change status via admin
         serializer = DepositSerializer(deposit, data=request.data, partial=True)
         if serializer.is_valid():
-            serializer.save()
+            deposit = serializer.save()
+            if 'proof_image' in serializer.validated_data:
+                proofs.schedule(deposit)
             return Response(serializer.data)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -101,16 +107,9 @@ class WithdrawalRequestView(APIView):
         except (ValueError, TypeError):
             return Response({"error": "Invalid amount"}, status=status.HTTP_400_BAD_REQUEST)
         
-        # NEW: Calculate user's current balance before allowing withdrawal
-        from transactions.models import Deposit, Withdrawal as WithdrawalModel
-        from django.db.models import Sum
-        
-        approved_deposits = Deposit.objects.filter(user=request.user, status='approved').aggregate(total=Sum('amount'))['total'] or 0
-        approved_withdrawals = WithdrawalModel.objects.filter(user=request.user, status='approved').aggregate(total=Sum('amount'))['total'] or 0
-        current_balance = approved_deposits - approved_withdrawals
-        
-        print(f"🔍 User {request.user.email} balance check: approved_deposits={approved_deposits}, approved_withdrawals={approved_withdrawals}, current_balance={current_balance}")
-        
+        # NEW: Read user's current balance from the ledger before allowing withdrawal
+        current_balance = ledger.current_balance(request.user)
+
         # NEW: Validate withdrawal amount against current balance
         if current_balance <= 0:
             return Response(